@@ -0,0 +1,237 @@
+"""Turn handling for Cortex Desktop Assistant.
+
+The assistant routes each utterance to a local handler, a web search or the
+LLM, and returns the reply as text or as a stream of text. Speaking the reply
+is left to the caller.
+
+A reply can also be started speculatively from a partial transcript while the
+user is still speaking; ``respond`` reuses it if the final transcript matches.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from config_utils import AppConfig
+from groq_engine import chat_with_groq
+from intent_router import CONTAINS, PREFIX, Intent, IntentRouter, RouteMatch
+from logger import get_logger
+from metrics import SPECULATIONS, TURNS
+from plugin_manager import PluginError, PluginManager
+from retrieval import SpeculativeSearch, grounded_answer
+from tracing import bind, span
+from usage import BUDGET_SPENT_MESSAGE, BudgetExceededError, tag_turn
+from web_search import normalize_query, search_web
+
+# Initialize logger
+logger = get_logger("assistant")
+
+# A reply is either complete text or a stream of text deltas
+Reply = Union[str, Iterator[str]]
+
+SEARCH_TRIGGERS = ["search for", "look up", "find"]
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cortex-speculate")
+
+
+@dataclass
+class Response:
+    """The outcome of handling one utterance."""
+
+    intent: str
+    reply: Optional[Reply]
+    label: str = "Cortex"
+
+
+class Speculation:
+    """
+    A reply started from a partial transcript.
+
+    Its search or LLM request is already in flight. It is used only if the
+    final transcript normalizes to the same text; otherwise it is abandoned.
+    """
+
+    def __init__(self, text: str, intent: str, finish: Callable[[], Response]):
+        self.text = text
+        self.intent = intent
+        self._key = normalize_query(text)
+        self._finish = finish
+
+    def matches(self, text: str) -> bool:
+        return normalize_query(text) == self._key
+
+    def response(self) -> Response:
+        """Wait for the speculative work and build the response."""
+        return self._finish()
+
+
+class Assistant:
+    """Route utterances and produce replies."""
+
+    def __init__(self, config: AppConfig, mode: Optional[str] = None):
+        """
+        Initialize the assistant.
+
+        Args:
+            config: Application configuration
+            mode: Operation mode; wake mode also routes the wake and shutdown words
+        """
+        self.config = config
+        self.mode = mode or config.mode
+        self.router = IntentRouter()
+
+        if self.mode == "wake":
+            self.router.add(Intent(
+                "shutdown",
+                [config.shutdown_word, "goodbye"],
+                match=CONTAINS,
+                priority=100,
+            ))
+            self.router.add(Intent("wake", [config.wake_word], match=CONTAINS, priority=50))
+        self.router.add(Intent(
+            "search",
+            SEARCH_TRIGGERS,
+            match=PREFIX,
+            handler=self._search,
+            label="Web",
+        ))
+        self.plugins = PluginManager.from_config(config)
+        self.plugins.install(self.router)
+
+    def respond(
+        self,
+        text: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        speculation: Optional[Speculation] = None,
+    ) -> Response:
+        """
+        Handle an utterance.
+
+        Args:
+            text: What the user said or typed
+            history: Earlier conversation messages to give the LLM context
+            speculation: A reply started from a partial transcript, used if
+                it matches ``text``
+
+        Returns:
+            Response: The matched intent and its reply. Control intents
+            (shutdown, a bare wake word) have no reply.
+        """
+        hit = speculation is not None and speculation.matches(text)
+        if speculation is not None:
+            SPECULATIONS.inc(outcome="hit" if hit else "miss")
+            logger.debug("Speculative %s reply %s", speculation.intent, "reused" if hit else "discarded")
+        response = speculation.response() if hit else self._respond(text, history)
+        TURNS.inc(intent=response.intent)
+        tag_turn(response.intent)
+        return response
+
+    def speculate(self, text: str, history: Optional[List[Dict[str, str]]] = None) -> Optional[Speculation]:
+        """
+        Start the reply to a partial transcript ahead of the final one.
+
+        Only web searches and LLM calls are started early, since they have no
+        side effects if the speculation is abandoned; local handlers and
+        control intents wait for ``respond``.
+
+        Args:
+            text: The partial transcript
+            history: Earlier conversation messages, as will be passed to ``respond``
+
+        Returns:
+            The started speculation, or None if the utterance is not worth starting early
+        """
+        with span("speculate"):
+            started = self._start(text, history)
+        if started is None:
+            return None
+        intent, finish = started
+        return Speculation(text, intent, finish)
+
+    def _start(
+        self, text: str, history: Optional[List[Dict[str, str]]]
+    ) -> Optional[Tuple[str, Callable[[], Response]]]:
+        match = self.router.route(text)
+        if match is None or self._bare_search(match):
+            return "chat", self._start_chat(text, history)
+        if match.name == "wake" and match.argument:
+            return self._start(match.argument, history)
+        if match.name == "search":
+            query, label = match.argument, match.intent.label
+            if self.config.search.grounding == "off":
+                future = _executor.submit(bind(search_web), query)
+                return "search", lambda: Response("search", future.result(), label)
+            search = SpeculativeSearch(query)
+            return "search", lambda: Response("search", self._ground(query, search, require_results=True), label)
+        logger.debug("Partial transcript routed to %s; not speculating", match.name)
+        return None
+
+    def _start_chat(self, text: str, history: Optional[List[Dict[str, str]]]) -> Callable[[], Response]:
+        if self.config.search.grounding == "always":
+            search = SpeculativeSearch(text)
+            return lambda: Response("chat", self._ground(text, search, history=history), "Groq")
+        future = _executor.submit(bind(chat_with_groq), text, history=history)
+        return lambda: Response("chat", _budgeted(future.result), "Groq")
+
+    def _respond(self, text: str, history: Optional[List[Dict[str, str]]]) -> Response:
+        with span("route"):
+            match = self.router.route(text)
+        if match is None or self._bare_search(match):
+            return self._chat(text, history)
+
+        if match.name == "wake":
+            # "hey cortex, what's the time" while already awake
+            if match.argument:
+                return self._respond(match.argument, history)
+            return Response("wake", None)
+
+        if match.intent.handler is None:
+            return Response(match.name, None, match.intent.label)
+        try:
+            return Response(match.name, match.intent.handler(match), match.intent.label)
+        except PluginError as e:
+            logger.warning("%s; answering with the LLM instead", e)
+            return self._chat(text, history)
+
+    @staticmethod
+    def _bare_search(match: RouteMatch) -> bool:
+        """A search trigger said on its own ("find"), which is left to the LLM."""
+        return match.name == "search" and not match.argument.strip()
+
+    def _ground(
+        self,
+        question: str,
+        search: SpeculativeSearch,
+        require_results: bool = False,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> Iterator[str]:
+        return grounded_answer(
+            question,
+            search,
+            token_budget=self.config.search.context_tokens,
+            timeout=self.config.search.timeout,
+            require_results=require_results,
+            history=history,
+        )
+
+    def _search(self, match: RouteMatch) -> Reply:
+        query = match.argument
+        if self.config.search.grounding == "off":
+            return search_web(query)
+        return self._ground(query, SpeculativeSearch(query), require_results=True)
+
+    def _chat(self, text: str, history: Optional[List[Dict[str, str]]] = None) -> Response:
+        if self.config.search.grounding == "always":
+            reply: Reply = self._ground(text, SpeculativeSearch(text), history=history)
+        else:
+            reply = _budgeted(chat_with_groq, text, history=history)
+        return Response("chat", reply, "Groq")
+
+
+def _budgeted(call: Callable[..., str], *args, **kwargs) -> str:
+    """Get an LLM reply, or a spoken notice if the Groq budget is spent."""
+    try:
+        return call(*args, **kwargs)
+    except BudgetExceededError as e:
+        logger.warning("%s; not answering", e)
+        return BUDGET_SPENT_MESSAGE
@@ -0,0 +1,318 @@
+"""Continuous microphone capture for Cortex Desktop Assistant.
+
+Opening a microphone per phrase loses whatever is said while it reopens and
+recalibrates, such as a command spoken right after the wake word. Here one
+thread reads the microphone for the whole session into a fixed-size NumPy
+ring buffer of 16-bit samples, addressed by absolute sample position.
+Consumers read from a ``Cursor`` that can start a configurable pre-roll in
+the past, so a segment is recognized from audio that was already captured.
+``CaptureBuffer.views`` hands out slices of the ring itself, without copying.
+
+``WavSource`` replays a recorded session in place of ``sr.Microphone`` (in
+real time or as fast as it is read), and ``RecordingSource`` saves whatever a
+microphone hears to a WAV file, so capture and recognition can be exercised
+and benchmarked without a live microphone.
+
+Example:
+    mic = MicrophoneCapture(lambda: stream.read(1024), 16000).start()
+    cursor = mic.cursor(pre_roll=0.5)
+    chunk = cursor.read()
+"""
+
+import threading
+import time
+import wave
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+from logger import get_logger
+
+# Initialize logger
+logger = get_logger("audio.input")
+
+
+class CaptureError(Exception):
+    """Exception raised when captured audio is no longer (or not yet) available."""
+    pass
+
+
+class CaptureBuffer:
+    """Ring of int16 samples addressed by absolute position."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        # Samples written since the start
+        self.position = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def oldest(self) -> int:
+        """Position of the oldest sample still held."""
+        return max(0, self.position - self.capacity)
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append samples, overwriting the oldest once full."""
+        total = len(samples)
+        samples = samples[-self.capacity:]
+        count = len(samples)
+        with self._cond:
+            start = (self.position + total - count) % self.capacity
+            first = min(count, self.capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:count - first] = samples[first:]
+            self.position += total
+            self._cond.notify_all()
+
+    def views(self, start: int, end: int) -> List[np.ndarray]:
+        """
+        Zero-copy views of the samples in ``[start, end)``.
+
+        Returns one slice, or two when the range wraps around the ring. The
+        views alias the ring, so read them before the writer laps them.
+
+        Raises:
+            CaptureError: If part of the range was overwritten or not yet captured
+        """
+        with self._cond:
+            if start < self.oldest:
+                raise CaptureError(f"Samples from {start} were overwritten (oldest is {self.oldest})")
+            if end > self.position:
+                raise CaptureError(f"Samples up to {end} have not been captured yet")
+        if end <= start:
+            return [self._data[:0]]
+        first, last = start % self.capacity, end % self.capacity or self.capacity
+        if first < last:
+            return [self._data[first:last]]
+        return [self._data[first:], self._data[:last]]
+
+    def wait_for(self, position: int, timeout: Optional[float] = None) -> bool:
+        """Block until ``position`` samples have been captured; False on timeout or close."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.position >= position or self.closed, timeout)
+            return self.position >= position
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class Cursor:
+    """A reader's position in a ``CaptureBuffer``."""
+
+    def __init__(self, buffer: CaptureBuffer, position: int, chunk: int = 1024):
+        self.buffer = buffer
+        self.position = position
+        self.chunk = chunk
+
+    def seek(self, position: int) -> None:
+        self.position = max(position, self.buffer.oldest)
+
+    def skip_to_now(self) -> None:
+        """Ignore everything captured so far (e.g. the assistant's own speech)."""
+        self.position = self.buffer.position
+
+    def read_views(self, timeout: Optional[float] = None) -> List[np.ndarray]:
+        """
+        Wait for the next chunk and return it as zero-copy views.
+
+        Raises:
+            CaptureError: If capture stopped or the timeout expired
+        """
+        if self.position < self.buffer.oldest:
+            logger.warning("Reader fell %d samples behind; skipping ahead", self.buffer.oldest - self.position)
+            self.position = self.buffer.oldest
+        end = self.position + self.chunk
+        if not self.buffer.wait_for(end, timeout):
+            raise CaptureError("Microphone capture stopped")
+        views = self.buffer.views(self.position, end)
+        self.position = end
+        return views
+
+    def read(self, timeout: Optional[float] = None) -> bytes:
+        """Next chunk as 16-bit PCM bytes (the interface of a microphone stream)."""
+        return b"".join(view.tobytes() for view in self.read_views(timeout))
+
+
+class MicrophoneCapture:
+    """Read a microphone continuously into a ``CaptureBuffer`` on a background thread."""
+
+    def __init__(self, read_chunk: Callable[[], bytes], sample_rate: int, seconds: float = 30.0, chunk: int = 1024):
+        """
+        Initialize the capture.
+
+        Args:
+            read_chunk: Returns the next 16-bit mono PCM chunk from the device (blocking)
+            sample_rate: Device sample rate
+            seconds: Audio kept in the ring buffer
+            chunk: Samples per cursor read
+        """
+        self.read_chunk = read_chunk
+        self.sample_rate = sample_rate
+        self.chunk = chunk
+        self.buffer = CaptureBuffer(max(chunk, int(seconds * sample_rate)))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MicrophoneCapture":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cortex-mic", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                self.buffer.write(np.frombuffer(self.read_chunk(), dtype="<i2"))
+        except EOFError:
+            logger.info("Audio input ended")
+        except Exception as e:
+            logger.error("Microphone capture failed: %s", str(e))
+        finally:
+            self.buffer.close()
+
+    def cursor(self, pre_roll: float = 0.0) -> Cursor:
+        """A reader starting ``pre_roll`` seconds before now."""
+        start = self.buffer.position - int(pre_roll * self.sample_rate)
+        return Cursor(self.buffer, max(start, self.buffer.oldest), self.chunk)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+
+class WavStream:
+    """Microphone-like stream over recorded 16-bit mono PCM."""
+
+    def __init__(self, pcm: bytes, sample_rate: int, realtime: bool = True):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        # Bytes read so far
+        self.offset = 0
+        self._started: Optional[float] = None
+
+    def read(self, frames: int) -> bytes:
+        """
+        Read the next ``frames`` samples, paced to the sample rate when replaying in real time.
+
+        Raises:
+            EOFError: Once the recording is exhausted
+        """
+        if self.offset >= len(self.pcm):
+            raise EOFError("End of recording")
+        data = self.pcm[self.offset:self.offset + frames * 2]
+        self.offset += len(data)
+        if self.realtime:
+            if self._started is None:
+                self._started = time.monotonic()
+            delay = self._started + self.offset / 2 / self.sample_rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return data + bytes(frames * 2 - len(data))
+
+
+class WavSource:
+    """
+    A recorded session played back in place of ``sr.Microphone``.
+
+    Provides the attributes the capture code reads from a microphone
+    (``SAMPLE_RATE``, ``SAMPLE_WIDTH``, ``CHUNK`` and ``stream``). Reopening it
+    carries on where the last read stopped, like a microphone that kept
+    running. Multi-channel recordings are mixed down to mono.
+    """
+
+    SAMPLE_WIDTH = 2
+
+    def __init__(self, path: str, realtime: bool = True, chunk: int = 1024):
+        """
+        Load a recording.
+
+        Args:
+            path: 16-bit PCM WAV file
+            realtime: Pace reads to the sample rate (False reads as fast as possible)
+            chunk: Samples per read
+
+        Raises:
+            CaptureError: If the file is not 16-bit PCM WAV
+        """
+        try:
+            with wave.open(path, "rb") as wav:
+                channels, width = wav.getnchannels(), wav.getsampwidth()
+                self.SAMPLE_RATE = wav.getframerate()
+                pcm = wav.readframes(wav.getnframes())
+        except (OSError, wave.Error, EOFError) as e:
+            raise CaptureError(f"Could not read recording {path}: {e}") from e
+        if width != 2:
+            raise CaptureError(f"Recording {path} must be 16-bit PCM, not {width * 8}-bit")
+        if channels > 1:
+            samples = np.frombuffer(pcm, dtype="<i2").reshape(-1, channels).mean(axis=1)
+            pcm = samples.astype("<i2").tobytes()
+        self.path = path
+        self.CHUNK = chunk
+        self.stream = WavStream(pcm, self.SAMPLE_RATE, realtime)
+
+    @property
+    def duration(self) -> float:
+        return len(self.stream.pcm) / 2 / self.SAMPLE_RATE
+
+    def __enter__(self) -> "WavSource":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+class _TeeStream:
+    def __init__(self, stream: Any, writer: wave.Wave_write):
+        self._stream = stream
+        self._writer = writer
+
+    def read(self, frames: int, *args, **kwargs) -> bytes:
+        data = self._stream.read(frames, *args, **kwargs)
+        self._writer.writeframes(data)
+        return data
+
+
+class RecordingSource:
+    """
+    Wrap a microphone so everything read from it is also saved to a WAV file.
+
+    The file stays open across reopens of the microphone (one session per
+    file) until ``close`` is called.
+    """
+
+    def __init__(self, source: Any, path: str):
+        self.source = source
+        self.path = path
+        self._writer: Optional[wave.Wave_write] = None
+        self.stream: Any = None
+
+    def __getattr__(self, name: str) -> Any:
+        # SAMPLE_RATE, SAMPLE_WIDTH, CHUNK and the like come from the microphone
+        return getattr(self.source, name)
+
+    def __enter__(self) -> "RecordingSource":
+        self.source.__enter__()
+        if self._writer is None:
+            self._writer = wave.open(self.path, "wb")
+            self._writer.setnchannels(1)
+            self._writer.setsampwidth(self.source.SAMPLE_WIDTH)
+            self._writer.setframerate(self.source.SAMPLE_RATE)
+            logger.info("Recording microphone input to %s", self.path)
+        self.stream = _TeeStream(self.source.stream, self._writer)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stream = None
+        self.source.__exit__(*exc_info)
+
+    def close(self) -> None:
+        """Finish the WAV file."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,599 @@
+"""Long-lived audio output for Cortex Desktop Assistant.
+
+Instead of each engine blocking on ``playsound`` (one decoder process per
+utterance, with gaps in between), decoded clips are submitted to a single
+``AudioOutput``. A feeder thread converts each clip to the device format
+(vectorized NumPy resampling and channel mapping), optionally crossfades it
+with the previous clip, and writes it into a PCM ring buffer that the device
+callback drains. Clips queued back to back therefore play without gaps, and
+volume applies to audio already buffered. A speaking rate other than 1.0 is
+applied as each clip is converted (see :mod:`time_stretch`), so engines can
+render at normal speed and one rendering serves every rate. Clips are also
+scaled to a common loudness first (see :mod:`loudness`), so switching engines
+on fallback doesn't change the volume.
+
+The device is driven through ``sounddevice`` when it is installed; otherwise
+``get_output`` returns None and callers fall back to blocking file playback.
+
+Example:
+    playback = play_clip(clip)   # returns once queued
+    playback.wait()              # block until it has been heard
+"""
+
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Deque, Optional, Tuple, Union
+
+import numpy as np
+
+from audio_utils import AudioError, PCMClip, encode_wav
+from logger import get_logger
+from loudness import LoudnessNormalizer
+from time_stretch import MAX_RATE, MIN_RATE, time_stretch
+
+# Initialize logger
+logger = get_logger("audio.output")
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """
+    Resample by linear interpolation, all channels at once.
+
+    Args:
+        samples: Samples shaped (frames,) or (frames, channels)
+        src_rate: Rate of ``samples``
+        dst_rate: Rate to convert to
+
+    Returns:
+        The resampled samples (``samples`` itself if the rates match)
+    """
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    frames = len(samples)
+    out_frames = max(1, int(round(frames * dst_rate / src_rate)))
+    positions = np.arange(out_frames, dtype=np.float64) * (src_rate / dst_rate)
+    left = np.minimum(positions.astype(np.int64), frames - 1)
+    right = np.minimum(left + 1, frames - 1)
+    frac = (positions - left).astype(np.float32)
+    if samples.ndim > 1:
+        frac = frac[:, None]
+    return (samples[left] * (1.0 - frac) + samples[right] * frac).astype(np.float32)
+
+
+def remix(samples: np.ndarray, channels: int) -> np.ndarray:
+    """
+    Map samples to a channel count, returning a (frames, channels) array.
+
+    Mono is copied to every channel; multichannel audio is averaged down to
+    mono, or has channels dropped or repeated otherwise.
+    """
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    have = samples.shape[1]
+    if have == channels:
+        return samples
+    if channels == 1:
+        return samples.mean(axis=1, keepdims=True)
+    if have == 1:
+        return np.repeat(samples, channels, axis=1)
+    return np.resize(samples.T, (channels, samples.shape[0])).T
+
+
+class RingBuffer:
+    """Fixed-size float32 frame buffer with one writer and one reader."""
+
+    def __init__(self, capacity: int, channels: int = 1):
+        self.capacity = capacity
+        self.channels = channels
+        self._data = np.zeros((capacity, channels), dtype=np.float32)
+        self._start = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> int:
+        """Frames waiting to be read."""
+        return self._size
+
+    @property
+    def space(self) -> int:
+        """Frames that can be written without overwriting unread audio."""
+        return self.capacity - self._size
+
+    def write(self, frames: np.ndarray) -> int:
+        """
+        Append as many frames as fit.
+
+        Args:
+            frames: Samples shaped (n, channels)
+
+        Returns:
+            Number of frames written
+        """
+        with self._lock:
+            count = min(len(frames), self.capacity - self._size)
+            end = (self._start + self._size) % self.capacity
+            first = min(count, self.capacity - end)
+            self._data[end:end + first] = frames[:first]
+            self._data[:count - first] = frames[first:count]
+            self._size += count
+            return count
+
+    def read(self, count: int) -> Tuple[np.ndarray, int]:
+        """
+        Take up to ``count`` frames, padding with silence.
+
+        Returns:
+            A (count, channels) block and the number of real frames in it
+        """
+        out = np.zeros((count, self.channels), dtype=np.float32)
+        with self._lock:
+            taken = min(count, self._size)
+            first = min(taken, self.capacity - self._start)
+            out[:first] = self._data[self._start:self._start + first]
+            out[first:taken] = self._data[:taken - first]
+            self._start = (self._start + taken) % self.capacity
+            self._size -= taken
+        return out, taken
+
+    def clear(self) -> None:
+        with self._lock:
+            self._start = 0
+            self._size = 0
+
+
+class Playback:
+    """Handle for a submitted clip."""
+
+    def __init__(self, duration: float):
+        self.duration = duration
+        self.cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        """True once the clip has been played (or dropped)."""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the clip has been played; False on timeout."""
+        return self._done.wait(timeout)
+
+    def _finish(self, cancelled: bool = False) -> None:
+        self.cancelled = cancelled
+        self._done.set()
+
+
+class SoundDeviceBackend:
+    """Drive an ``AudioOutput`` from a ``sounddevice`` output stream callback."""
+
+    def __init__(self, device: Optional[Union[int, str]] = None, blocksize: int = 1024):
+        try:
+            import sounddevice
+        except (ImportError, OSError) as e:
+            raise AudioError(f"sounddevice is not available: {e}") from e
+        self._sd = sounddevice
+        self.device = device
+        self.blocksize = blocksize
+        self._stream = None
+
+    def default_rate(self) -> int:
+        """Native sample rate of the output device."""
+        info = self._sd.query_devices(self.device, "output")
+        return int(info["default_samplerate"])
+
+    def open(self, output: "AudioOutput") -> None:
+        def callback(outdata, frames, time_info, status):
+            if status:
+                logger.debug("Audio output status: %s", status)
+            outdata[:] = output.render(frames)
+
+        try:
+            self._stream = self._sd.OutputStream(
+                samplerate=output.sample_rate,
+                channels=output.channels,
+                dtype="float32",
+                blocksize=self.blocksize,
+                device=self.device,
+                callback=callback,
+            )
+            self._stream.start()
+        except Exception as e:
+            raise AudioError(f"Could not open audio output: {e}") from e
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class AudioOutput:
+    """Gapless clip queue feeding a PCM ring buffer."""
+
+    def __init__(
+        self,
+        sample_rate: int = 48000,
+        channels: int = 1,
+        buffer_seconds: float = 2.0,
+        crossfade: float = 0.0,
+        volume: float = 1.0,
+        backend: Optional[SoundDeviceBackend] = None,
+        rate: float = 1.0,
+        loudness: Optional[LoudnessNormalizer] = None,
+    ):
+        """
+        Initialize the output. Call ``start`` to begin playing.
+
+        Args:
+            sample_rate: Device sample rate clips are resampled to
+            channels: Device channel count
+            buffer_seconds: Ring buffer length
+            crossfade: Seconds of overlap between consecutive clips (0 plays
+                them back to back)
+            volume: Gain applied at playback time
+            backend: Device driver calling ``render``; None leaves that to the
+                caller (tests, offline rendering)
+            rate: Speaking rate applied to clips as they are queued
+            loudness: Normalizes clips that aren't already (None plays them as rendered)
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.crossfade_frames = int(crossfade * sample_rate)
+        self.volume = volume
+        self.rate = rate
+        self.loudness = loudness
+        self.backend = backend
+        self.ring = RingBuffer(max(1, int(buffer_seconds * sample_rate)), channels)
+        self._queue: "queue.Queue[Optional[Tuple[PCMClip, Playback]]]" = queue.Queue()
+        # (total frames written when a clip ends, its playback)
+        self._markers: Deque[Tuple[int, Playback]] = deque()
+        self._written = 0
+        self._played = 0
+        self._pending = 0
+        # Held back end of the previous clip (samples, playback, generation),
+        # waiting to be crossfaded into the next one; owned by the feeder
+        self._tail: Optional[Tuple[np.ndarray, Playback, int]] = None
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+    @volume.setter
+    def volume(self, value: float) -> None:
+        self._volume = float(min(max(value, 0.0), 2.0))
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: float) -> None:
+        self._rate = float(min(max(value, MIN_RATE), MAX_RATE))
+
+    def start(self) -> "AudioOutput":
+        """Start the feeder thread and open the device."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._feed, name="cortex-audio-out", daemon=True)
+            self._thread.start()
+            if self.backend is not None:
+                self.backend.open(self)
+        return self
+
+    def submit(self, clip: PCMClip) -> Playback:
+        """
+        Queue a clip to play after everything already submitted.
+
+        Args:
+            clip: The decoded clip
+
+        Returns:
+            A handle to wait on
+        """
+        if self._closed:
+            raise AudioError("Audio output is closed")
+        playback = Playback(clip.duration / self._rate)
+        with self._cond:
+            self._pending += 1
+        self._queue.put((clip, playback))
+        return playback
+
+    def convert(self, clip: PCMClip) -> np.ndarray:
+        """Convert a clip to the target loudness, speaking rate, device sample rate and channel count."""
+        if self.loudness is not None:
+            clip = self.loudness(clip)
+        samples = np.asarray(clip.samples, dtype=np.float32)
+        # Stretched before resampling, at the (usually lower) clip rate
+        samples = time_stretch(samples, self._rate, clip.sample_rate)
+        samples = resample(samples, clip.sample_rate, self.sample_rate)
+        return np.ascontiguousarray(remix(samples, self.channels))
+
+    def render(self, frames: int) -> np.ndarray:
+        """
+        Produce the next block for the device. Called from the audio callback.
+
+        Args:
+            frames: Frames requested
+
+        Returns:
+            A (frames, channels) float32 block, silence-padded on underrun
+        """
+        block, taken = self.ring.read(frames)
+        if self._volume != 1.0:
+            block *= self._volume
+            np.clip(block, -1.0, 1.0, out=block)
+        with self._cond:
+            self._played += taken
+            while self._markers and self._markers[0][0] <= self._played:
+                self._markers.popleft()[1]._finish()
+                self._pending -= 1
+            self._cond.notify_all()
+        return block
+
+    def _write(self, samples: np.ndarray, generation: int) -> bool:
+        """Write all samples, waiting for room; False if cleared meanwhile."""
+        offset = 0
+        while offset < len(samples):
+            with self._cond:
+                while self.ring.space == 0 and generation == self._generation and not self._closed:
+                    self._cond.wait(0.1)
+                if generation != self._generation or self._closed:
+                    return False
+                written = self.ring.write(samples[offset:])
+                self._written += written
+            offset += written
+        return True
+
+    def _mark(self, playback: Playback, generation: int) -> None:
+        """Finish a clip once the frames written so far have been played."""
+        with self._cond:
+            cancelled = generation != self._generation or self._closed
+            if not cancelled and self._written > self._played:
+                self._markers.append((self._written, playback))
+                return
+            self._pending -= 1
+            self._cond.notify_all()
+        playback._finish(cancelled=cancelled)
+
+    def _flush_tail(self) -> None:
+        if self._tail is None:
+            return
+        tail, playback, generation = self._tail
+        self._tail = None
+        self._write(tail, generation)
+        self._mark(playback, generation)
+
+    def _next(self) -> Optional[Tuple[PCMClip, Playback]]:
+        """Next queued clip; with a tail held, only wait until the buffer runs low."""
+        if self._tail is None:
+            return self._queue.get()
+        deadline = time.monotonic() + max(0.0, self.ring.available / self.sample_rate - 0.02)
+        try:
+            return self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            return None
+
+    def _feed(self) -> None:
+        while True:
+            item = self._next()
+            generation = self._generation
+            # A tail from before clear() is dropped rather than played
+            if self._tail is not None and (self._tail[2] != generation or self._closed):
+                self._mark(self._tail[1], self._tail[2])
+                self._tail = None
+            if item is None:
+                if self._closed:
+                    return
+                self._flush_tail()
+                continue
+            clip, playback = item
+            try:
+                samples = self.convert(clip)
+            except Exception as e:
+                logger.error("Could not convert clip for playback: %s", str(e))
+                self._mark(playback, -1)
+                continue
+
+            fade = min(self.crossfade_frames, len(samples) // 2)
+            if self._tail is not None:
+                tail, previous, _ = self._tail
+                self._tail = None
+                overlap = min(len(tail), fade)
+                ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)[:, None]
+                mixed = tail[len(tail) - overlap:] * (1.0 - ramp) + samples[:overlap] * ramp
+                self._write(tail[:len(tail) - overlap], generation)
+                self._write(mixed, generation)
+                self._mark(previous, generation)
+                samples = samples[overlap:]
+
+            if fade:
+                self._write(samples[:-fade], generation)
+                self._tail = (samples[-fade:], playback, generation)
+            else:
+                self._write(samples, generation)
+                self._mark(playback, generation)
+
+    def clear(self) -> None:
+        """Stop playback now: drop queued clips and buffered audio (e.g. barge-in)."""
+        dropped = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                dropped.append(item[1])
+        with self._cond:
+            self._generation += 1
+            self.ring.clear()
+            dropped.extend(p for _, p in self._markers)
+            self._markers.clear()
+            self._played = self._written = 0
+            self._pending -= len(dropped)
+            self._cond.notify_all()
+        for playback in dropped:
+            playback._finish(cancelled=True)
+
+    @property
+    def idle(self) -> bool:
+        """True when nothing is queued or playing."""
+        with self._cond:
+            return self._pending <= 0
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until everything submitted has been played.
+
+        Returns:
+            False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(0.05 if remaining is None else min(remaining, 0.05))
+        return True
+
+    def close(self) -> None:
+        """Stop the device and the feeder, dropping anything unplayed."""
+        self._closed = True
+        self.clear()
+        self._queue.put(None)
+        if self.backend is not None:
+            self.backend.close()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+
+_output: Optional[AudioOutput] = None
+_output_failed = False
+_output_lock = threading.Lock()
+
+
+def configure_audio(audio_config, rate: float = 1.0) -> Optional[AudioOutput]:
+    """
+    Open the audio output from the ``audio`` config section.
+
+    Args:
+        audio_config: AudioConfig instance
+        rate: Speaking rate applied at play time
+
+    Returns:
+        The running output, or None if no device backend is available
+    """
+    global _output, _output_failed
+    with _output_lock:
+        if _output is not None:
+            return _output
+        if audio_config.backend == "playsound":
+            _output_failed = True
+            return None
+        try:
+            backend = SoundDeviceBackend(audio_config.device, audio_config.blocksize)
+            sample_rate = audio_config.sample_rate or backend.default_rate()
+            _output = AudioOutput(
+                sample_rate=sample_rate,
+                channels=audio_config.channels,
+                buffer_seconds=audio_config.buffer_seconds,
+                crossfade=audio_config.crossfade_ms / 1000,
+                volume=audio_config.volume,
+                backend=backend,
+                rate=rate,
+                loudness=loudness_normalizer(audio_config),
+            ).start()
+            logger.info("Audio output open at %d Hz", sample_rate)
+        except Exception as e:
+            _output_failed = True
+            logger.warning("Audio output unavailable, falling back to file playback: %s", str(e))
+        return _output
+
+
+def get_output() -> Optional[AudioOutput]:
+    """The shared audio output, opened from config on first use (None if unavailable)."""
+    if _output is None and not _output_failed:
+        from config_utils import get_config
+        config = get_config()
+        return configure_audio(config.audio, rate=playback_rate(config))
+    return _output
+
+
+def loudness_normalizer(audio_config) -> Optional[LoudnessNormalizer]:
+    """The normalizer configured in the ``audio`` section (None if ``normalize`` is off)."""
+    if not audio_config.normalize:
+        return None
+    return LoudnessNormalizer(audio_config.target_lufs, audio_config.limiter_ceiling_db, audio_config.max_gain_db)
+
+
+def playback_rate(config) -> float:
+    """Speaking rate the output applies at play time (1.0 unless ``audio.time_stretch``)."""
+    return config.voice.rate if config.audio.time_stretch else 1.0
+
+
+def synthesis_rate(config, rate: Optional[float] = None) -> float:
+    """
+    Speaking rate to request from a TTS engine.
+
+    When the output applies ``voice.rate`` at play time, engines render at
+    normal speed so one rendering serves every rate, and an explicit rate is
+    requested relative to the play-time one. Without an output device (file
+    playback can't be stretched) the rate is requested from the engine.
+
+    Args:
+        config: Application configuration
+        rate: Explicit speaking rate (overrides ``voice.rate``)
+    """
+    output = get_output() if config.audio.time_stretch else None
+    if output is None:
+        return rate if rate is not None else config.voice.rate
+    return rate / output.rate if rate is not None else 1.0
+
+
+def wait_for_audio(timeout: Optional[float] = None) -> bool:
+    """Block until queued speech has finished playing (e.g. before listening)."""
+    output = _output
+    return output.wait_idle(timeout) if output is not None else True
+
+
+def play_file(audio: bytes, fmt: str) -> None:
+    """Play encoded audio through a temporary file, blocking until done."""
+    from playsound import playsound
+
+    temp_file = Path(tempfile.gettempdir()) / f"cortex_tts_{uuid.uuid4().hex}.{fmt}"
+    try:
+        temp_file.write_bytes(audio)
+        playsound(str(temp_file))
+    finally:
+        try:
+            temp_file.unlink()
+        except OSError as e:
+            logger.warning("Failed to remove temporary file %s: %s", temp_file, str(e))
+
+
+def play_clip(clip: PCMClip) -> Optional[Playback]:
+    """
+    Queue a decoded clip on the shared output.
+
+    Without an output device backend the clip is played from a temporary WAV
+    file instead, blocking until it finishes.
+
+    Returns:
+        The playback handle, or None if it was played synchronously
+    """
+    output = get_output()
+    if output is not None:
+        return output.submit(clip)
+    from config_utils import get_config
+    normalizer = loudness_normalizer(get_config().audio)
+    play_file(encode_wav(normalizer(clip) if normalizer is not None else clip), "wav")
+    return None
@@ -0,0 +1,145 @@
+"""Decoded audio helpers for Cortex Desktop Assistant.
+
+Audio is held as ``PCMClip``: float32 samples in [-1, 1] with their sample
+rate, ready to be played without further decoding. Compressed engine output
+(MP3) is decoded with FFmpeg; WAV is read directly.
+"""
+
+import io
+import shutil
+import subprocess
+import wave
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+# Sample rate clips are decoded to unless told otherwise
+DEFAULT_SAMPLE_RATE = 24000
+
+
+class AudioError(Exception):
+    """Exception raised when audio cannot be decoded or played."""
+    pass
+
+
+@dataclass
+class PCMClip:
+    """Decoded audio: float32 samples shaped (frames,) or (frames, channels)."""
+
+    samples: np.ndarray
+    sample_rate: int
+    # Loudness normalization gain already applied to the samples (None if not normalized)
+    gain: Optional[float] = None
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.samples.ndim == 1 else self.samples.shape[1]
+
+    @property
+    def frames(self) -> int:
+        return self.samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        """Length in seconds."""
+        return self.frames / self.sample_rate
+
+
+def decode_wav(data: bytes) -> PCMClip:
+    """
+    Decode 16-bit PCM WAV bytes.
+
+    Args:
+        data: WAV file contents
+
+    Returns:
+        The decoded clip
+
+    Raises:
+        AudioError: If the data is not 16-bit PCM WAV
+    """
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise AudioError(f"Unsupported WAV sample width: {wav.getsampwidth() * 8} bits")
+            channels = wav.getnchannels()
+            sample_rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioError(f"Invalid WAV data: {e}") from e
+    samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    return PCMClip(samples, sample_rate)
+
+
+def decode_audio(data: bytes, fmt: str = "mp3", sample_rate: int = DEFAULT_SAMPLE_RATE) -> PCMClip:
+    """
+    Decode engine output to PCM.
+
+    Args:
+        data: Encoded audio
+        fmt: Container format ("wav", "mp3", ...)
+        sample_rate: Rate to decode compressed formats to
+
+    Returns:
+        The decoded clip (mono for compressed formats)
+
+    Raises:
+        AudioError: If the audio can't be decoded (e.g. FFmpeg is missing)
+    """
+    if fmt == "wav":
+        return decode_wav(data)
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise AudioError("FFmpeg is required to decode compressed audio")
+    result = subprocess.run(
+        [ffmpeg, "-v", "error", "-f", fmt, "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+        input=data,
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise AudioError(f"FFmpeg failed to decode {fmt}: {result.stderr.decode(errors='replace').strip()}")
+    return PCMClip(np.frombuffer(result.stdout, dtype="<f4").copy(), sample_rate)
+
+
+def encode_wav(clip: PCMClip) -> bytes:
+    """
+    Encode a clip as 16-bit PCM WAV.
+
+    Args:
+        clip: The clip to encode
+
+    Returns:
+        WAV file contents
+    """
+    pcm = (np.clip(clip.samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(clip.channels)
+        wav.setsampwidth(2)
+        wav.setframerate(clip.sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def join_audio(parts: List[bytes], fmt: str) -> bytes:
+    """
+    Concatenate encoded audio rendered piece by piece (e.g. one sentence at a time).
+
+    MP3 streams are joined frame for frame; WAV files are decoded and
+    re-encoded as one file.
+
+    Args:
+        parts: Encoded audio of each piece, in order
+        fmt: Container format of the parts
+
+    Returns:
+        The joined audio
+    """
+    if len(parts) == 1 or fmt != "wav":
+        return b"".join(parts)
+    clips = [decode_wav(part) for part in parts]
+    return encode_wav(PCMClip(np.concatenate([clip.samples for clip in clips]), clips[0].sample_rate))
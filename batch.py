@@ -0,0 +1,313 @@
+"""Batch mode for Cortex Desktop Assistant.
+
+Reads prompts as JSONL (from a file or stdin), answers them concurrently with
+the same routing, search and LLM path as the interactive modes, optionally
+renders each reply to an audio file, and writes one JSONL result per prompt
+with per-item timings. Audio is rendered one sentence at a time at ``bulk``
+priority, so a batch running alongside a live session yields to it between
+sentences.
+
+Each input line is either a JSON string or an object with a ``text`` (or
+``prompt``) field and optional ``id`` and ``audio`` fields; ``audio`` may be
+``true`` or an output file name. Input is read as it is processed, with a
+bounded number of prompts in flight, so large files and stdin are streamed;
+a line that can't be parsed gets an error result and the rest carry on.
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from assistant import Assistant
+from audio_utils import join_audio
+from config_utils import AppConfig, get_config
+from logger import configure_logging, get_logger
+from metrics import TURNS_IN_FLIGHT, configure_metrics
+from retrieval import iter_sentences
+from tracing import configure_tracing, turn
+from tts_scheduler import BULK, priority
+from tts_utils import AUDIO_FORMATS, get_synthesizer, preprocess_for_tts, synthesize_shared
+from usage import configure_usage
+
+# Initialize logger
+logger = get_logger("batch")
+
+
+@dataclass
+class BatchItem:
+    """One prompt to process."""
+
+    index: int
+    id: str
+    text: str
+    audio: Any = None
+    error: Optional[str] = None
+
+
+def read_items(stream: IO[str], strict: bool = True) -> Iterator[BatchItem]:
+    """
+    Parse prompts from a JSONL stream.
+
+    Args:
+        stream: Text stream with one JSON value per line
+        strict: Raise on a bad line; otherwise yield it as an item with ``error`` set
+
+    Yields:
+        BatchItem: Parsed prompts; blank lines are skipped
+
+    Raises:
+        ValueError: If ``strict`` and a line is not valid JSON or has no text
+    """
+    index = 0
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        data: Any = None
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            error = f"Line {line_number}: invalid JSON: {e}"
+        else:
+            if isinstance(data, str):
+                data = {"text": data}
+            text = str(data.get("text") or data.get("prompt") or "").strip() if isinstance(data, dict) else ""
+            error = None if text else f"Line {line_number}: missing 'text'"
+        item_id = str(data.get("id", index)) if isinstance(data, dict) else str(index)
+        if error is None:
+            yield BatchItem(index, item_id, text, data.get("audio"))
+        elif strict:
+            raise ValueError(error)
+        else:
+            yield BatchItem(index, item_id, "", error=error)
+        index += 1
+
+
+class BatchRunner:
+    """Process prompts concurrently and collect results."""
+
+    def __init__(
+        self,
+        config: AppConfig,
+        assistant: Optional[Assistant] = None,
+        synthesize: Optional[Callable[..., bytes]] = None,
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            config: Application configuration
+            assistant: Assistant to answer with (built from config if omitted)
+            synthesize: Function rendering text to audio bytes (the configured
+                engine's if omitted)
+        """
+        self.config = config
+        self.batch_config = config.batch
+        self.assistant = assistant or Assistant(config, mode="batch")
+        self.engine = (self.batch_config.engine or config.voice.engine).lower()
+        self._synthesize = synthesize
+        self.audio_dir = Path(self.batch_config.audio_dir) if self.batch_config.audio_dir else None
+
+    @property
+    def synthesize(self) -> Callable[..., bytes]:
+        if self._synthesize is None:
+            self._synthesize = get_synthesizer(self.engine)
+        return self._synthesize
+
+    def process(self, item: BatchItem) -> Dict[str, Any]:
+        """
+        Answer one prompt and optionally render it to audio.
+
+        Args:
+            item: The prompt
+
+        Returns:
+            The JSON-serializable result, including timings in milliseconds
+        """
+        if item.error is not None:
+            logger.error("Batch item %s skipped: %s", item.id, item.error)
+            return {"id": item.id, "error": item.error, "timings": {}}
+        TURNS_IN_FLIGHT.inc()
+        try:
+            with turn(f"batch-{item.id}"):
+                return self._process(item)
+        finally:
+            TURNS_IN_FLIGHT.dec()
+
+    def _process(self, item: BatchItem) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"id": item.id, "text": item.text}
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        try:
+            response = self.assistant.respond(item.text)
+            timings["respond_ms"] = _ms(start)
+            reply = response.reply
+            if reply is not None and not isinstance(reply, str):
+                reply = "".join(reply)
+            timings["reply_ms"] = _ms(start)
+            result.update(intent=response.intent, reply=reply or "")
+
+            audio_path = self._audio_path(item)
+            if audio_path is not None and reply:
+                tts_start = time.perf_counter()
+                with priority(BULK):
+                    audio = join_audio([
+                        synthesize_shared(self.engine, self.synthesize, preprocess_for_tts(sentence, self.engine))
+                        for sentence in iter_sentences([reply])
+                    ], AUDIO_FORMATS.get(self.engine, "mp3"))
+                audio_path.parent.mkdir(parents=True, exist_ok=True)
+                audio_path.write_bytes(audio)
+                timings["tts_ms"] = _ms(tts_start)
+                result["audio_path"] = str(audio_path)
+        except Exception as e:
+            logger.error("Batch item %s failed: %s", item.id, str(e))
+            result["error"] = str(e)
+        timings["total_ms"] = _ms(start)
+        result["timings"] = timings
+        return result
+
+    def _audio_path(self, item: BatchItem) -> Optional[Path]:
+        wanted = item.audio if item.audio is not None else self.audio_dir is not None
+        if not wanted:
+            return None
+        directory = self.audio_dir or Path("batch_audio")
+        if isinstance(wanted, str):
+            # Input is untrusted: a bare file name inside the audio directory only
+            if Path(wanted).name != wanted or wanted in ("", ".", ".."):
+                raise ValueError(f"Audio file name must not contain a path: {wanted!r}")
+            path = directory / wanted
+            if not path.resolve().is_relative_to(directory.resolve()):
+                raise ValueError(f"Audio file name must not contain a path: {wanted!r}")
+            return path
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in item.id)
+        return directory / f"{safe_id}.{AUDIO_FORMATS.get(self.engine, 'mp3')}"
+
+    def run(self, items: Iterator[BatchItem], output: IO[str]) -> Dict[str, Any]:
+        """
+        Process all items and write results as JSONL in input order.
+
+        Items are read as they are needed: at most twice ``concurrency``
+        prompts are in flight, and each result is written as soon as the
+        ones before it are done.
+
+        Args:
+            items: Prompts to process
+            output: Stream to write one JSON result per line to
+
+        Returns:
+            Summary with item/error counts, wall time, throughput and latency percentiles
+        """
+        start = time.perf_counter()
+        latencies: List[float] = []
+        count = errors = 0
+        window = max(1, self.batch_config.concurrency) * 2
+        pending: Deque[Future] = deque()
+
+        def write_next() -> None:
+            nonlocal count, errors
+            result = pending.popleft().result()
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            count += 1
+            errors += "error" in result
+            if "total_ms" in result["timings"]:
+                latencies.append(result["timings"]["total_ms"])
+
+        with ThreadPoolExecutor(
+            max_workers=self.batch_config.concurrency, thread_name_prefix="cortex-batch"
+        ) as executor:
+            for item in items:
+                if len(pending) >= window:
+                    write_next()
+                pending.append(executor.submit(self.process, item))
+            while pending:
+                write_next()
+
+        wall = time.perf_counter() - start
+        latencies.sort()
+        summary = {
+            "items": count,
+            "errors": errors,
+            "wall_s": round(wall, 3),
+            "items_per_s": round(count / wall, 3) if wall else 0.0,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "max_ms": latencies[-1] if latencies else 0.0,
+        }
+        logger.info("Batch finished: %s", summary)
+        return summary
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def run_batch(config: AppConfig) -> Dict[str, Any]:
+    """
+    Run batch mode using the ``batch`` section of the configuration.
+
+    Logging, tracing, metrics and usage accounting are configured by the
+    entry point (``main.py`` or ``python batch.py``), once per process.
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        The run summary
+    """
+    batch_config = config.batch
+    runner = BatchRunner(config)
+
+    source = sys.stdin if batch_config.input in (None, "-") else open(batch_config.input, encoding="utf-8")
+    sink = sys.stdout if batch_config.output in (None, "-") else open(batch_config.output, "w", encoding="utf-8")
+    try:
+        summary = runner.run(read_items(source, strict=False), sink)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    print(json.dumps(summary), file=sys.stderr)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: ``python batch.py prompts.jsonl -o results.jsonl``."""
+    parser = argparse.ArgumentParser(description="Process a JSONL file of prompts")
+    parser.add_argument("input", nargs="?", default="-", help="Input JSONL file ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Output JSONL file ('-' for stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, help="Prompts processed at once")
+    parser.add_argument("--audio-dir", help="Render each reply to an audio file in this directory")
+    parser.add_argument("--engine", help="TTS engine for audio files (defaults to voice.engine)")
+    args = parser.parse_args(argv)
+
+    config = get_config()
+    config.batch.input = args.input
+    config.batch.output = args.output
+    if args.concurrency:
+        config.batch.concurrency = args.concurrency
+    if args.audio_dir:
+        config.batch.audio_dir = args.audio_dir
+    if args.engine:
+        config.batch.engine = args.engine
+    configure_logging(config.logging)
+    configure_tracing(config.tracing)
+    configure_metrics(config.metrics)
+    configure_usage(config.usage)
+    run_batch(config)
+
+
+if __name__ == "__main__":
+    main()
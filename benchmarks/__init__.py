@@ -0,0 +1 @@
+"""Benchmarks for Cortex Desktop Assistant."""
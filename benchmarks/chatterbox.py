@@ -0,0 +1,97 @@
+"""Chatterbox real-time factor benchmark.
+
+Loads Chatterbox once per precision, generates a fixed set of sentences and
+reports the real-time factor (seconds spent generating per second of audio;
+below 1.0 is faster than real time) for each setting as JSON, so the effect of
+int8 quantization and thread counts can be compared on the target host.
+
+Usage:
+    python -m benchmarks.chatterbox --precision fp32 int8 --output rtf.json
+    python -m benchmarks.chatterbox --device cpu --threads 4 --precision int8
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.latency import git_commit, percentiles
+
+SENTENCES = [
+    "Good morning.",
+    "It's currently twelve degrees and cloudy in Paris.",
+    "I found three results for pizza places near you; the closest one opens at eleven.",
+    "Here's a short answer: recursion is when a function solves a problem by calling itself on a smaller piece of it.",
+]
+
+
+def measure(model, sentences: List[str], repeats: int, exaggeration: float, cfg_weight: float) -> Dict[str, Any]:
+    """Generate each sentence ``repeats`` times and summarize the real-time factors."""
+    import torch
+
+    rtfs, generated, audio = [], 0.0, 0.0
+    for _ in range(repeats):
+        for text in sentences:
+            start = time.perf_counter()
+            with torch.inference_mode():
+                waveform, sample_rate = model.generate(text=text, exaggeration=exaggeration, cfg_weight=cfg_weight)
+            elapsed = time.perf_counter() - start
+            seconds = waveform.shape[-1] / sample_rate
+            rtfs.append(elapsed / seconds)
+            generated += elapsed
+            audio += seconds
+    return {
+        "rtf": percentiles(rtfs),
+        "overall_rtf": round(generated / audio, 3),
+        "audio_seconds": round(audio, 2),
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    import torch
+
+    from chatterbox_tts_module import configure_cpu, load_model
+
+    device = args.device if args.device != "auto" else ("cuda" if torch.cuda.is_available() else "cpu")
+    threads = configure_cpu(args.threads, args.interop_threads, args.pin) if device == "cpu" else None
+    results = {}
+    for precision in args.precision:
+        start = time.perf_counter()
+        model = load_model(device, precision)
+        load_seconds = time.perf_counter() - start
+        # Warm-up so lazy initialization is not attributed to the first sentence
+        measure(model, SENTENCES[:1], 1, args.exaggeration, args.cfg_weight)
+        results[precision] = {
+            "load_seconds": round(load_seconds, 2),
+            **measure(model, SENTENCES, args.repeats, args.exaggeration, args.cfg_weight),
+        }
+        del model
+    return {
+        "meta": {"commit": git_commit(), "device": device, "threads": threads, "args": vars(args)},
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Chatterbox real-time factor benchmark")
+    parser.add_argument("--device", default="auto", choices=["auto", "cuda", "cpu"])
+    parser.add_argument("--precision", nargs="+", default=["fp32", "int8"], choices=["fp32", "int8"])
+    parser.add_argument("--threads", type=int, help="Intra-op threads (default: one per physical core)")
+    parser.add_argument("--interop-threads", type=int, help="Inter-op threads (default: 1)")
+    parser.add_argument("--pin", action="store_true", help="Pin to one logical CPU per physical core")
+    parser.add_argument("--repeats", type=int, default=2, help="Times each sentence is generated")
+    parser.add_argument("--exaggeration", type=float, default=0.5)
+    parser.add_argument("--cfg-weight", type=float, default=0.5)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(json.dumps(report["results"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
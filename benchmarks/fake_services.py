@@ -0,0 +1,236 @@
+"""Local stand-ins for the Groq, Brave and TTS services used in benchmarks.
+
+Each fake is a small threaded HTTP server that answers in the real service's
+wire format after a delay drawn from a configurable latency distribution.
+
+Distributions are written as ``kind:args`` strings (milliseconds):
+    fixed:120             always 120 ms
+    uniform:80:200        uniformly between 80 and 200 ms
+    normal:150:30         mean 150 ms, standard deviation 30 ms
+    lognormal:120:0.4     median 120 ms, log-space sigma 0.4
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class LatencyDistribution:
+    """Random delays parsed from a ``kind:args`` spec."""
+
+    def __init__(self, spec: str, seed: Optional[int] = None):
+        self.spec = spec
+        kind, *args = spec.split(":")
+        values = [float(a) for a in args]
+        self._rng = random.Random(seed)
+        samplers = {
+            "fixed": lambda: values[0],
+            "uniform": lambda: self._rng.uniform(values[0], values[1]),
+            "normal": lambda: self._rng.gauss(values[0], values[1]),
+            "lognormal": lambda: values[0] * math.exp(self._rng.gauss(0, values[1])),
+        }
+        if kind not in samplers:
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self._sample: Callable[[], float] = samplers[kind]
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Draw a delay in seconds."""
+        with self._lock:
+            return max(0.0, self._sample()) / 1000
+
+    def sleep(self) -> None:
+        time.sleep(self.sample())
+
+
+class FakeService:
+    """Base class running a request handler on a background HTTP server."""
+
+    def __init__(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                service.handle(self)
+
+            def do_POST(self):
+                service.handle(self)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Clients dropping keep-alive connections at shutdown aren't errors
+                pass
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.requests = 0
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeService":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        raise NotImplementedError
+
+    @staticmethod
+    def read_json(request: BaseHTTPRequestHandler) -> dict:
+        length = int(request.headers.get("Content-Length") or 0)
+        return json.loads(request.rfile.read(length) or b"{}")
+
+    @staticmethod
+    def send_json(request: BaseHTTPRequestHandler, data: dict) -> None:
+        body = json.dumps(data).encode()
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    @staticmethod
+    def send_chunk(request: BaseHTTPRequestHandler, data: bytes) -> None:
+        request.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        request.wfile.flush()
+
+    @staticmethod
+    def end_chunks(request: BaseHTTPRequestHandler) -> None:
+        request.wfile.write(b"0\r\n\r\n")
+        request.wfile.flush()
+
+
+class FakeGroq(FakeService):
+    """OpenAI-compatible chat completions, streaming (SSE) and non-streaming.
+
+    Point ``GROQ_API_URL`` at :attr:`url`.
+    """
+
+    REPLY = (
+        "Ah, a question I have clearly been waiting my whole life for. "
+        "The short answer is yes, and the long answer is also yes, just slower. "
+        "You're welcome."
+    )
+
+    def __init__(self, first_token: str = "lognormal:250:0.3", per_token: str = "fixed:8", seed: int = 1):
+        super().__init__()
+        self.first_token = LatencyDistribution(first_token, seed)
+        self.per_token = LatencyDistribution(per_token, seed)
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        self.requests += 1
+        body = self.read_json(request)
+        tokens = [t + " " for t in self.REPLY.split(" ")]
+        self.first_token.sleep()
+        if not body.get("stream"):
+            for _ in tokens[1:]:
+                self.per_token.sleep()
+            self.send_json(request, {"choices": [{"message": {"content": self.REPLY}}]})
+            return
+
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream")
+        request.send_header("Transfer-Encoding", "chunked")
+        request.end_headers()
+        for i, token in enumerate(tokens):
+            if i:
+                self.per_token.sleep()
+            event = {"choices": [{"delta": {"content": token}}]}
+            self.send_chunk(request, f"data: {json.dumps(event)}\n\n".encode())
+        self.send_chunk(request, b"data: [DONE]\n\n")
+        self.end_chunks(request)
+
+
+class FakeBrave(FakeService):
+    """Brave web search API. Point ``BRAVE_API_URL`` at :attr:`url`."""
+
+    def __init__(self, latency: str = "lognormal:180:0.4", seed: int = 2):
+        super().__init__()
+        self.latency = LatencyDistribution(latency, seed)
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        self.requests += 1
+        query = parse_qs(urlparse(request.path).query)
+        q = query.get("q", [""])[0]
+        count = int(query.get("count", ["3"])[0])
+        self.latency.sleep()
+        results = [
+            {
+                "title": f"Result {i + 1} for {q}",
+                "description": f"Everything you wanted to know about {q}, part {i + 1}. " * 3,
+                "url": f"https://example.com/{i + 1}",
+            }
+            for i in range(count)
+        ]
+        self.send_json(request, {"web": {"results": results}})
+
+
+class FakeTTS(FakeService):
+    """Text-to-speech endpoint streaming fake MP3 bytes.
+
+    ``POST /synthesize`` with ``{"text": ...}`` streams roughly 6 kB of audio per
+    second of speech (at ~15 characters per second), sending the first chunk
+    after the first-audio delay and the rest in real-time-fraction bursts.
+    """
+
+    BYTES_PER_SECOND = 6000
+    CHARS_PER_SECOND = 15
+
+    def __init__(self, first_audio: str = "lognormal:200:0.3", realtime_factor: float = 0.1, seed: int = 3):
+        super().__init__()
+        self.first_audio = LatencyDistribution(first_audio, seed)
+        self.realtime_factor = realtime_factor
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        self.requests += 1
+        text = self.read_json(request).get("text", "")
+        seconds = max(0.5, len(text) / self.CHARS_PER_SECOND)
+        chunks = max(1, int(seconds * 4))
+        chunk = b"\xff\xfb" + bytes(int(self.BYTES_PER_SECOND * seconds / chunks) - 2)
+
+        request.send_response(200)
+        request.send_header("Content-Type", "audio/mpeg")
+        request.send_header("Transfer-Encoding", "chunked")
+        request.end_headers()
+        self.first_audio.sleep()
+        for i in range(chunks):
+            if i:
+                time.sleep(seconds * self.realtime_factor / chunks)
+            self.send_chunk(request, chunk)
+        self.end_chunks(request)
+
+
+# Latency profiles approximating the real TTS providers
+TTS_PROFILES = {
+    "edge": {"first_audio": "lognormal:350:0.35", "realtime_factor": 0.15},
+    "google": {"first_audio": "lognormal:220:0.25", "realtime_factor": 0.05},
+}
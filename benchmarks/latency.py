@@ -0,0 +1,236 @@
+"""End-to-end turn latency benchmark against local fake services.
+
+Starts fake Groq, Brave and TTS servers (see :mod:`benchmarks.fake_services`),
+points Cortex at them and drives full turns through the same path as the CLI:
+routing, search, LLM (streaming and non-streaming), sentence splitting and
+synthesis on a separate speaker thread. Reports time to first token, time to
+first audio, turn latency percentiles and throughput as JSON.
+
+Usage:
+    python -m benchmarks.latency --turns 60 --concurrency 4 --output bench.json
+    python -m benchmarks.latency --compare bench.json   # compare against a baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import queue
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_services import TTS_PROFILES, FakeBrave, FakeGroq, FakeTTS
+
+# Mix of turn types: plain chat (non-streaming LLM), search (streamed grounded
+# answer) and local plugin intents
+PROMPTS = [
+    "tell me something interesting about octopuses",
+    "search for the tallest building in europe",
+    "what time is it",
+    "why is the sky blue",
+    "look up python release schedule",
+    "explain recursion like I'm five",
+]
+
+METRICS = ("ttft_ms", "ttfa_ms", "turn_ms")
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Summarize samples as mean/p50/p90/p99/max."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": round(pct(50), 2),
+        "p90": round(pct(90), 2),
+        "p99": round(pct(99), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+class TurnDriver:
+    """Runs one turn end to end and records its timings."""
+
+    def __init__(self, assistant, tts_url: str):
+        import requests
+
+        from retrieval import split_sentences
+
+        self.assistant = assistant
+        self.tts_url = tts_url
+        self._split = split_sentences
+        self._session = requests.Session()
+
+    def synthesize(self, text: str, mark_first_audio) -> None:
+        with self._session.post(f"{self.tts_url}/synthesize", json={"text": text}, stream=True) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=None):
+                if chunk:
+                    mark_first_audio()
+
+    def run(self, prompt: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        marks: Dict[str, float] = {}
+
+        def mark(name: str) -> None:
+            marks.setdefault(name, (time.perf_counter() - start) * 1000)
+
+        sentences: "queue.Queue[Optional[str]]" = queue.Queue()
+
+        def speaker() -> None:
+            while True:
+                sentence = sentences.get()
+                if sentence is None:
+                    return
+                self.synthesize(sentence, lambda: mark("ttfa_ms"))
+
+        thread = threading.Thread(target=speaker, daemon=True)
+        thread.start()
+
+        response = self.assistant.respond(prompt)
+        reply = response.reply
+        chunks = [reply] if isinstance(reply, str) else (reply or [])
+        buffer = ""
+        for chunk in chunks:
+            mark("ttft_ms")
+            complete, buffer = self._split(buffer + chunk)
+            for sentence in complete:
+                sentences.put(sentence)
+        if buffer.strip():
+            sentences.put(buffer.strip())
+        sentences.put(None)
+        thread.join()
+        mark("turn_ms")
+        return {"prompt": prompt, "intent": response.intent, **marks}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the fakes, run the turns and return the report."""
+    tts_profile = dict(TTS_PROFILES[args.tts])
+    if args.tts_first_audio:
+        tts_profile["first_audio"] = args.tts_first_audio
+
+    with FakeGroq(args.groq_first_token, args.groq_per_token) as groq, \
+            FakeBrave(args.brave_latency) as brave, \
+            FakeTTS(**tts_profile) as tts:
+        os.environ.update(
+            GROQ_API_URL=groq.url,
+            GROQ_API_KEY="benchmark",
+            BRAVE_API_URL=f"{brave.url}/res/v1/web/search",
+            BRAVE_API_KEY="benchmark",
+        )
+        # Import after the environment points at the fakes
+        import web_search
+        from assistant import Assistant
+        from config_utils import AppConfig
+
+        config = AppConfig(search={
+            "providers": ["brave"],
+            "grounding": args.grounding,
+            "cache_ttl": 600 if args.cache else 0,
+        })
+        web_search.configure_search(config.search)
+        driver = TurnDriver(Assistant(config, mode="cli"), tts.url)
+
+        # Warm-up turn so connection setup isn't attributed to the first sample
+        driver.run(PROMPTS[0])
+
+        prompts = [PROMPTS[i % len(PROMPTS)] for i in range(args.turns)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            turns = list(executor.map(driver.run, prompts))
+        wall = time.perf_counter() - start
+        upstream = {"groq": groq.requests, "brave": brave.requests, "tts": tts.requests}
+
+    summary: Dict[str, Any] = {
+        metric: percentiles([t[metric] for t in turns if metric in t]) for metric in METRICS
+    }
+    summary["throughput_turns_per_s"] = round(len(turns) / wall, 3)
+    summary["by_intent"] = {
+        intent: {
+            metric: percentiles([t[metric] for t in turns if t["intent"] == intent and metric in t])
+            for metric in METRICS
+        }
+        for intent in sorted({t["intent"] for t in turns})
+    }
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+            "upstream_requests": upstream,
+        },
+        "summary": summary,
+        "turns": turns,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    """Format p50/p99 changes against a baseline report."""
+    lines = [f"{'metric':<10}{'stat':<6}{'baseline':>12}{'current':>12}{'change':>10}"]
+    for metric in METRICS:
+        for stat in ("p50", "p99"):
+            old = baseline["summary"].get(metric, {}).get(stat)
+            new = report["summary"].get(metric, {}).get(stat)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            lines.append(f"{metric:<10}{stat:<6}{old:>12.1f}{new:>12.1f}{change:>+9.1f}%")
+    old_tp = baseline["summary"]["throughput_turns_per_s"]
+    new_tp = report["summary"]["throughput_turns_per_s"]
+    lines.append(f"throughput: {old_tp} -> {new_tp} turns/s")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Cortex end-to-end latency benchmark")
+    parser.add_argument("--turns", type=int, default=30, help="Number of measured turns")
+    parser.add_argument("--concurrency", type=int, default=1, help="Turns run at the same time")
+    parser.add_argument("--grounding", default="triggers", choices=["off", "triggers", "always"])
+    parser.add_argument("--cache", action="store_true", help="Enable the search result cache")
+    parser.add_argument("--tts", default="edge", choices=sorted(TTS_PROFILES), help="TTS latency profile")
+    parser.add_argument("--tts-first-audio", help="Override the TTS first-audio distribution")
+    parser.add_argument("--groq-first-token", default="lognormal:250:0.3")
+    parser.add_argument("--groq-per-token", default="fixed:8")
+    parser.add_argument("--brave-latency", default="lognormal:180:0.4")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(json.dumps(report["summary"], indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print(compare(report, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Wake word and speech recognition benchmark over recorded sessions.
+
+Replays a corpus of WAV sessions through the same capture path as wake mode
+(:class:`audio_input.WavSource` into the continuous capture ring, VAD
+end-pointing, recognition and intent routing) and reports wake word detection
+latency, false accepts, missed wake words, recognition latency and CPU usage
+as JSON.
+
+A corpus is a directory with a ``corpus.jsonl`` manifest, one session per line,
+labelling when each utterance was spoken:
+    {"audio": "kitchen.wav", "utterances": [{"start": 1.2, "end": 2.0, "text": "hey cortex"}]}
+
+Recognition uses Google (``--recognizer google``, needs network access and
+``speech_recognition``) or, by default, a stand-in that answers with the
+labelled text of the utterance a segment overlaps after a delay drawn from
+``--stt-latency``, so runs are deterministic and work offline. ``--make-corpus``
+writes a synthetic corpus of tone bursts for headless boxes without recordings.
+
+Usage:
+    python -m benchmarks.wake --make-corpus corpus/
+    python -m benchmarks.wake corpus/ --fast --output wake.json
+    python -m benchmarks.wake corpus/ --fast --compare wake.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import wave
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.fake_services import LatencyDistribution
+from benchmarks.latency import git_commit, percentiles
+
+MANIFEST = "corpus.jsonl"
+METRICS = ("wake_latency_ms", "stt_ms", "endpoint_ms")
+
+# Phrases for the synthetic corpus: wake words, commands and near misses
+CORPUS_PHRASES = [
+    "hey cortex",
+    "hey cortex what time is it",
+    "what's the weather like",
+    "hey vortex",
+    "search for pizza near me",
+    "turn it down a bit",
+    "hey cortana",
+]
+
+
+class UnrecognizedSpeech(Exception):
+    """Exception raised when a segment overlaps no labelled utterance."""
+    pass
+
+
+def load_corpus(directory: str) -> List[Dict[str, Any]]:
+    """Read the corpus manifest, resolving audio paths against the directory."""
+    sessions = []
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                session = json.loads(line)
+                session["audio"] = os.path.join(directory, session["audio"])
+                sessions.append(session)
+    return sessions
+
+
+def make_corpus(directory: str, sessions: int = 4, phrases: int = 12, seed: int = 0, rate: int = 16000) -> None:
+    """
+    Write a synthetic corpus: harmonic tone bursts standing in for speech, about
+    0.3 s per word, separated by quiet noise.
+    """
+    rng = random.Random(seed)
+    noise = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as manifest:
+        for index in range(sessions):
+            pieces, utterances, position = [], [], 0.0
+            for _ in range(phrases):
+                gap = rng.uniform(0.8, 2.0)
+                text = rng.choice(CORPUS_PHRASES)
+                length = 0.3 * len(text.split())
+                t = np.arange(int(length * rate)) / rate
+                pitch = rng.uniform(110, 220)
+                voiced = 0.2 * sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+                pieces += [0.001 * noise.standard_normal(int(gap * rate)), voiced]
+                start = position + int(gap * rate) / rate
+                position = start + len(t) / rate
+                utterances.append({"start": round(start, 3), "end": round(position, 3), "text": text})
+            pieces.append(0.001 * noise.standard_normal(2 * rate))
+            name = f"session{index:02d}.wav"
+            with wave.open(os.path.join(directory, name), "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(rate)
+                wav.writeframes((np.concatenate(pieces) * 32767).astype("<i2").tobytes())
+            manifest.write(json.dumps({"audio": name, "utterances": utterances}) + "\n")
+
+
+def label_for(utterances: List[Dict[str, Any]], start: float, end: float) -> Optional[Dict[str, Any]]:
+    """The labelled utterance overlapping a segment the most, if any."""
+    best, overlap = None, 0.0
+    for utterance in utterances:
+        shared = min(end, utterance["end"]) - max(start, utterance["start"])
+        if shared > overlap:
+            best, overlap = utterance, shared
+    return best
+
+
+def labelled_recognizer(latency: LatencyDistribution) -> Callable[[Dict[str, Any], float, float, bytes, int], str]:
+    """Recognizer stand-in answering with the labelled text after a simulated delay."""
+
+    def recognize(session, start, end, audio, sample_rate):
+        latency.sleep()
+        label = label_for(session["utterances"], start, end)
+        if label is None:
+            raise UnrecognizedSpeech(f"Nothing labelled between {start:.2f} and {end:.2f} s")
+        return label["text"]
+
+    return recognize
+
+
+def google_recognizer() -> Callable[[Dict[str, Any], float, float, bytes, int], str]:
+    import speech_recognition as sr
+
+    recognizer = sr.Recognizer()
+
+    def recognize(session, start, end, audio, sample_rate):
+        try:
+            return recognizer.recognize_google(sr.AudioData(audio, sample_rate, 2))
+        except sr.UnknownValueError as e:
+            raise UnrecognizedSpeech(str(e)) from e
+
+    return recognize
+
+
+def run_session(session: Dict[str, Any], recognize, config, realtime: bool) -> List[Dict[str, Any]]:
+    """Replay one session and return a record per captured segment plus missed wake words."""
+    from assistant import Assistant
+    from audio_input import CaptureError, MicrophoneCapture, WavSource
+    from vad import Endpointer, VADTimeout, VoiceActivityDetector, capture, pcm16_to_float
+    from web_search import normalize_query
+
+    wake_word = normalize_query(config.wake_word)
+    router = Assistant(config, mode="wake").router
+    source = WavSource(session["audio"], realtime=realtime)
+    rate = source.SAMPLE_RATE
+    # Replaying faster than real time must not lap the reader
+    mic = MicrophoneCapture(
+        lambda: source.stream.read(source.CHUNK),
+        rate,
+        seconds=config.capture.buffer_seconds if realtime else source.duration + 1,
+        chunk=source.CHUNK,
+    ).start()
+    cursor = mic.cursor()
+    vad = VoiceActivityDetector(rate, frame_ms=config.vad.frame_ms, threshold_db=config.vad.threshold_db)
+    vad.calibrate(pcm16_to_float(b"".join(cursor.read() for _ in range(max(1, int(config.vad.calibration * rate / source.CHUNK))))))
+    endpointer = Endpointer(
+        vad,
+        min_silence=config.vad.min_silence_ms / 1000,
+        max_silence=config.vad.max_silence_ms / 1000,
+        max_duration=config.vad.max_utterance,
+    )
+
+    records, detected = [], set()
+    try:
+        while True:
+            start = cursor.position
+            try:
+                utterance = capture(cursor.read, rate, endpointer, pre_speech=config.capture.pre_roll_ms / 1000)
+            except (CaptureError, VADTimeout):
+                break
+            end = start + utterance.end_offset
+            cursor.seek(end)
+            seg_end = end / rate
+            seg_start = seg_end - utterance.duration
+            record: Dict[str, Any] = {"start": round(seg_start, 3), "end": round(seg_end, 3),
+                                      "endpoint_ms": round(utterance.endpoint_delay * 1000, 1)}
+            label = label_for(session["utterances"], seg_start, seg_end)
+            expected = label is not None and wake_word in normalize_query(label["text"])
+            began = time.perf_counter()
+            try:
+                text = recognize(session, seg_start, seg_end, utterance.audio, rate)
+            except UnrecognizedSpeech:
+                text = ""
+            record["stt_ms"] = round((time.perf_counter() - began) * 1000, 1)
+            match = router.route(text.lower()) if text else None
+            woke = match is not None and match.name == "wake"
+            record.update(text=text, label=label["text"] if label else None, wake=woke, expected=expected)
+            if woke and expected:
+                detected.add(id(label))
+                # Audio after the wake word ended, plus recognition
+                record["wake_latency_ms"] = round((seg_end - label["end"]) * 1000 + record["stt_ms"], 1)
+            records.append(record)
+    finally:
+        mic.stop()
+
+    for label in session["utterances"]:
+        if wake_word in normalize_query(label["text"]) and id(label) not in detected:
+            records.append({"label": label["text"], "start": label["start"], "end": label["end"], "missed": True})
+    return records
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Replay the corpus and return the report."""
+    from config_utils import AppConfig
+
+    overrides = {"min_silence_ms": args.min_silence_ms, "max_silence_ms": args.max_silence_ms}
+    config = AppConfig(vad={k: v for k, v in overrides.items() if v is not None})
+    if args.recognizer == "google":
+        recognize = google_recognizer()
+    else:
+        recognize = labelled_recognizer(LatencyDistribution(args.stt_latency, seed=args.seed))
+
+    sessions = load_corpus(args.corpus)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    results = []
+    for session in sessions:
+        records = run_session(session, recognize, config, realtime=not args.fast)
+        results.append({"audio": os.path.basename(session["audio"]), "segments": records})
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    segments = [r for s in results for r in s["segments"]]
+    captured = [r for r in segments if not r.get("missed")]
+    wake_labels = sum(r.get("expected", False) for r in captured) + sum(r.get("missed", False) for r in segments)
+    negatives = [r for r in captured if not r["expected"]]
+    false_accepts = sum(r["wake"] for r in negatives)
+    audio_seconds = sum(_duration(s["audio"]) for s in sessions)
+
+    summary: Dict[str, Any] = {
+        metric: percentiles([r[metric] for r in captured if metric in r]) for metric in METRICS
+    }
+    summary.update({
+        "segments": len(captured),
+        "wake_words": wake_labels,
+        "missed": sum(r.get("missed", False) for r in segments),
+        "false_accepts": false_accepts,
+        "false_accept_rate": round(false_accepts / len(negatives), 4) if negatives else 0.0,
+        "false_accepts_per_hour": round(false_accepts / audio_seconds * 3600, 2) if audio_seconds else 0.0,
+        "audio_seconds": round(audio_seconds, 1),
+        "cpu_seconds": round(cpu, 2),
+        "cpu_percent": round(cpu / wall * 100, 1) if wall else 0.0,
+        # CPU time per second of audio processed (capture, VAD and routing)
+        "cpu_realtime_factor": round(cpu / audio_seconds, 4) if audio_seconds else 0.0,
+    })
+    return {
+        "meta": {"commit": git_commit(), "args": vars(args)},
+        "summary": summary,
+        "sessions": results,
+    }
+
+
+def _duration(path: str) -> float:
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    """Format changes in latency percentiles, error counts and CPU against a baseline report."""
+    lines = [f"{'metric':<24}{'baseline':>12}{'current':>12}"]
+    for metric in METRICS:
+        for stat in ("p50", "p90"):
+            old = baseline["summary"].get(metric, {}).get(stat)
+            new = report["summary"].get(metric, {}).get(stat)
+            if old is not None and new is not None:
+                lines.append(f"{metric + ' ' + stat:<24}{old:>12.1f}{new:>12.1f}")
+    for key in ("missed", "false_accepts", "cpu_realtime_factor"):
+        lines.append(f"{key:<24}{baseline['summary'][key]:>12}{report['summary'][key]:>12}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Cortex wake word and STT benchmark over recorded sessions")
+    parser.add_argument("corpus", nargs="?", help="Corpus directory containing corpus.jsonl")
+    parser.add_argument("--make-corpus", metavar="DIR", help="Write a synthetic corpus to DIR and exit")
+    parser.add_argument("--sessions", type=int, default=4, help="Sessions in a synthetic corpus")
+    parser.add_argument("--fast", action="store_true", help="Replay as fast as possible instead of in real time")
+    parser.add_argument("--recognizer", default="labels", choices=["labels", "google"])
+    parser.add_argument("--stt-latency", default="lognormal:400:0.3", help="Simulated recognition latency (labels recognizer)")
+    parser.add_argument("--min-silence-ms", type=float, help="Override vad.min_silence_ms")
+    parser.add_argument("--max-silence-ms", type=float, help="Override vad.max_silence_ms")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    if args.make_corpus:
+        make_corpus(args.make_corpus, sessions=args.sessions, seed=args.seed)
+        print(f"Wrote {args.sessions} sessions to {args.make_corpus}")
+        return
+    if not args.corpus:
+        parser.error("a corpus directory is required")
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(json.dumps(report["summary"], indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print(compare(report, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,33 @@
 """Chatterbox TTS module for Cortex Desktop Assistant.
 
 This module provides text-to-speech functionality using the Chatterbox TTS engine.
-It includes fallback to edge TTS if Chatterbox fails.
+Fallback to other engines is handled by the TTS manager.
+
+On CPU-only hosts generation is tuned for speed: torch runs one intra-op
+thread per physical core (hyperthread siblings only add contention), the
+process can be pinned to those cores, generation runs under
+``torch.inference_mode``, and ``precision: int8`` dynamically quantizes the
+linear layers of the token model, where most of the CPU time goes, trading a
+little quality for speed. ``python -m benchmarks.chatterbox`` reports the
+real-time factor of each setting.
 """
 
 import os
-import tempfile
-import uuid
-from pathlib import Path
-from typing import Optional, Tuple, cast
+import time
+from typing import List, Optional, Tuple, cast
 
+import numpy as np
 import torch
-import torchaudio as ta
 from chatterbox.tts import ChatterboxTTS
 
+from audio_output import play_clip
+from audio_utils import PCMClip, encode_wav
 from logger import get_logger
 from config_utils import get_config
+from time_stretch import time_stretch
+from tracing import span
+from tts_scheduler import get_scheduler
+from usage import record_usage
 
 # Initialize logger
 logger = get_logger("tts.chatterbox")
@@ -23,6 +35,97 @@ logger = get_logger("tts.chatterbox")
 # Initialize the model (lazy load on first use)
 _model: Optional[ChatterboxTTS] = None
 
+# Submodules quantized for int8 precision: the autoregressive token model
+QUANTIZED_MODULES = ("t3",)
+
+
+def physical_cores() -> List[int]:
+    """
+    Pick one logical CPU per physical core among those this process may use.
+
+    Returns:
+        Logical CPU ids (all usable CPUs if the topology is unknown)
+    """
+    usable = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    seen, cores = set(), []
+    for cpu in usable:
+        try:
+            with open(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list") as f:
+                siblings = f.read().strip()
+        except OSError:
+            return usable
+        if siblings not in seen:
+            seen.add(siblings)
+            cores.append(cpu)
+    return cores
+
+
+def configure_cpu(threads: Optional[int] = None, interop_threads: Optional[int] = None, pin: bool = False) -> int:
+    """
+    Set torch's CPU thread pools for generation.
+
+    Args:
+        threads: Intra-op threads (default: one per physical core)
+        interop_threads: Inter-op threads (default: 1, generation is sequential)
+        pin: Restrict the process to one logical CPU per physical core (Linux)
+
+    Returns:
+        The number of intra-op threads
+    """
+    cores = physical_cores()
+    threads = threads or len(cores)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(interop_threads or 1)
+    except RuntimeError as e:
+        # Only possible before the first parallel work in the process
+        logger.warning("Could not set inter-op threads: %s", str(e))
+    if pin and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores[:threads])
+        logger.info("Pinned to CPUs %s", cores[:threads])
+    return threads
+
+
+def quantize(model: ChatterboxTTS) -> ChatterboxTTS:
+    """
+    Dynamically quantize the token model's linear layers to int8 (CPU only).
+
+    Args:
+        model: A model loaded on the CPU
+
+    Returns:
+        The same model, with its quantized submodules swapped in
+    """
+    for name in QUANTIZED_MODULES:
+        module = getattr(model, name, None)
+        if isinstance(module, torch.nn.Module):
+            setattr(model, name, torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8))
+    return model
+
+
+def load_model(device: str = "auto", precision: str = "fp32") -> ChatterboxTTS:
+    """
+    Load the Chatterbox model.
+
+    Args:
+        device: auto, cuda or cpu
+        precision: fp32, or int8 to quantize on CPU
+
+    Returns:
+        The loaded model
+    """
+    if device == "auto":
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info("Loading Chatterbox model on %s device...", device.upper())
+    model = ChatterboxTTS.from_pretrained(device=device)
+    if precision == "int8":
+        if device == "cpu":
+            model = quantize(model)
+            logger.info("Quantized Chatterbox linear layers to int8")
+        else:
+            logger.warning("int8 precision is only used on CPU; keeping fp32 on %s", device)
+    return model
+
 
 def get_model() -> ChatterboxTTS:
     """
@@ -36,10 +139,15 @@ def get_model() -> ChatterboxTTS:
     """
     global _model
     if _model is None:
+        tts_config = get_config().chatterbox_tts
         try:
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            logger.info("Loading Chatterbox model on %s device...", device.upper())
-            _model = ChatterboxTTS.from_pretrained(device=device)
+            device = tts_config.device
+            if device == "auto":
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+            if device == "cpu":
+                threads = configure_cpu(tts_config.threads, tts_config.interop_threads, tts_config.pin_threads)
+                logger.info("Chatterbox using %d CPU threads", threads)
+            _model = load_model(device, tts_config.precision)
             logger.info("Chatterbox model loaded successfully")
         except Exception as e:
             logger.error("Failed to load Chatterbox model: %s", str(e), exc_info=True)
@@ -48,17 +156,34 @@ def get_model() -> ChatterboxTTS:
     return cast(ChatterboxTTS, _model)
 
 
+def to_clip(waveform: "torch.Tensor", sample_rate: int) -> PCMClip:
+    """
+    Convert a generated waveform to a playable clip.
+    
+    Args:
+        waveform: Tensor shaped (samples,) or (channels, samples)
+        sample_rate: Sample rate of the waveform
+        
+    Returns:
+        The clip, shaped (frames,) or (frames, channels)
+    """
+    samples = waveform.detach().to("cpu", torch.float32).numpy()
+    if samples.ndim > 1:
+        samples = samples[0] if samples.shape[0] == 1 else samples.T
+    return PCMClip(np.ascontiguousarray(samples), int(sample_rate))
+
+
 def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> None:
     """
-    Convert text to speech using Chatterbox TTS and play the resulting audio.
+    Convert text to speech using Chatterbox TTS and queue it for playback.
     
     Args:
         text: The text to be converted to speech
         voice: Not used in Chatterbox (kept for compatibility)
-        speaking_rate: Not used in Chatterbox (use cfg_weight in config instead)
+        speaking_rate: Speed multiplier, applied by time-stretching the generated audio
     
-    Note:
-        If Chatterbox TTS fails, it will attempt to fall back to edge TTS if available.
+    Raises:
+        RuntimeError: If speech generation or playback fails
     """
     if not text or not text.strip():
         logger.debug("Empty text provided, skipping TTS")
@@ -67,64 +192,83 @@ def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float]
     logger.debug("Generating speech for text (length: %d)", len(text))
     
     try:
-        # Get configuration
-        config = get_config()
-        tts_config = config.chatterbox_tts
-        
-        logger.debug(
-            "TTS settings - exaggeration: %.2f, cfg_weight: %.2f",
-            tts_config.exaggeration,
-            tts_config.cfg_weight
-        )
+        with span("tts.synthesize", engine="chatterbox"):
+            clip = synthesize_pcm(text, voice, speaking_rate)
         
-        # Get the model and generate speech
-        model = get_model()
+        # Queue the waveform on the shared output as is, without a WAV round trip
+        with span("tts.playback", engine="chatterbox"):
+            play_clip(clip)
+        logger.debug("Audio queued for playback")
         
-        # Generate speech (returns a tuple of (waveform, sample_rate))
-        waveform, sample_rate = model.generate(
-            text=text,
-            exaggeration=tts_config.exaggeration,
-            cfg_weight=tts_config.cfg_weight
-        )
+    except Exception as e:
+        logger.error("Failed to generate speech with Chatterbox: %s", str(e), exc_info=True)
+        # Fallback to other engines is handled by the TTS manager
+        raise RuntimeError(f"Chatterbox TTS failed: {str(e)}") from e
+
+
+def synthesize_pcm(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> PCMClip:
+    """
+    Generate speech with Chatterbox TTS as a decoded clip, without encoding it.
+    
+    Args:
+        text: The text to be converted to speech
+        voice: Not used in Chatterbox (kept for compatibility)
+        speaking_rate: Speed multiplier, applied by time-stretching the generated audio
         
-        # Create a temporary file
-        temp_dir = Path(tempfile.gettempdir())
-        temp_wav = temp_dir / f"cortex_tts_{uuid.uuid4().hex}.wav"
+    Returns:
+        The generated waveform
         
-        # Save to temporary file
-        try:
-            ta.save(str(temp_wav), waveform, sample_rate)
-            logger.debug("Temporary audio file saved to %s", temp_wav)
-            
-            # Play the audio
-            try:
-                from playsound import playsound
-                logger.debug("Playing audio...")
-                playsound(str(temp_wav))
-                logger.debug("Audio playback completed")
-            except Exception as e:
-                logger.error("Failed to play audio: %s", str(e), exc_info=True)
-                raise
-        finally:
-            # Clean up
-            try:
-                if temp_wav.exists():
-                    temp_wav.unlink()
-                    logger.debug("Temporary audio file removed")
-            except Exception as e:
-                logger.warning("Failed to remove temporary file %s: %s", temp_wav, str(e))
-                
+    Raises:
+        RuntimeError: If the model fails to load or generate speech
+    """
+    tts_config = get_config().chatterbox_tts
+    logger.debug(
+        "TTS settings - exaggeration: %.2f, cfg_weight: %.2f",
+        tts_config.exaggeration,
+        tts_config.cfg_weight
+    )
+    try:
+        model = get_model()
+        # Generate speech (returns a tuple of (waveform, sample_rate)); no autograd
+        # bookkeeping; live replies go first, background renders wait for a slot
+        with get_scheduler().slot(), torch.inference_mode():
+            start = time.perf_counter()
+            waveform, sample_rate = model.generate(
+                text=text,
+                exaggeration=tts_config.exaggeration,
+                cfg_weight=tts_config.cfg_weight
+            )
+            # Local and free, but recorded for latency and the per-turn report
+            record_usage("chatterbox", len(text), time.perf_counter() - start)
+        clip = to_clip(waveform, sample_rate)
+        if speaking_rate is not None and speaking_rate != 1.0:
+            # The model has no rate control; stretch locally, preserving pitch
+            clip = PCMClip(time_stretch(clip.samples, speaking_rate, clip.sample_rate), clip.sample_rate)
+        return clip
+    except RuntimeError:
+        raise
     except Exception as e:
         logger.error("Failed to generate speech with Chatterbox: %s", str(e), exc_info=True)
+        raise RuntimeError(f"Chatterbox TTS generation failed: {str(e)}") from e
+
+
+def synthesize(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> bytes:
+    """
+    Convert text to WAV audio using Chatterbox TTS without playing it.
+    
+    Unlike :func:`speak`, this does not fall back to another engine; callers
+    that render to files choose their own fallback.
+    
+    Args:
+        text: The text to be converted to speech
+        voice: Not used in Chatterbox (kept for compatibility)
+        speaking_rate: Speed multiplier, applied by time-stretching the generated audio
         
-        # Fall back to edge TTS if available
-        try:
-            logger.info("Falling back to edge TTS...")
-            from edge_tts_module import speak as edge_speak
-            edge_speak(text)
-        except ImportError:
-            logger.error("Edge TTS module not available for fallback")
-            raise RuntimeError("Chatterbox TTS failed and Edge TTS is not available") from e
-        except Exception as fallback_error:
-            logger.error("Fallback TTS failed: %s", str(fallback_error), exc_info=True)
-            raise RuntimeError("Both Chatterbox and fallback TTS failed") from fallback_error
+    Returns:
+        The WAV audio
+        
+    Raises:
+        RuntimeError: If the model fails to load or generate speech
+    """
+    # Encoded only here, for callers writing files
+    return encode_wav(synthesize_pcm(text, voice, speaking_rate))
@@ -2,12 +2,16 @@
 
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 import yaml
 from pydantic import BaseModel, Field, validator
 
 
+# Supported operation modes
+MODES = ("cli", "wake", "server", "batch")
+
+
 class VoiceConfig(BaseModel):
     """Voice configuration model."""
     
@@ -23,6 +27,246 @@ class ChatterboxConfig(BaseModel):
     
     exaggeration: float = Field(0.5, ge=0.0, le=1.0, description="Controls emotion/expressiveness (0.0 to 1.0)")
     cfg_weight: float = Field(0.5, ge=0.0, le=1.0, description="Controls stability vs. expressiveness (0.0 to 1.0)")
+    device: str = Field("auto", description="Device to run on: auto, cuda or cpu")
+    precision: str = Field("fp32", description="fp32, or int8 to quantize linear layers on CPU (faster, slightly lower quality)")
+    threads: Optional[int] = Field(None, ge=1, description="CPU threads for generation (default: one per physical core)")
+    interop_threads: Optional[int] = Field(None, ge=1, description="CPU threads running independent operations in parallel (default: 1)")
+    pin_threads: bool = Field(False, description="Restrict the process to one logical CPU per physical core (Linux)")
+
+    @validator('device')
+    def validate_device(cls, v):
+        if v.lower() not in ('auto', 'cuda', 'cpu'):
+            raise ValueError("Device must be one of: auto, cuda, cpu")
+        return v.lower()
+
+    @validator('precision')
+    def validate_precision(cls, v):
+        if v.lower() not in ('fp32', 'int8'):
+            raise ValueError("Precision must be one of: fp32, int8")
+        return v.lower()
+
+
+class TTSConfig(BaseModel):
+    """TTS engine fallback configuration."""
+    
+    fallbacks: List[str] = Field(["edge", "google", "chatterbox"], description="Engines that may stand in for voice.engine")
+    failure_threshold: int = Field(3, ge=1, description="Consecutive failures before an engine is skipped")
+    reset_timeout: float = Field(30.0, gt=0, description="Seconds before a skipped engine is tried again")
+    health_window: int = Field(20, ge=1, description="Recent calls used to rank fallbacks by success rate and latency")
+    hedge_after: Optional[float] = Field(None, gt=0, description="Seconds without audio before a backup engine races the first (unset disables)")
+    audio_format: str = Field("pcm", description="Audio requested for local playback: pcm (uncompressed where supported) or mp3")
+    interactive_concurrency: int = Field(4, ge=1, description="Concurrent syntheses for live replies")
+    prefetch_concurrency: int = Field(1, ge=1, description="Concurrent syntheses warming caches (phrase bank), run only while no live reply is synthesizing")
+    bulk_concurrency: int = Field(4, ge=1, description="Concurrent syntheses for batch jobs, run only while no live reply is synthesizing")
+
+    @validator('audio_format')
+    def validate_audio_format(cls, v):
+        if v.lower() not in ('pcm', 'mp3'):
+            raise ValueError("Audio format must be one of: pcm, mp3")
+        return v.lower()
+
+
+class AudioConfig(BaseModel):
+    """Audio output configuration."""
+    
+    backend: str = Field("auto", description="Playback backend: auto (sounddevice if installed) or playsound")
+    device: Optional[Union[int, str]] = Field(None, description="Output device name or index (unset uses the default)")
+    sample_rate: Optional[int] = Field(None, gt=0, description="Output sample rate (unset uses the device's native rate)")
+    channels: int = Field(1, ge=1, le=8, description="Output channels")
+    blocksize: int = Field(1024, ge=64, description="Frames per device callback")
+    buffer_seconds: float = Field(2.0, gt=0, description="Length of the playback ring buffer")
+    crossfade_ms: float = Field(0.0, ge=0, le=200, description="Crossfade between consecutive clips (0 plays them back to back)")
+    volume: float = Field(1.0, ge=0.0, le=2.0, description="Playback gain")
+    time_stretch: bool = Field(True, description="Apply voice.rate at play time (pitch-preserving) instead of in each TTS request")
+    normalize: bool = Field(True, description="Scale every clip to target_lufs so all engines play at the same level")
+    target_lufs: float = Field(-20.0, ge=-40, le=-5, description="Loudness clips are normalized to")
+    limiter_ceiling_db: float = Field(-1.0, ge=-20, le=0, description="Peak level the limiter holds normalized audio under")
+    max_gain_db: float = Field(20.0, ge=0, le=40, description="Largest boost normalization applies")
+
+    @validator('backend')
+    def validate_backend(cls, v):
+        if v.lower() not in ('auto', 'playsound'):
+            raise ValueError("Audio backend must be one of: auto, playsound")
+        return v.lower()
+
+
+class VADConfig(BaseModel):
+    """Voice activity detection and end-pointing configuration."""
+    
+    enabled: bool = Field(True, description="Close utterances with the VAD endpointer instead of speech_recognition's pause detection")
+    frame_ms: float = Field(20.0, ge=5, le=50, description="Analysis frame length")
+    threshold_db: float = Field(10.0, gt=0, description="Level above the noise floor counted as speech")
+    min_silence_ms: float = Field(200.0, gt=0, description="Trailing silence that ends a long utterance")
+    max_silence_ms: float = Field(400.0, gt=0, description="Trailing silence that ends an utterance that just started")
+    pre_speech_ms: float = Field(300.0, ge=0, description="Audio kept from before speech was detected")
+    calibration: float = Field(0.2, gt=0, description="Seconds of background noise sampled on first use")
+    max_utterance: float = Field(30.0, gt=0, description="Longest utterance before it is cut off")
+
+    @validator('max_silence_ms')
+    def validate_max_silence(cls, v, values):
+        if 'min_silence_ms' in values and v < values['min_silence_ms']:
+            raise ValueError("max_silence_ms must be at least min_silence_ms")
+        return v
+
+
+class STTConfig(BaseModel):
+    """Partial transcript and speculative reply configuration."""
+    
+    partials: bool = Field(True, description="Recognize partial transcripts while the user is still speaking (requires vad.enabled)")
+    partial_interval_ms: float = Field(700.0, ge=100, description="New speech between partial recognitions")
+    stable_partials: int = Field(2, ge=1, description="Identical consecutive partials that count as stable (one taken at a pause always does)")
+    speculate: bool = Field(True, description="Start the search or LLM request on a stable partial, reused if the final transcript matches")
+
+
+class CaptureConfig(BaseModel):
+    """Microphone capture configuration."""
+    
+    continuous: bool = Field(True, description="Keep the microphone open and cut phrases from a ring buffer (requires vad.enabled)")
+    buffer_seconds: float = Field(30.0, ge=1, description="Audio held in the ring buffer")
+    pre_roll_ms: float = Field(500.0, ge=0, description="Audio from before speech was detected included in each phrase")
+    replay: Optional[str] = Field(None, description="Listen to this recorded 16-bit WAV session instead of the microphone (requires vad.enabled)")
+    replay_realtime: bool = Field(True, description="Replay at real-time speed (false reads the recording as fast as possible)")
+    record: Optional[str] = Field(None, description="Save everything the microphone hears to this WAV file (requires vad.enabled)")
+
+
+class PhraseBankConfig(BaseModel):
+    """Pre-rendered fixed utterances configuration."""
+    
+    enabled: bool = Field(True, description="Pre-render fixed phrases for the active voice at startup")
+    phrases: List[str] = Field(
+        ["Shutting down.", "Goodbye!", "Goodbye."],
+        description="Phrases to pre-render (the intro line and search failure messages are always added)",
+    )
+    cache_dir: Optional[str] = Field("cache/phrases", description="Directory for rendered phrases (unset keeps them in memory only)")
+
+
+class SearchConfig(BaseModel):
+    """Web search configuration."""
+    
+    providers: List[str] = Field(["brave"], description="Search providers queried concurrently (brave, duckduckgo)")
+    strategy: str = Field("first", description="Use the 'first' good result or 'merge' the top results")
+    max_results: int = Field(3, ge=1, description="Number of results to request per provider")
+    timeout: float = Field(4.0, gt=0, description="Seconds to wait for providers before giving up")
+    cache_ttl: float = Field(600.0, ge=0, description="Seconds to keep cached results (0 disables caching)")
+    cache_size: int = Field(256, ge=0, description="Maximum number of cached queries")
+    grounding: str = Field("triggers", description="Summarize results with the LLM: off, triggers or always")
+    context_tokens: int = Field(600, ge=50, description="Token budget for search snippets sent to the LLM")
+
+    @validator('strategy')
+    def validate_strategy(cls, v):
+        if v.lower() not in ('first', 'merge'):
+            raise ValueError("Search strategy must be either 'first' or 'merge'")
+        return v.lower()
+
+    @validator('grounding')
+    def validate_grounding(cls, v):
+        if v.lower() not in ('off', 'triggers', 'always'):
+            raise ValueError("Search grounding must be 'off', 'triggers' or 'always'")
+        return v.lower()
+
+
+class PluginIntentConfig(BaseModel):
+    """An intent declared by a custom plugin."""
+    
+    name: str = Field(..., description="Intent name, unique within the plugin")
+    phrases: List[str] = Field(..., description="Trigger phrases")
+    handler: str = Field(..., description="Name of the handler function in the plugin module")
+    match: str = Field("prefix", description="How phrases match: prefix, contains or exact")
+    priority: int = Field(10, description="Higher priorities win when several intents match")
+    fuzzy: bool = Field(True, description="Tolerate small speech recognition errors")
+
+
+class PluginConfig(BaseModel):
+    """A custom plugin; its module is imported on first use."""
+    
+    name: str = Field(..., description="Plugin name")
+    module: str = Field(..., description="Importable module path")
+    description: str = Field("", description="What the plugin does")
+    intents: List[PluginIntentConfig] = Field(default_factory=list)
+
+
+class PluginsConfig(BaseModel):
+    """Plugin system configuration."""
+    
+    enabled: bool = Field(True, description="Whether plugins are loaded at all")
+    disabled: List[str] = Field(default_factory=list, description="Built-in plugins to turn off")
+    custom: List[PluginConfig] = Field(default_factory=list, description="Additional plugins")
+
+
+class ServerConfig(BaseModel):
+    """Headless server mode configuration."""
+    
+    host: str = Field("127.0.0.1", description="Interface to listen on")
+    port: int = Field(8765, ge=1, le=65535, description="Port to listen on")
+    max_concurrency: int = Field(16, ge=1, description="Turns processed at the same time")
+    queue_timeout: float = Field(10.0, gt=0, description="Seconds a turn may wait for a free slot")
+    max_sessions: int = Field(1000, ge=1, description="Sessions kept before the least recent is evicted")
+    session_ttl: float = Field(1800.0, gt=0, description="Seconds before an idle session expires")
+    history_turns: int = Field(6, ge=0, description="Conversation turns remembered per session")
+    audio_engine: str = Field("edge", description="TTS engine for streamed audio (edge or google)")
+    shutdown_timeout: float = Field(10.0, ge=0, description="Seconds to drain in-flight turns on shutdown")
+
+
+class BatchConfig(BaseModel):
+    """Batch mode configuration."""
+    
+    input: Optional[str] = Field(None, description="JSONL file of prompts ('-' or unset for stdin)")
+    output: Optional[str] = Field(None, description="JSONL results file ('-' or unset for stdout)")
+    concurrency: int = Field(4, ge=1, description="Prompts processed at the same time")
+    audio_dir: Optional[str] = Field(None, description="Render every reply to an audio file in this directory")
+    engine: Optional[str] = Field(None, description="TTS engine for audio files (defaults to voice.engine)")
+
+
+class LoggingConfig(BaseModel):
+    """Logging configuration."""
+    
+    level: str = Field("info", description="Log level (debug, info, warning, error, critical)")
+    file: Optional[str] = Field(None, description="Rotating log file (unset logs to the console only)")
+    console: bool = Field(True, description="Log to the console")
+    json_format: bool = Field(False, description="Write JSON lines with turn ids and timing fields")
+    use_queue: bool = Field(True, description="Write logs on a background thread so callers never block on I/O")
+    debug_sample_rate: float = Field(1.0, gt=0, le=1, description="Fraction of debug records kept")
+    debug_rate_limit: Optional[float] = Field(None, gt=0, description="Maximum debug records per second per call site")
+    
+    @validator('level')
+    def validate_level(cls, v):
+        if v.lower() not in ('debug', 'info', 'warning', 'error', 'critical'):
+            raise ValueError("Log level must be one of: debug, info, warning, error, critical")
+        return v.lower()
+
+
+class TracingConfig(BaseModel):
+    """Per-stage latency tracing configuration."""
+    
+    enabled: bool = Field(False, description="Record a timing span for every stage of each turn")
+    output: str = Field("traces/cortex_trace.json", description="Chrome trace file written on exit")
+    max_events: int = Field(100000, ge=1, description="Spans kept in memory; the oldest are dropped first")
+
+
+class BudgetConfig(BaseModel):
+    """Usage budget for one provider."""
+    
+    hourly: Optional[float] = Field(None, gt=0, description="Units allowed per hour (unset is unlimited)")
+    daily: Optional[float] = Field(None, gt=0, description="Units allowed per day (unset is unlimited)")
+
+
+class UsageConfig(BaseModel):
+    """Usage accounting and budget configuration."""
+    
+    enabled: bool = Field(True, description="Record tokens, characters and queries used by each call")
+    path: str = Field("usage/usage.jsonl", description="Append-only usage log")
+    budgets: Dict[str, BudgetConfig] = Field({}, description="Budgets by provider (groq: tokens; edge, google, chatterbox: characters; brave, duckduckgo: queries)")
+    warn_at: float = Field(0.8, gt=0, le=1, description="Fraction of a budget at which a warning is logged")
+    throttle: bool = Field(False, description="Refuse calls to a provider once its budget is spent (TTS and search fall back to other providers)")
+    prices: Dict[str, float] = Field({}, description="Cost per 1,000 units by provider, for the cost-per-turn report")
+
+
+class MetricsConfig(BaseModel):
+    """Runtime metrics configuration."""
+    
+    host: str = Field("127.0.0.1", description="Interface for the metrics endpoint")
+    port: Optional[int] = Field(None, ge=0, le=65535, description="Serve Prometheus metrics on this port (unset disables)")
+    dump_file: Optional[str] = Field(None, description="Write the final metrics to this file on exit")
 
 
 class AppConfig(BaseModel):
@@ -30,14 +274,37 @@ class AppConfig(BaseModel):
     
     voice: VoiceConfig = Field(default_factory=VoiceConfig)
     chatterbox_tts: ChatterboxConfig = Field(default_factory=ChatterboxConfig)
+    tts: TTSConfig = Field(default_factory=TTSConfig)
+    audio: AudioConfig = Field(default_factory=AudioConfig)
+    vad: VADConfig = Field(default_factory=VADConfig)
+    capture: CaptureConfig = Field(default_factory=CaptureConfig)
+    stt: STTConfig = Field(default_factory=STTConfig)
+    phrase_bank: PhraseBankConfig = Field(default_factory=PhraseBankConfig)
+    search: SearchConfig = Field(default_factory=SearchConfig)
+    plugins: PluginsConfig = Field(default_factory=PluginsConfig)
+    server: ServerConfig = Field(default_factory=ServerConfig)
+    batch: BatchConfig = Field(default_factory=BatchConfig)
+    logging: LoggingConfig = Field(default_factory=LoggingConfig)
+    tracing: TracingConfig = Field(default_factory=TracingConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    usage: UsageConfig = Field(default_factory=UsageConfig)
     wake_word: str = Field("hey cortex", description="Wake word for voice activation")
     shutdown_word: str = Field("shutdown", description="Word to shut down the application")
-    mode: str = Field("cli", description="Operation mode (cli or wake)")
+    mode: str = Field("cli", description="Operation mode (cli, wake, server or batch)")
+
+    @validator('capture')
+    def validate_capture(cls, v, values):
+        # Replayed and recorded sources aren't speech_recognition AudioSources,
+        # so only the VAD endpointer can listen to them
+        vad = values.get('vad')
+        if (v.replay or v.record) and vad is not None and not vad.enabled:
+            raise ValueError("capture.replay and capture.record require vad.enabled")
+        return v
 
     @validator('mode')
     def validate_mode(cls, v):
-        if v.lower() not in ('cli', 'wake'):
-            raise ValueError("Mode must be either 'cli' or 'wake'")
+        if v.lower() not in MODES:
+            raise ValueError("Mode must be one of: " + ", ".join(MODES))
         return v.lower()
 
 
@@ -4,16 +4,17 @@ This module provides text-to-speech functionality using Microsoft's Edge TTS eng
 """
 
 import asyncio
-import os
-import tempfile
-import uuid
-from pathlib import Path
-from typing import Optional, Dict, Any
+import time
+from typing import AsyncIterator, Optional, Dict, Any
 
 import edge_tts
 
 from logger import get_logger
 from config_utils import get_config
+from tracing import span
+from tts_scheduler import get_scheduler
+from tts_utils import play_audio
+from usage import check_budget, record_usage
 
 # Initialize logger
 logger = get_logger("tts.edge")
@@ -26,12 +27,22 @@ VOICE_ID = config.voice.id
 RATE = config.voice.rate
 INTRO_LINE = config.voice.intro_line
 
+
+def format_rate(rate: float) -> str:
+    """
+    Convert a speaking rate multiplier to Edge TTS's percentage format.
+    
+    Args:
+        rate: Rate multiplier where 1.0 is normal speed
+        
+    Returns:
+        Relative rate string, e.g. "+25%" for 1.25
+    """
+    return f"{round((float(rate) - 1.0) * 100):+d}%"
+
+
 # Format rate string for Edge TTS
-if isinstance(RATE, (int, float)):
-    RATE = f"+{RATE}%"
-RATE = str(RATE)
-if not (RATE.startswith("+") or RATE.startswith("-")):
-    RATE = f"+{RATE.strip('%')}%"
+RATE = format_rate(RATE)
 
 
 class EdgeTTSException(Exception):
@@ -39,44 +50,67 @@ class EdgeTTSException(Exception):
     pass
 
 
-async def _generate_speech_async(text: str, voice_id: str, rate: str) -> str:
+async def stream_speech(
+    text: str,
+    voice: Optional[str] = None,
+    speaking_rate: Optional[float] = None
+) -> AsyncIterator[bytes]:
     """
-    Generate speech asynchronously using Edge TTS.
+    Stream MP3 audio for text as Edge TTS produces it.
     
     Args:
         text: Text to convert to speech
-        voice_id: Voice ID to use
-        rate: Speaking rate (e.g., "+0%")
+        voice: Voice ID to use (overrides config if provided)
+        speaking_rate: Speaking rate multiplier (overrides config if provided)
         
-    Returns:
-        Path to the generated audio file
+    Yields:
+        Chunks of MP3 audio
         
     Raises:
         EdgeTTSException: If speech generation fails
     """
+    rate = format_rate(speaking_rate) if speaking_rate is not None else RATE
+    check_budget("edge")
     try:
-        temp_dir = Path(tempfile.gettempdir())
-        temp_mp3 = temp_dir / f"cortex_edge_tts_{uuid.uuid4().hex}.mp3"
-        
-        logger.debug("Generating speech with voice '%s' and rate '%s'", voice_id, rate)
-        
-        communicate = edge_tts.Communicate(
-            text,
-            voice=voice_id,
-            rate=rate
-        )
+        # Live replies go first; background renders wait for a slot
+        async with get_scheduler().slot_async():
+            start = time.perf_counter()
+            communicate = edge_tts.Communicate(text, voice=voice or VOICE_ID, rate=rate)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    yield chunk["data"]
+            record_usage("edge", len(text), time.perf_counter() - start)
+    except Exception as e:
+        logger.error("Failed to stream speech with Edge TTS: %s", str(e), exc_info=True)
+        raise EdgeTTSException(f"Edge TTS streaming failed: {str(e)}") from e
+
+
+def synthesize(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> bytes:
+    """
+    Convert text to MP3 audio without playing it.
+    
+    Args:
+        text: The text to be converted to speech
+        voice: Voice ID to use (overrides config if provided)
+        speaking_rate: Speaking rate multiplier (overrides config if provided)
         
-        await communicate.save(str(temp_mp3))
-        return str(temp_mp3)
+    Returns:
+        The MP3 audio
         
-    except Exception as e:
-        logger.error("Failed to generate speech with Edge TTS: %s", str(e), exc_info=True)
-        raise EdgeTTSException(f"Edge TTS generation failed: {str(e)}") from e
+    Raises:
+        EdgeTTSException: If speech generation fails
+    """
+    async def collect() -> bytes:
+        return b"".join([chunk async for chunk in stream_speech(text, voice, speaking_rate)])
+    
+    # Live replies go first; background renders wait for a slot
+    with get_scheduler().slot():
+        return asyncio.run(collect())
 
 
 def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> None:
     """
-    Convert text to speech using Edge TTS and play the resulting audio.
+    Convert text to speech using Edge TTS and queue it for playback.
     
     Args:
         text: The text to be converted to speech
@@ -92,37 +126,20 @@ def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float]
     
     logger.debug("Generating speech for text (length: %d)", len(text))
     
-    # Use provided voice or fall back to config
-    voice_id = voice or VOICE_ID
-    rate = f"+{speaking_rate}%" if speaking_rate is not None else RATE
-    
-    temp_mp3 = ""
     try:
-        # Generate speech file
-        temp_mp3 = asyncio.run(_generate_speech_async(text, voice_id, rate))
+        with span("tts.synthesize", engine="edge"):
+            audio = synthesize(text, voice, speaking_rate)
         
-        # Play the audio
-        try:
-            from playsound import playsound
-            logger.debug("Playing audio...")
-            playsound(temp_mp3)
-            logger.debug("Audio playback completed")
-        except Exception as e:
-            logger.error("Failed to play audio: %s", str(e), exc_info=True)
-            raise EdgeTTSException(f"Failed to play audio: {str(e)}") from e
+        # Queue the audio on the shared output
+        with span("tts.playback", engine="edge"):
+            play_audio(audio, "mp3")
+        logger.debug("Audio queued for playback")
             
+    except EdgeTTSException:
+        raise
     except Exception as e:
-        logger.error("Speech generation or playback failed: %s", str(e), exc_info=True)
-        raise EdgeTTSException(f"Speech generation or playback failed: {str(e)}") from e
-        
-    finally:
-        # Clean up
-        if temp_mp3 and os.path.exists(temp_mp3):
-            try:
-                os.remove(temp_mp3)
-                logger.debug("Temporary audio file removed")
-            except Exception as e:
-                logger.warning("Failed to remove temporary file %s: %s", temp_mp3, str(e))
+        logger.error("Failed to play audio: %s", str(e), exc_info=True)
+        raise EdgeTTSException(f"Failed to play audio: {str(e)}") from e
 
 
 def speak_intro() -> None:
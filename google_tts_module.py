@@ -4,9 +4,7 @@ This module provides text-to-speech functionality using Google Cloud TTS.
 """
 
 import os
-import tempfile
-import uuid
-from pathlib import Path
+import time
 from typing import Optional, Tuple, Dict, Any
 
 from google.cloud import texttospeech
@@ -14,6 +12,12 @@ from google.api_core.exceptions import GoogleAPICallError, RetryError
 
 from logger import get_logger
 from config_utils import get_config
+from audio_output import play_clip
+from audio_utils import AudioError, PCMClip, decode_wav
+from tracing import span
+from tts_scheduler import get_scheduler
+from tts_utils import play_audio
+from usage import check_budget, record_usage
 
 # Initialize logger
 logger = get_logger("tts.google")
@@ -28,29 +32,36 @@ os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv(
 )
 
 
+# Sample rate requested for uncompressed (LINEAR16) audio
+PCM_SAMPLE_RATE = 24000
+
+
 class GoogleTTSException(Exception):
     """Exception raised for Google TTS related errors."""
     pass
 
 
-def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> None:
+def _synthesize(
+    text: str,
+    voice: Optional[str],
+    speaking_rate: Optional[float],
+    encoding: "texttospeech.AudioEncoding",
+) -> bytes:
     """
-    Convert text to speech using Google Cloud TTS and play the resulting audio.
+    Request audio in the given encoding from Google Cloud TTS.
     
     Args:
-        text: The text to be converted to speech
+        text: The text (or SSML) to be converted to speech
         voice: Voice ID to use (overrides config if provided)
         speaking_rate: Speaking rate multiplier (overrides config if provided)
+        encoding: Audio encoding to request (MP3, or LINEAR16 for WAV)
+        
+    Returns:
+        The encoded audio
         
     Raises:
-        GoogleTTSException: If TTS generation or playback fails
+        GoogleTTSException: If TTS generation fails
     """
-    if not text or not text.strip():
-        logger.debug("Empty text provided, skipping TTS")
-        return
-    
-    logger.debug("Generating speech for text (length: %d)", len(text))
-    
     # Use provided values or fall back to config
     voice_id = voice or config.voice.id
     rate = float(speaking_rate) if speaking_rate is not None else config.voice.rate
@@ -63,7 +74,6 @@ def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float]
         logger.error(error_msg, exc_info=True)
         raise GoogleTTSException(error_msg) from e
     
-    temp_mp3 = ""
     try:
         # Initialize the client
         try:
@@ -81,9 +91,11 @@ def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float]
         
         # Configure the audio settings
         audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3,
+            audio_encoding=encoding,
             speaking_rate=rate,
         )
+        if encoding == texttospeech.AudioEncoding.LINEAR16:
+            audio_config.sample_rate_hertz = PCM_SAMPLE_RATE
         
         # Handle SSML or plain text
         if text.strip().startswith("<speak>"):
@@ -93,43 +105,24 @@ def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float]
             synthesis_input = texttospeech.SynthesisInput(text=text)
             logger.debug("Processing plain text input")
         
-        # Generate speech
+        # Generate speech (live replies go first; background renders wait for a slot)
         logger.debug("Synthesizing speech with voice '%s' and rate %.1f", voice_id, rate)
         try:
-            response = client.synthesize_speech(
-                input=synthesis_input, 
-                voice=voice_params, 
-                audio_config=audio_config
-            )
+            check_budget("google")
+            with get_scheduler().slot():
+                start = time.perf_counter()
+                response = client.synthesize_speech(
+                    input=synthesis_input, 
+                    voice=voice_params, 
+                    audio_config=audio_config
+                )
+                record_usage("google", len(text), time.perf_counter() - start)
         except (GoogleAPICallError, RetryError) as e:
             error_msg = f"Google TTS API error: {str(e)}"
             logger.error(error_msg, exc_info=True)
             raise GoogleTTSException(error_msg) from e
         
-        # Save to temporary file
-        temp_dir = Path(tempfile.gettempdir())
-        temp_mp3 = temp_dir / f"cortex_google_tts_{uuid.uuid4().hex}.mp3"
-        
-        try:
-            with open(temp_mp3, "wb") as out:
-                out.write(response.audio_content)
-            logger.debug("Temporary audio file saved to %s", temp_mp3)
-            
-            # Play the audio
-            try:
-                from playsound import playsound
-                logger.debug("Playing audio...")
-                playsound(str(temp_mp3))
-                logger.debug("Audio playback completed")
-            except Exception as e:
-                error_msg = f"Failed to play audio: {str(e)}"
-                logger.error(error_msg, exc_info=True)
-                raise GoogleTTSException(error_msg) from e
-                
-        except Exception as e:
-            error_msg = f"Failed to save or play audio: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            raise GoogleTTSException(error_msg) from e
+        return response.audio_content
             
     except Exception as e:
         if not isinstance(e, GoogleTTSException):
@@ -137,12 +130,83 @@ def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float]
             logger.error(error_msg, exc_info=True)
             raise GoogleTTSException(error_msg) from e
         raise
+
+
+def synthesize(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> bytes:
+    """
+    Convert text to MP3 audio using Google Cloud TTS without playing it.
+    
+    Args:
+        text: The text (or SSML) to be converted to speech
+        voice: Voice ID to use (overrides config if provided)
+        speaking_rate: Speaking rate multiplier (overrides config if provided)
         
-    finally:
-        # Clean up
-        if temp_mp3 and os.path.exists(temp_mp3):
-            try:
-                os.remove(temp_mp3)
-                logger.debug("Temporary audio file removed")
-            except Exception as e:
-                logger.warning("Failed to remove temporary file %s: %s", temp_mp3, str(e))
+    Returns:
+        The MP3 audio
+        
+    Raises:
+        GoogleTTSException: If TTS generation fails
+    """
+    return _synthesize(text, voice, speaking_rate, texttospeech.AudioEncoding.MP3)
+
+
+def synthesize_pcm(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> PCMClip:
+    """
+    Convert text to uncompressed audio (LINEAR16), skipping MP3 encode and decode.
+    
+    Args:
+        text: The text (or SSML) to be converted to speech
+        voice: Voice ID to use (overrides config if provided)
+        speaking_rate: Speaking rate multiplier (overrides config if provided)
+        
+    Returns:
+        The decoded clip
+        
+    Raises:
+        GoogleTTSException: If TTS generation fails
+    """
+    audio = _synthesize(text, voice, speaking_rate, texttospeech.AudioEncoding.LINEAR16)
+    try:
+        # LINEAR16 responses carry a WAV header
+        return decode_wav(audio)
+    except AudioError as e:
+        raise GoogleTTSException(f"Invalid LINEAR16 audio from Google TTS: {str(e)}") from e
+
+
+def speak(text: str, voice: Optional[str] = None, speaking_rate: Optional[float] = None) -> None:
+    """
+    Convert text to speech using Google Cloud TTS and queue it for playback.
+    
+    Args:
+        text: The text to be converted to speech
+        voice: Voice ID to use (overrides config if provided)
+        speaking_rate: Speaking rate multiplier (overrides config if provided)
+        
+    Raises:
+        GoogleTTSException: If TTS generation or playback fails
+    """
+    if not text or not text.strip():
+        logger.debug("Empty text provided, skipping TTS")
+        return
+    
+    logger.debug("Generating speech for text (length: %d)", len(text))
+    
+    pcm = config.tts.audio_format == "pcm"
+    with span("tts.synthesize", engine="google"):
+        if pcm:
+            audio = synthesize_pcm(text, voice, speaking_rate)
+        else:
+            audio = synthesize(text, voice, speaking_rate)
+    
+    # Queue the audio on the shared output
+    try:
+        with span("tts.playback", engine="google"):
+            if pcm:
+                play_clip(audio)
+            else:
+                play_audio(audio, "mp3")
+        logger.debug("Audio queued for playback")
+    except Exception as e:
+        error_msg = f"Failed to play audio: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        raise GoogleTTSException(error_msg) from e
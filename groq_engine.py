@@ -1,12 +1,20 @@
 import os
+import time
 import requests
 import json
+from typing import Dict, Iterator, List, Optional
 from dotenv import load_dotenv
 
+from metrics import LLM_FIRST_TOKEN, LLM_LATENCY, LLM_REQUESTS
+from single_flight import SingleFlight
+from tracing import instant, span
+from usage import check_budget, record_usage
+
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "mixtral-8x7b-32768")
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1")
 
 # --- Sarcastic, helpful personality system prompt ---
 SYSTEM_PROMPT = (
@@ -16,22 +24,149 @@ SYSTEM_PROMPT = (
     "Stay in character: helpful and witty, with a distinctively sarcastic edge. If the user says something obvious, you point it out in a funny way."
 )
 
-def chat_with_groq(prompt):
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
+# Shared session so consecutive calls reuse the TLS connection
+_session = requests.Session()
+
+# Concurrent identical requests (same prompt, context and history) share one call
+_chats = SingleFlight("llm.chat")
+_streams = SingleFlight("llm.stream")
+
+
+def _headers():
+    return {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json",
     }
+
+
+def _payload(prompt, context=None, stream=False, history=None):
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if context:
+        messages.append({"role": "system", "content": context})
+    if history:
+        messages.extend(history)
+    messages.append({"role": "user", "content": prompt})
     data = {
         "model": GROQ_MODEL,
-        "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt}
-        ],
+        "messages": messages,
         "temperature": 0.8,
         "max_tokens": 800,
     }
-    response = requests.post(url, headers=headers, json=data, timeout=60)
-    response.raise_for_status()
-    result = response.json()
-    return result["choices"][0]["message"]["content"].strip()
+    if stream:
+        data["stream"] = True
+    return data
+
+
+def warm_up() -> None:
+    """Open the connection to Groq ahead of a call so the request skips the handshake."""
+    try:
+        _session.head(GROQ_API_URL, timeout=5)
+    except requests.RequestException:
+        pass
+
+
+def _key(payload) -> str:
+    return json.dumps(payload, sort_keys=True)
+
+
+def _tokens(payload, reply: str, reported: Optional[Dict[str, int]] = None) -> int:
+    """Tokens used by a call: as reported by Groq, or estimated at ~4 characters per token."""
+    if reported and reported.get("total_tokens"):
+        return int(reported["total_tokens"])
+    return max(1, (sum(len(m["content"]) for m in payload["messages"]) + len(reply)) // 4)
+
+
+def chat_with_groq(prompt, context=None, history=None):
+    payload = _payload(prompt, context, history=history)
+    return _chats.do(_key(payload), _chat, payload)
+
+
+def _chat(payload):
+    check_budget("groq")
+    start = time.perf_counter()
+    try:
+        with span("llm.chat", model=GROQ_MODEL):
+            response = _session.post(
+                f"{GROQ_API_URL}/chat/completions",
+                headers=_headers(),
+                json=payload,
+                timeout=60,
+            )
+            response.raise_for_status()
+            result = response.json()
+    except Exception:
+        LLM_REQUESTS.inc(kind="chat", status="error")
+        raise
+    LLM_REQUESTS.inc(kind="chat", status="ok")
+    LLM_LATENCY.observe(time.perf_counter() - start, kind="chat")
+    reply = result["choices"][0]["message"]["content"].strip()
+    record_usage("groq", _tokens(payload, reply, result.get("usage")), time.perf_counter() - start)
+    return reply
+
+
+def stream_chat_with_groq(
+    prompt: str,
+    context: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> Iterator[str]:
+    """
+    Stream a chat completion from Groq.
+
+    A caller asking for a completion that is already streaming joins it,
+    receiving the deltas so far and then the rest as they arrive.
+
+    Args:
+        prompt: The user prompt
+        context: Optional extra system context (e.g. search results)
+        history: Optional earlier conversation messages (role/content dicts)
+
+    Returns:
+        Iterator over the text deltas as they arrive
+    """
+    payload = _payload(prompt, context, stream=True, history=history)
+    return _streams.stream(_key(payload), _stream, payload)
+
+
+def _stream(payload) -> Iterator[str]:
+    check_budget("groq")
+    start = time.perf_counter()
+    status = "error"
+    received, reported = [], None
+    try:
+        with span("llm.stream", model=GROQ_MODEL), _session.post(
+            f"{GROQ_API_URL}/chat/completions",
+            headers=_headers(),
+            json=payload,
+            timeout=60,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            first = True
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                # Groq reports usage with the last chunk
+                reported = chunk.get("usage") or chunk.get("x_groq", {}).get("usage") or reported
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    received.append(delta)
+                    if first:
+                        instant("llm.first_token")
+                        LLM_FIRST_TOKEN.observe(time.perf_counter() - start)
+                        first = False
+                    yield delta
+        status = "ok"
+        LLM_LATENCY.observe(time.perf_counter() - start, kind="stream")
+    except GeneratorExit:
+        # The consumer stopped reading early
+        status = "cancelled"
+        raise
+    finally:
+        LLM_REQUESTS.inc(kind="stream", status=status)
+        if received or reported:
+            record_usage("groq", _tokens(payload, "".join(received), reported), time.perf_counter() - start)
@@ -0,0 +1,261 @@
+"""Intent routing for Cortex Desktop Assistant.
+
+All trigger phrases are compiled into a single word-level Aho-Corasick
+automaton, so an utterance is matched against every registered command in one
+pass over its words, however many commands there are. Words the speech
+recognizer got slightly wrong are mapped back to the command vocabulary through
+a deletion-neighbourhood index (edit distance 1) before matching.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from logger import get_logger
+
+# Initialize logger
+logger = get_logger("router")
+
+# Match modes
+PREFIX = "prefix"      # phrase must start the utterance
+CONTAINS = "contains"  # phrase may appear anywhere
+EXACT = "exact"        # phrase must be the whole utterance
+
+# Words shorter than this are never fuzzy-matched; one edit is too much of them
+MIN_FUZZY_LENGTH = 5
+
+_WORD = re.compile(r"[\w']+")
+
+
+@dataclass
+class Intent:
+    """A routable intent and the phrases that trigger it."""
+
+    name: str
+    phrases: Sequence[str]
+    match: str = PREFIX
+    handler: Optional[Callable[["RouteMatch"], Any]] = None
+    priority: int = 0
+    fuzzy: bool = True
+    label: str = "Cortex"
+
+    def __post_init__(self):
+        if self.match not in (PREFIX, CONTAINS, EXACT):
+            raise ValueError(f"Invalid match mode for intent '{self.name}': {self.match}")
+
+
+@dataclass
+class RouteMatch:
+    """The result of routing an utterance."""
+
+    intent: Intent
+    phrase: str
+    text: str
+    argument: str
+    fuzzy: bool = False
+
+    @property
+    def name(self) -> str:
+        return self.intent.name
+
+
+@dataclass
+class _Node:
+    children: Dict[str, int] = field(default_factory=dict)
+    fail: int = 0
+    # (intent index, phrase, phrase length in words)
+    outputs: List[Tuple[int, str, int]] = field(default_factory=list)
+
+
+def _deletes(word: str) -> Iterator[str]:
+    for i in range(len(word)):
+        yield word[:i] + word[i + 1:]
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Return whether two words differ by at most one edit (incl. transposition)."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diffs = [i for i in range(la) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (
+            len(diffs) == 2
+            and diffs[1] == diffs[0] + 1
+            and a[diffs[0]] == b[diffs[1]]
+            and a[diffs[1]] == b[diffs[0]]
+        )
+    if la > lb:
+        a, b = b, a
+    return any(b[:i] + b[i + 1:] == a for i in range(len(b)))
+
+
+class IntentRouter:
+    """Match utterances against registered intents in a single pass."""
+
+    def __init__(self, fuzzy: bool = True):
+        self.fuzzy = fuzzy
+        self.intents: List[Intent] = []
+        self._nodes: List[_Node] = []
+        self._vocab: Set[str] = set()
+        self._fuzzy_index: Dict[str, Set[str]] = {}
+        self._compiled = False
+
+    def add(self, intent: Intent) -> Intent:
+        """
+        Register an intent.
+
+        Args:
+            intent: The intent to add
+
+        Returns:
+            The intent, for chaining
+        """
+        self.intents.append(intent)
+        self._compiled = False
+        return intent
+
+    def remove(self, name: str) -> None:
+        """Unregister all intents with the given name."""
+        self.intents = [i for i in self.intents if i.name != name]
+        self._compiled = False
+
+    def compile(self) -> None:
+        """Build the automaton and fuzzy index from the registered intents."""
+        nodes = [_Node()]
+        vocab: Set[str] = set()
+        for index, intent in enumerate(self.intents):
+            for phrase in intent.phrases:
+                words = _WORD.findall(phrase.lower())
+                if not words:
+                    continue
+                state = 0
+                for word in words:
+                    vocab.add(word)
+                    nxt = nodes[state].children.get(word)
+                    if nxt is None:
+                        nodes.append(_Node())
+                        nxt = len(nodes) - 1
+                        nodes[state].children[word] = nxt
+                    state = nxt
+                nodes[state].outputs.append((index, phrase, len(words)))
+
+        # Breadth-first construction of failure links
+        queue = list(nodes[0].children.values())
+        for state in queue:
+            for word, nxt in nodes[state].children.items():
+                queue.append(nxt)
+                fail = nodes[state].fail
+                while fail and word not in nodes[fail].children:
+                    fail = nodes[fail].fail
+                target = nodes[fail].children.get(word, 0)
+                nodes[nxt].fail = target if target != nxt else 0
+                nodes[nxt].outputs.extend(nodes[nodes[nxt].fail].outputs)
+
+        fuzzy_index: Dict[str, Set[str]] = {}
+        for word in vocab:
+            if len(word) >= MIN_FUZZY_LENGTH:
+                fuzzy_index.setdefault(word, set()).add(word)
+                for variant in _deletes(word):
+                    fuzzy_index.setdefault(variant, set()).add(word)
+
+        self._nodes = nodes
+        self._vocab = vocab
+        self._fuzzy_index = fuzzy_index
+        self._compiled = True
+        logger.debug(
+            "Compiled %d intent(s) into %d automaton states", len(self.intents), len(nodes)
+        )
+
+    def _canonical(self, word: str) -> Tuple[str, bool]:
+        """Map a recognized word onto the command vocabulary if it's one edit away."""
+        if word in self._vocab or not self.fuzzy or len(word) < MIN_FUZZY_LENGTH:
+            return word, False
+        candidates: Set[str] = set(self._fuzzy_index.get(word, ()))
+        for variant in _deletes(word):
+            candidates.update(self._fuzzy_index.get(variant, ()))
+        matches = sorted(c for c in candidates if _within_one_edit(word, c))
+        if len(matches) == 1:
+            return matches[0], True
+        return word, False
+
+    def route(self, text: str) -> Optional[RouteMatch]:
+        """
+        Find the best intent for an utterance.
+
+        Higher-priority intents win; among equal priorities the longest phrase wins,
+        then the earliest-registered intent.
+
+        Args:
+            text: The utterance to route
+
+        Returns:
+            The best match, or None if no intent matched
+        """
+        if not self._compiled:
+            self.compile()
+
+        spans = [(m.group().lower(), m.start(), m.end()) for m in _WORD.finditer(text)]
+        if not spans:
+            return None
+
+        best: Optional[Tuple[Tuple[int, int, int], RouteMatch]] = None
+        state = 0
+        fuzzed: List[bool] = []
+        nodes = self._nodes
+        for position, (raw, _, end) in enumerate(spans):
+            word, was_fuzzy = self._canonical(raw)
+            fuzzed.append(was_fuzzy)
+            while state and word not in nodes[state].children:
+                state = nodes[state].fail
+            state = nodes[state].children.get(word, 0)
+
+            for index, phrase, length in nodes[state].outputs:
+                intent = self.intents[index]
+                first = position - length + 1
+                if intent.match == PREFIX and first != 0:
+                    continue
+                if intent.match == EXACT and (first != 0 or position != len(spans) - 1):
+                    continue
+                used_fuzzy = any(fuzzed[first:position + 1])
+                if used_fuzzy and not intent.fuzzy:
+                    continue
+                rank = (intent.priority, length, -index)
+                if best is None or rank > best[0]:
+                    best = (rank, RouteMatch(
+                        intent=intent,
+                        phrase=phrase,
+                        text=text,
+                        argument=text[end:].strip(" ,.!?"),
+                        fuzzy=used_fuzzy,
+                    ))
+
+        if best is None:
+            return None
+        match = best[1]
+        logger.debug(
+            "Routed to '%s' via '%s'%s", match.name, match.phrase, " (fuzzy)" if match.fuzzy else ""
+        )
+        return match
+
+    def dispatch(self, text: str, default: Optional[Callable[[str], Any]] = None) -> Any:
+        """
+        Route an utterance and call the matching intent's handler.
+
+        Args:
+            text: The utterance to route
+            default: Called with the text when no intent (or no handler) matches
+
+        Returns:
+            Whatever the handler returned, or None
+        """
+        match = self.route(text)
+        if match is not None and match.intent.handler is not None:
+            return match.intent.handler(match)
+        if default is not None:
+            return default(text)
+        return None
@@ -1,11 +1,25 @@
-"""Logging configuration and utilities."""
+"""Logging configuration and utilities.
 
+By default log records are handed to a ``QueueHandler`` and written by a
+``QueueListener`` on a background thread, so a log call on the audio or
+network path only merges its message and enqueues it; formatting and file or
+console I/O happen elsewhere. Records can be written as JSON lines carrying
+the current turn id and any timing fields passed via ``extra``, and noisy
+debug logs can be sampled and rate-limited before they are queued.
+"""
+
+import atexit
+import contextvars
+import json
 import logging
 import logging.handlers
-import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, Union
+from typing import Dict, Optional, Tuple, Union
 
 # Log format
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -20,49 +34,192 @@ LOG_LEVELS = {
     'critical': logging.CRITICAL
 }
 
+# Id of the turn being handled; attached to every log record (set by tracing.turn)
+turn_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("cortex_turn_id", default=None)
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "turn"}
+
+# Background listeners by logger name
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
+_listeners_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line.
+
+    Includes the turn id when a turn is in progress and any extra fields, e.g.
+    ``logger.info("Search done", extra={"elapsed_ms": 120})``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        turn = getattr(record, "turn", None)
+        if turn is not None:
+            data["turn"] = turn
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """Thin out debug records before they are queued.
+
+    Keeps one in every ``1 / sample_rate`` debug records, then allows at most
+    ``max_per_second`` records per call site (logger and message template),
+    with bursts up to the same size. Records above DEBUG always pass.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_per_second: Optional[float] = None):
+        super().__init__()
+        self.every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.max_per_second = max_per_second
+        self.dropped = 0
+        self._seen = 0
+        # Call site -> (tokens, last refill time)
+        self._buckets: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        with self._lock:
+            self._seen += 1
+            if not self.every or self._seen % self.every:
+                self.dropped += 1
+                return False
+            if self.max_per_second is None:
+                return True
+            key = (record.name, str(record.msg))
+            now = time.monotonic()
+            tokens, last = self._buckets.get(key, (self.max_per_second, now))
+            tokens = min(self.max_per_second, tokens + (now - last) * self.max_per_second)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.dropped += 1
+                return False
+            self._buckets[key] = (tokens - 1, now)
+            return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that does the minimum on the calling thread.
+
+    The stock ``prepare`` fully formats the record; here only the message is
+    merged (so later changes to mutable arguments don't leak in) and the turn
+    id captured, leaving formatting to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        record.turn = turn_id.get()
+        return record
+
+
+class _TurnFilter(logging.Filter):
+    """Attach the turn id on synchronous handlers."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "turn"):
+            record.turn = turn_id.get()
+        return True
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """Queue listener that also acknowledges flush markers."""
+
+    def handle(self, record: logging.LogRecord) -> None:
+        done = getattr(record, "_flush_event", None)
+        if done is not None:
+            done.set()
+            return
+        super().handle(record)
+
+
+def _stop_listener(name: str) -> None:
+    with _listeners_lock:
+        listener = _listeners.pop(name, None)
+    if listener is not None:
+        # Drains the queue before returning
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def _stop_all_listeners() -> None:
+    for name in list(_listeners):
+        _stop_listener(name)
+
+
+atexit.register(_stop_all_listeners)
+
 
 def setup_logger(
     name: str = "cortex",
     log_level: str = "info",
     log_file: Optional[Union[str, Path]] = None,
-    console: bool = True
+    console: bool = True,
+    json_format: bool = False,
+    use_queue: bool = True,
+    debug_sample_rate: float = 1.0,
+    debug_rate_limit: Optional[float] = None,
 ) -> logging.Logger:
     """
     Set up and configure a logger.
-    
+
     Args:
         name: Logger name
         log_level: Logging level (debug, info, warning, error, critical)
         log_file: Path to log file (optional)
         console: Whether to log to console
-        
+        json_format: Write JSON lines instead of plain text
+        use_queue: Write records on a background thread instead of the caller's
+        debug_sample_rate: Fraction of debug records kept (1.0 keeps all)
+        debug_rate_limit: Maximum debug records per second per call site
+
     Returns:
         Configured logger instance
     """
     # Create logger
     logger = logging.getLogger(name)
-    
+
     # Set log level
     level = LOG_LEVELS.get(log_level.lower(), logging.INFO)
     logger.setLevel(level)
-    
-    # Clear existing handlers
-    logger.handlers.clear()
-    
+
+    # Clear existing handlers, flushing any queued records first
+    _stop_listener(name)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
     # Create formatter
-    formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
-    
+    formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT, DATE_FORMAT)
+    handlers = []
+
     # Add console handler
     if console:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-    
+        handlers.append(console_handler)
+
     # Add file handler if log file is specified
     if log_file:
         log_file = Path(log_file)
         log_file.parent.mkdir(parents=True, exist_ok=True)
-        
+
         file_handler = logging.handlers.RotatingFileHandler(
             log_file,
             maxBytes=5 * 1024 * 1024,  # 5 MB
@@ -70,14 +227,78 @@ def setup_logger(
             encoding='utf-8'
         )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
+        handlers.append(file_handler)
+
+    sampler = None
+    if debug_sample_rate < 1.0 or debug_rate_limit is not None:
+        sampler = DebugSampler(debug_sample_rate, debug_rate_limit)
+
+    if use_queue and handlers:
+        queue_handler = _QueueHandler(queue.SimpleQueue())
+        if sampler:
+            queue_handler.addFilter(sampler)
+        listener = _QueueListener(
+            queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        listener.start()
+        with _listeners_lock:
+            _listeners[name] = listener
+        logger.addHandler(queue_handler)
+    else:
+        for handler in handlers:
+            handler.addFilter(_TurnFilter())
+            if sampler:
+                handler.addFilter(sampler)
+            logger.addHandler(handler)
+
     # Prevent propagation to root logger
     logger.propagate = False
-    
+
     return logger
 
 
+def flush_logs(name: str = "cortex") -> None:
+    """
+    Write out every record queued so far for a logger set up with a queue.
+
+    Args:
+        name: Logger name passed to ``setup_logger``
+    """
+    with _listeners_lock:
+        listener = _listeners.get(name)
+    if listener is None:
+        return
+    done = threading.Event()
+    marker = logging.makeLogRecord({"msg": "", "levelno": logging.NOTSET})
+    marker._flush_event = done
+    listener.queue.put_nowait(marker)
+    done.wait(timeout=5)
+    for handler in listener.handlers:
+        handler.flush()
+
+
+def configure_logging(logging_config) -> logging.Logger:
+    """
+    Reconfigure the application logger from the ``logging`` config section.
+
+    Args:
+        logging_config: LoggingConfig instance
+
+    Returns:
+        The configured "cortex" logger
+    """
+    return setup_logger(
+        "cortex",
+        logging_config.level,
+        log_file=logging_config.file,
+        console=logging_config.console,
+        json_format=logging_config.json_format,
+        use_queue=logging_config.use_queue,
+        debug_sample_rate=logging_config.debug_sample_rate,
+        debug_rate_limit=logging_config.debug_rate_limit,
+    )
+
+
 # Create default logger instance
 logger = setup_logger("cortex", "info")
 
@@ -85,10 +306,10 @@ logger = setup_logger("cortex", "info")
 def get_logger(name: str = None) -> logging.Logger:
     """
     Get a logger instance with the given name.
-    
+
     Args:
         name: Logger name. If None, returns the root logger.
-        
+
     Returns:
         Logger instance
     """
@@ -0,0 +1,180 @@
+"""Loudness normalization for Cortex Desktop Assistant.
+
+Edge, Google and Chatterbox speak at noticeably different levels, so falling
+back from one to another made the volume jump. Each clip is now measured
+with a BS.1770-style integrated loudness (K-weighted mean square over 400 ms
+blocks with 75% overlap, absolute and relative gating), scaled to a common
+target and passed through a look-ahead peak limiter. K-weighting is applied
+to the power spectra of all blocks at once (one batched FFT) rather than with
+a sample-by-sample IIR filter, and the limiter's gain curve is built with
+sliding-window minima and cumulative sums, so the whole stage is vectorized.
+
+The measured loudness of a cached phrase is stored next to it, so replaying
+it costs nothing (see :mod:`phrase_bank`); ``python -m benchmarks.audio_dsp``
+reports the processing cost per second of audio.
+
+Example:
+    normalizer = LoudnessNormalizer(target=-20.0)
+    clip = normalizer(clip)
+"""
+
+import math
+from dataclasses import replace
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio_utils import PCMClip
+
+# Loudness of digital silence, in LUFS
+SILENCE = -70.0
+
+BLOCK_SECONDS = 0.4
+HOP_SECONDS = 0.1
+
+
+def _biquad_power(b, a, w: np.ndarray) -> np.ndarray:
+    z = np.exp(-1j * w)
+    return np.abs((b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)) ** 2
+
+
+def k_weighting(freqs: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Power response of the BS.1770 K-weighting filter.
+
+    Args:
+        freqs: Frequencies in Hz
+        sample_rate: Sample rate the filter is designed for
+
+    Returns:
+        |H(f)|^2 at each frequency
+    """
+    w = 2 * np.pi * freqs / sample_rate
+    # Stage 1: high shelf, +4 dB above ~1.5 kHz (head diffraction)
+    gain, q, w0 = 10 ** (4.0 / 40), 1 / math.sqrt(2), 2 * math.pi * 1500.0 / sample_rate
+    alpha, cos = math.sin(w0) / (2 * q), math.cos(w0)
+    root = 2 * math.sqrt(gain) * alpha
+    shelf_b = (
+        gain * ((gain + 1) + (gain - 1) * cos + root),
+        -2 * gain * ((gain - 1) + (gain + 1) * cos),
+        gain * ((gain + 1) + (gain - 1) * cos - root),
+    )
+    shelf_a = ((gain + 1) - (gain - 1) * cos + root, 2 * ((gain - 1) - (gain + 1) * cos), (gain + 1) - (gain - 1) * cos - root)
+    # Stage 2: high-pass around 38 Hz (RLB weighting)
+    w0 = 2 * math.pi * 38.0 / sample_rate
+    alpha, cos = math.sin(w0) / (2 * 0.5), math.cos(w0)
+    highpass_b = (1.0, -2.0, 1.0)
+    highpass_a = (1 + alpha, -2 * cos, 1 - alpha)
+    return _biquad_power(shelf_b, shelf_a, w) * _biquad_power(highpass_b, highpass_a, w)
+
+
+def loudness(samples: np.ndarray, sample_rate: int) -> float:
+    """
+    Measure integrated loudness.
+
+    Args:
+        samples: Float samples shaped (frames,) or (frames, channels)
+        sample_rate: Sample rate of the samples
+
+    Returns:
+        Loudness in LUFS (``SILENCE`` for silent or empty audio)
+    """
+    x = samples if samples.ndim == 2 else samples[:, None]
+    block = min(len(x), int(BLOCK_SECONDS * sample_rate))
+    if block == 0:
+        return SILENCE
+    hop = max(1, int(HOP_SECONDS * sample_rate))
+    # (blocks, channels, block) views without copying
+    blocks = sliding_window_view(x, block, axis=0)[::hop]
+    spectra = np.abs(np.fft.rfft(blocks, axis=-1)) ** 2
+    # One-sided spectrum: every bin but DC (and Nyquist for even lengths) stands for two
+    weights = k_weighting(np.fft.rfftfreq(block, 1 / sample_rate), sample_rate)
+    weights[1:(block + 1) // 2] *= 2
+    # Parseval: mean square of the K-weighted block, summed over channels
+    power = (spectra @ weights).sum(axis=1) / (block * block)
+
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10 * np.log10(power)
+    gated = power[levels > SILENCE]
+    if not len(gated):
+        return SILENCE
+    relative = -0.691 + 10 * math.log10(gated.mean()) - 10.0
+    gated = power[(levels > SILENCE) & (levels > relative)]
+    return float(-0.691 + 10 * math.log10(gated.mean()))
+
+
+def limit(samples: np.ndarray, sample_rate: int, ceiling: float = 0.89, lookahead: float = 0.005) -> np.ndarray:
+    """
+    Keep peaks under ``ceiling`` with a smooth look-ahead gain reduction.
+
+    The gain needed at each sample is spread back over the look-ahead window
+    (a sliding minimum) and then smoothed with a moving average of the same
+    length, so it has fully come down by the time a peak arrives.
+
+    Args:
+        samples: Float samples shaped (frames,) or (frames, channels)
+        sample_rate: Sample rate of the samples
+        ceiling: Maximum absolute sample value
+        lookahead: Seconds over which the gain ramps down before a peak
+
+    Returns:
+        The limited samples (the input itself if no peak exceeds the ceiling)
+    """
+    peaks = np.abs(samples) if samples.ndim == 1 else np.abs(samples).max(axis=1)
+    if not len(peaks) or peaks.max() <= ceiling:
+        return samples
+    needed = np.minimum(1.0, ceiling / np.maximum(peaks, 1e-12))
+    span = max(1, int(lookahead * sample_rate))
+    # Lowest gain needed over the next ``span`` samples
+    ahead = sliding_window_view(np.pad(needed, (0, span - 1), constant_values=1.0), span).min(axis=1)
+    # Average over the previous ``span`` samples: at a peak every term is at most its gain
+    sums = np.cumsum(np.pad(ahead, (span, 0), constant_values=1.0))
+    gain = ((sums[span:] - sums[:-span]) / span).astype(np.float32)
+    limited = samples * (gain if samples.ndim == 1 else gain[:, None])
+    return np.clip(limited, -ceiling, ceiling, out=limited)
+
+
+class LoudnessNormalizer:
+    """Scale clips to a target loudness and limit their peaks."""
+
+    def __init__(self, target: float = -20.0, ceiling_db: float = -1.0, max_gain_db: float = 20.0):
+        """
+        Initialize the normalizer.
+
+        Args:
+            target: Target integrated loudness in LUFS
+            ceiling_db: Limiter ceiling in dBFS
+            max_gain_db: Largest boost applied (keeps near-silent clips from being blown up)
+        """
+        self.target = target
+        self.ceiling = 10 ** (ceiling_db / 20)
+        self.max_gain_db = max_gain_db
+
+    def gain(self, measured: float) -> float:
+        """Linear gain taking audio at ``measured`` LUFS to the target."""
+        if measured <= SILENCE:
+            return 1.0
+        return 10 ** (min(self.target - measured, self.max_gain_db) / 20)
+
+    def apply(self, clip: PCMClip, measured: Optional[float] = None) -> PCMClip:
+        """
+        Normalize a clip.
+
+        Args:
+            clip: The clip
+            measured: Its loudness if already known (e.g. stored with a cached render)
+
+        Returns:
+            A normalized clip carrying the gain applied, or the clip itself if
+            it was already normalized
+        """
+        if clip.gain is not None:
+            return clip
+        if measured is None:
+            measured = loudness(clip.samples, clip.sample_rate)
+        gain = self.gain(measured)
+        samples = np.asarray(clip.samples, dtype=np.float32) * np.float32(gain)
+        return replace(clip, samples=limit(samples, clip.sample_rate, self.ceiling), gain=gain)
+
+    __call__ = apply
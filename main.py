@@ -6,12 +6,13 @@ a voice-enabled AI assistant with multiple TTS engine support.
 """
 
 import os
-import re
 import sys
-import logging
+import argparse
+import queue
+import threading
 import traceback
 import warnings
-from typing import Optional, Dict, Any, Callable, Type, Union
+from typing import Optional, Dict, Any, Callable, Iterable, Type, Union
 
 # Suppress specific warnings
 warnings.filterwarnings("ignore", category=UserWarning, module='whisper.*')
@@ -20,11 +21,20 @@ warnings.filterwarnings("ignore", category=UserWarning, module='torch.*')
 
 # Local imports
 try:
-    from groq_engine import chat_with_groq
-    from web_search import search_brave
+    from assistant import Assistant, Response
+    from retrieval import iter_sentences
     import speech_recognition as sr
-    from logger import get_logger
-    from config_utils import get_config, AppConfig
+    from logger import configure_logging, get_logger
+    from config_utils import get_config, AppConfig, MODES
+    from tracing import bind, configure_tracing, span, turn
+    from metrics import STT_ENDPOINT, STT_LATENCY, STT_REQUESTS, configure_metrics, timer
+    from audio_input import CaptureError, Cursor, MicrophoneCapture, RecordingSource, WavSource
+    from streaming_stt import PartialTranscriber
+    from vad import Endpointer, VADTimeout, VoiceActivityDetector, capture, pcm16_to_float
+    from tts_manager import TTSError, TTSManager
+    from phrase_bank import PhraseBank
+    from audio_output import configure_audio, playback_rate, synthesis_rate, wait_for_audio
+    from usage import configure_usage
     
     # Import TTS modules with error handling
     try:
@@ -71,90 +81,33 @@ TTS_ERRORS: Dict[str, str] = {
     "chatterbox": chatterbox_error if 'chatterbox_error' in locals() else "Chatterbox TTS not available"
 }
 
-# Select TTS engine based on config
+# Engine manager: circuit breakers and health-ranked fallback
 try:
-    engine = config.voice.engine.lower()
-    speak = TTS_ENGINES.get(engine)
-    
-    if speak is None:
-        logger.warning(
-            "Configured TTS engine '%s' not found. Falling back to Edge TTS.", 
-            engine
-        )
-        engine = "edge"
-        speak = edge_speak or google_speak or chatterbox_speak
-        
-    if speak is None:
-        raise RuntimeError("No TTS engine available. Please check your installation.")
-        
-    logger.info("Using TTS engine: %s", engine.upper())
-    
-except Exception as e:
-    logger.critical("Failed to initialize TTS engine: %s", str(e), exc_info=True)
-    # Try to use any available TTS as fallback
-    speak = next((s for s in [edge_speak, google_speak, chatterbox_speak] if s is not None), None)
-    if speak is None:
-        logger.critical("No TTS engine available. Exiting.")
-        sys.exit(1)
-    from edge_tts_module import speak
-
-def preprocess_for_tts(text: str, engine: Optional[str] = None) -> str:
+    tts_manager = TTSManager.from_config(config, TTS_ENGINES)
+    logger.info("Using TTS engine: %s", config.voice.engine.upper())
+except TTSError as e:
+    logger.critical("%s Exiting.", str(e))
+    sys.exit(1)
+
+# Pre-rendered fixed phrases (set up by start_phrase_bank)
+phrase_bank: Optional[PhraseBank] = None
+
+def start_phrase_bank() -> None:
     """
-    Preprocess text for TTS by removing markdown and other formatting.
-    
-    Args:
-        text: The input text to preprocess
-        engine: The TTS engine being used (for engine-specific processing)
-        
-    Returns:
-        Preprocessed text ready for TTS
+    Render the fixed phrases for the active voice in the background.
     """
-    if not text or not isinstance(text, str):
-        return ""
-    
-    logger.debug("Preprocessing text for TTS (length: %d)", len(text))
-    
+    global phrase_bank
+    if not config.phrase_bank.enabled or not config.voice.enabled:
+        return
+    from tts_utils import AUDIO_FORMATS, get_synthesizer
+    engine = config.voice.engine.lower()
     try:
-        # Stage directions and asterisk actions
-        def stage_replace(match):
-            phrase = match.group(1).strip().lower()
-            # Longer pause for explicit pauses
-            if "pause" in phrase or "..." in phrase:
-                return '<break time="800ms"/>' if engine == "google" else "..."
-            # All other directions/actions: brief pause, not spoken
-            return '<break time="600ms"/>' if engine == "google" else ""
-        
-        # Replace *action or stage direction* with pause
-        text = re.sub(r"\*(.*?)\*", stage_replace, text)
-        
-        # Remove markdown links [text](url) -> text
-        text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
-        
-        # Remove code blocks
-        text = re.sub(r'```[\s\S]*?```', '', text)
-        
-        # Remove inline code
-        text = re.sub(r'`([^`]+)`', r'\1', text)
-        
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # Clean up whitespace and newlines
-        text = ' '.join(text.split())
-        
-        # Special handling for different TTS engines
-        engine = engine or config.voice.engine.lower()
-        if engine in ["google", "edge"]:
-            # Remove markdown formatting
-            text = text.replace('*', '').replace('_', '').replace('~', '')
-        
-        logger.debug("Preprocessed text (length: %d)", len(text))
-        return text
-        
-    except Exception as e:
-        logger.error("Error preprocessing text for TTS: %s", str(e), exc_info=True)
-        # Return the original text if preprocessing fails
-        return text if isinstance(text, str) else ""
+        synthesize = get_synthesizer(engine, pcm=config.tts.audio_format == "pcm")
+    except (ImportError, ValueError, AttributeError) as e:
+        logger.warning("Phrase bank disabled: %s", str(e))
+        return
+    phrase_bank = PhraseBank.from_config(config, synthesize, AUDIO_FORMATS.get(engine, "mp3"))
+    phrase_bank.warm()
 
 def speak_config(text: str, voice: Optional[str] = None, rate: Optional[float] = None) -> None:
     """
@@ -173,67 +126,199 @@ def speak_config(text: str, voice: Optional[str] = None, rate: Optional[float] =
         return
     
     logger.debug("Speaking text (length: %d)", len(text))
+    if phrase_bank is not None and voice is None and rate is None:
+        with span("tts.phrase_bank") as s:
+            played = phrase_bank.play(text)
+            s.set(hit=played)
+        if played:
+            return
+    tts_manager.speak(text, voice or config.voice.id, synthesis_rate(config, rate))
+
+def recognize(recognizer: "sr.Recognizer", audio: "sr.AudioData", language: str = "en-US") -> str:
+    """
+    Transcribe recorded audio with Google's speech recognition, recording timings.
     
-    # Get the current engine
-    current_engine = config.voice.engine.lower()
-    engines_to_try = [current_engine]
-    
-    # Add fallback engines in order of preference
-    if current_engine != "edge" and edge_speak:
-        engines_to_try.append("edge")
-    if current_engine != "google" and google_speak:
-        engines_to_try.append("google")
-    if current_engine != "chatterbox" and chatterbox_speak:
-        engines_to_try.append("chatterbox")
-    
-    # Try each engine until one works
-    last_error = None
-    for engine_name in engines_to_try:
-        if engine_name not in TTS_ENGINES or TTS_ENGINES[engine_name] is None:
-            logger.debug("Skipping unavailable TTS engine: %s", engine_name)
-            continue
-            
-        logger.debug("Attempting to speak with %s TTS", engine_name.upper())
+    Args:
+        recognizer: Recognizer that captured the audio
+        audio: The recorded audio
+        language: Recognition language
+        
+    Returns:
+        The transcript
+        
+    Raises:
+        sr.UnknownValueError: If the speech could not be understood
+        sr.RequestError: If the recognition service could not be reached
+    """
+    status = "error"
+    try:
+        with span("stt", engine="google"), timer(STT_LATENCY):
+            transcript = recognizer.recognize_google(audio, language=language)
+        status = "ok"
+        return transcript
+    except sr.UnknownValueError:
+        status = "unrecognized"
+        raise
+    finally:
+        STT_REQUESTS.inc(status=status)
+
+# Shared voice activity detector, so the learned noise floor carries over between listens
+vad_detector: Optional[VoiceActivityDetector] = None
+
+# Replayed or recorded audio source, kept across listens (see capture.replay and capture.record)
+capture_source = None
+
+def microphone():
+    """
+    Get the audio source to listen on.
+    
+    Returns:
+        A recorded session when capture.replay is set, the microphone wrapped
+        to record it when capture.record is set, otherwise a new microphone
+    """
+    global capture_source
+    if capture_source is None:
+        if config.capture.replay:
+            capture_source = WavSource(config.capture.replay, realtime=config.capture.replay_realtime)
+            logger.info("Replaying %s (%.1f s)", config.capture.replay, capture_source.duration)
+        elif config.capture.record:
+            capture_source = RecordingSource(sr.Microphone(), config.capture.record)
+    return capture_source if capture_source is not None else sr.Microphone()
+
+def prepare_microphone(recognizer: "sr.Recognizer", source: "sr.Microphone", duration: float) -> None:
+    """
+    Measure background noise on a freshly opened microphone.
+    
+    With VAD enabled this is only done once; the noise floor then adapts
+    while listening.
+    
+    Args:
+        recognizer: Recognizer used when VAD is disabled
+        source: The open microphone
+        duration: Seconds of background noise to sample
+    """
+    global vad_detector
+    if not config.vad.enabled:
+        recognizer.adjust_for_ambient_noise(source, duration=duration)
+        return
+    if vad_detector is None or vad_detector.sample_rate != source.SAMPLE_RATE:
+        vad_detector = VoiceActivityDetector(
+            source.SAMPLE_RATE,
+            frame_ms=config.vad.frame_ms,
+            threshold_db=config.vad.threshold_db,
+        )
+    if vad_detector.noise_db is None:
+        frames = max(1, int(config.vad.calibration * source.SAMPLE_RATE / source.CHUNK))
+        noise = b"".join(source.stream.read(source.CHUNK) for _ in range(frames))
+        logger.debug("Noise floor: %.1f dBFS", vad_detector.calibrate(pcm16_to_float(noise)))
+
+def capture_speech(
+    recognizer: "sr.Recognizer",
+    source: "sr.Microphone",
+    timeout: Optional[float] = None,
+    phrase_time_limit: Optional[float] = None,
+    cursor: Optional[Cursor] = None,
+    partials: Optional[PartialTranscriber] = None,
+) -> "sr.AudioData":
+    """
+    Record one utterance from an open microphone.
+    
+    With VAD enabled the utterance is closed after a short trailing silence
+    (see the ``vad`` config section) and only cut at ``vad.max_utterance``;
+    otherwise speech_recognition's pause detection and ``phrase_time_limit``
+    apply.
+    
+    Args:
+        recognizer: Recognizer used when VAD is disabled
+        source: The open microphone
+        timeout: Maximum seconds to wait for speech to start
+        phrase_time_limit: Maximum phrase length when VAD is disabled
+        cursor: Read from continuously captured audio instead of the
+            microphone stream; left at the end of the utterance
+        partials: Recognizes partial transcripts while the user speaks (VAD only)
+        
+    Returns:
+        The recorded audio
+        
+    Raises:
+        sr.WaitTimeoutError: If no speech started within the timeout
+    """
+    if not config.vad.enabled:
+        return recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+    
+    prepare_microphone(recognizer, source, config.vad.calibration)
+    endpointer = Endpointer(
+        vad_detector,
+        min_silence=config.vad.min_silence_ms / 1000,
+        max_silence=config.vad.max_silence_ms / 1000,
+        max_duration=config.vad.max_utterance,
+    )
+    if cursor is not None:
+        start, read_chunk, pre_speech = cursor.position, cursor.read, config.capture.pre_roll_ms / 1000
+    else:
+        read_chunk, pre_speech = (lambda: source.stream.read(source.CHUNK)), config.vad.pre_speech_ms / 1000
+    with span("listen") as s:
         try:
-            # Preprocess text for the specific engine
-            processed_text = preprocess_for_tts(text, engine_name)
-            
-            # Get the appropriate speak function
-            speak_func = TTS_ENGINES[engine_name]
-            
-            # Call with parameters if they exist in the function signature
-            import inspect
-            sig = inspect.signature(speak_func)
-            params = {}
-            
-            if 'voice' in sig.parameters:
-                params['voice'] = voice or config.voice.id
-            if 'speaking_rate' in sig.parameters:
-                params['speaking_rate'] = rate or config.voice.rate
-            
-            speak_func(processed_text, **params)
-            logger.debug("Successfully spoke with %s TTS", engine_name.upper())
-            return
-            
-        except Exception as e:
-            error_msg = f"{engine_name.upper()} TTS failed: {str(e)}"
-            logger.warning(error_msg, exc_info=logger.level <= logging.DEBUG)
-            last_error = e
-    
-    # If we get here, all engines failed
-    error_msg = "All TTS engines failed"
-    logger.error(error_msg)
-    if last_error:
-        error_msg += f": {str(last_error)}"
-    raise RuntimeError(error_msg)
-
-def listen(timeout: Optional[float] = None, phrase_time_limit: Optional[float] = 10.0) -> Optional[str]:
+            utterance = capture(
+                read_chunk,
+                source.SAMPLE_RATE,
+                endpointer,
+                start_timeout=timeout,
+                pre_speech=pre_speech,
+                on_chunk=partials,
+            )
+        except VADTimeout as e:
+            raise sr.WaitTimeoutError(str(e)) from e
+        if cursor is not None:
+            # The next phrase starts right where this one ended, already captured
+            cursor.seek(start + utterance.end_offset)
+        endpoint_ms = round(utterance.endpoint_delay * 1000)
+        s.set(endpoint_ms=endpoint_ms, speech_ms=round(utterance.speech_seconds * 1000))
+    STT_ENDPOINT.observe(utterance.endpoint_delay)
+    logger.info(
+        "Captured %.1fs utterance, closed after %d ms of silence",
+        utterance.duration, endpoint_ms,
+        extra={"endpoint_ms": endpoint_ms, "truncated": utterance.truncated},
+    )
+    return sr.AudioData(utterance.audio, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+
+def partial_transcriber(assistant: Optional[Assistant] = None) -> Optional[PartialTranscriber]:
+    """
+    Create a partial transcriber for the next spoken command.
+    
+    Args:
+        assistant: Speculatively starts the reply to stable partials
+        
+    Returns:
+        The transcriber, or None if partial transcripts are disabled
+    """
+    if not (config.stt.partials and config.vad.enabled):
+        return None
+    recognizer = sr.Recognizer()
+    
+    def recognize_pcm(audio: bytes, sample_rate: int) -> str:
+        return recognizer.recognize_google(sr.AudioData(audio, sample_rate, 2))
+    
+    speculate = assistant.speculate if assistant is not None and config.stt.speculate else None
+    return PartialTranscriber(
+        recognize_pcm,
+        interval=config.stt.partial_interval_ms / 1000,
+        stable_partials=config.stt.stable_partials,
+        speculate=speculate,
+    )
+
+def listen(
+    timeout: Optional[float] = None,
+    phrase_time_limit: Optional[float] = 10.0,
+    partials: Optional[PartialTranscriber] = None,
+) -> Optional[str]:
     """
     Listen for audio input and convert it to text using speech recognition.
     
     Args:
         timeout: Maximum seconds to wait for speech before timing out
         phrase_time_limit: Maximum seconds for a phrase before it's cut off
+        partials: Recognizes partial transcripts while the user speaks
         
     Returns:
         Recognized text as a string, or None if recognition failed
@@ -245,23 +330,28 @@ def listen(timeout: Optional[float] = None, phrase_time_limit: Optional[float] =
     
     logger.debug("Starting speech recognition...")
     
-    with sr.Microphone() as source:
+    # Don't record our own speech
+    wait_for_audio()
+    
+    with microphone() as source:
         try:
             # Adjust for ambient noise
             logger.debug("Adjusting for ambient noise...")
-            recognizer.adjust_for_ambient_noise(source, duration=1)
+            prepare_microphone(recognizer, source, duration=1)
             
             # Listen for audio input
             logger.debug("Listening...")
-            audio = recognizer.listen(
+            audio = capture_speech(
+                recognizer,
                 source, 
                 timeout=timeout,
-                phrase_time_limit=phrase_time_limit
+                phrase_time_limit=phrase_time_limit,
+                partials=partials,
             )
             
             # Recognize speech using Google's speech recognition
             logger.debug("Recognizing speech...")
-            query = recognizer.recognize_google(audio, language="en-US")
+            query = recognize(recognizer, audio)
             
             if query:
                 logger.info("Recognized: %s", query)
@@ -278,6 +368,134 @@ def listen(timeout: Optional[float] = None, phrase_time_limit: Optional[float] =
     
     return None
 
+def speak_stream(chunks: Iterable[str], label: str) -> str:
+    """
+    Print streamed text as it arrives and speak it sentence by sentence.
+    
+    Sentences are spoken on a background thread so synthesis of the first
+    sentence overlaps with the rest of the text still streaming in.
+    
+    Args:
+        chunks: Text fragments from a streaming source
+        label: Prefix printed before the text (e.g. "Groq")
+        
+    Returns:
+        The full text that was streamed
+    """
+    sentences: "queue.Queue[Optional[str]]" = queue.Queue()
+    
+    def speaker() -> None:
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                return
+            try:
+                speak_config(sentence)
+            except Exception as e:
+                logger.error("Failed to speak streamed sentence: %s", str(e))
+    
+    thread = threading.Thread(target=bind(speaker), name="cortex-speaker", daemon=True)
+    thread.start()
+    
+    parts = []
+    
+    def echo(stream: Iterable[str]):
+        for chunk in stream:
+            print(chunk, end="", flush=True)
+            parts.append(chunk)
+            yield chunk
+    
+    print(f"{label}: ", end="", flush=True)
+    try:
+        for sentence in iter_sentences(echo(chunks)):
+            sentences.put(sentence)
+    finally:
+        print()
+        sentences.put(None)
+        thread.join()
+    return "".join(parts)
+
+def speak_response(response: Response) -> None:
+    """
+    Print and speak an assistant response.
+    
+    Args:
+        response: The response to deliver; streamed replies are spoken
+            sentence by sentence as they arrive
+    """
+    if response.reply is None:
+        return
+    if isinstance(response.reply, str):
+        print(f"{response.label}: {response.reply}")
+        speak_config(response.reply)
+    else:
+        speak_stream(response.reply, response.label)
+
+class Listener:
+    """
+    Microphone access for wake mode.
+    
+    With ``capture.continuous`` the microphone stays open for the whole
+    session and phrases are cut from a ring buffer of everything it heard,
+    so a command spoken straight after the wake word is already captured
+    when recognition of the wake word finishes. Otherwise the microphone is
+    reopened (and recalibrated) for every phrase.
+    """
+    
+    def __init__(self, recognizer: "sr.Recognizer"):
+        self.recognizer = recognizer
+        self.continuous = config.capture.continuous and config.vad.enabled
+        self._source: Optional["sr.Microphone"] = None
+        self._mic: Optional[MicrophoneCapture] = None
+        self._cursor: Optional[Cursor] = None
+    
+    def __enter__(self) -> "Listener":
+        if self.continuous:
+            self._source = microphone().__enter__()
+            prepare_microphone(self.recognizer, self._source, duration=0.5)
+            source = self._source
+            self._mic = MicrophoneCapture(
+                lambda: source.stream.read(source.CHUNK),
+                source.SAMPLE_RATE,
+                seconds=config.capture.buffer_seconds,
+                chunk=source.CHUNK,
+            ).start()
+            self._cursor = self._mic.cursor()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        if self._mic is not None:
+            self._mic.stop()
+        if self._source is not None:
+            self._source.__exit__(*exc_info)
+    
+    def listen(
+        self,
+        calibration: float,
+        phrase_time_limit: float,
+        partials: Optional[PartialTranscriber] = None,
+    ) -> "sr.AudioData":
+        """
+        Record the next phrase.
+        
+        Args:
+            calibration: Seconds of background noise to sample when reopening
+            phrase_time_limit: Maximum phrase length when VAD is disabled
+            partials: Recognizes partial transcripts while the user speaks
+        """
+        if not self.continuous:
+            wait_for_audio()
+            with microphone() as source:
+                prepare_microphone(self.recognizer, source, duration=calibration)
+                return capture_speech(self.recognizer, source, phrase_time_limit=phrase_time_limit, partials=partials)
+        return capture_speech(self.recognizer, self._source, cursor=self._cursor, partials=partials)
+    
+    def skip_own_speech(self) -> None:
+        """Wait for queued speech to finish and ignore what the microphone heard meanwhile."""
+        wait_for_audio()
+        if self._cursor is not None:
+            self._cursor.skip_to_now()
+
 def wake_mode() -> None:
     """
     Run the assistant in wake word mode, where it listens for a wake word
@@ -286,73 +504,77 @@ def wake_mode() -> None:
     logger.info("Starting wake word mode")
     
     recognizer = sr.Recognizer()
+    assistant = Assistant(config, mode="wake")
     WAKE_PHRASE = config.wake_word.lower()
-    SHUTDOWN_PHRASE = config.shutdown_word.lower()
 
     logger.info("Wake word: '%s'", WAKE_PHRASE)
     print(f"\n🔊 Wake word mode activated. Say '{WAKE_PHRASE}' to activate...")
-    while True:
-        try:
-            with sr.Microphone() as source:
-                recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = recognizer.listen(source, phrase_time_limit=5)
+    with Listener(recognizer) as listener:
+        while True:
             try:
-                transcript = recognizer.recognize_google(audio).lower()
-                print(f"[Heard]: {transcript}")
-                if SHUTDOWN_PHRASE in transcript or "goodbye" in transcript:
-                    print("[Wake Mode] Shutdown command received in passive phase.")
-                    speak_config("Shutting down.")
-                    break
-                if WAKE_PHRASE in transcript:
-                    print("Wake word detected. Entering active mode. Say 'shutdown' or 'goodbye' to exit.")
-                    # Stay in active mode until shutdown/goodbye
-                    while True:
-                        with sr.Microphone() as source:
-                            recognizer.adjust_for_ambient_noise(source, duration=0.3)
-                            print("Awaiting command...")
-                            command_audio = recognizer.listen(source, phrase_time_limit=10)
-                        try:
-                            user_input = recognizer.recognize_google(command_audio).lower()
-                            print(f"[You said]: {user_input}")
-
-                            # Exit active mode on shutdown/goodbye
-                            if SHUTDOWN_PHRASE in user_input or "goodbye" in user_input:
-                                print("[Active Mode] Shutdown or goodbye received. Returning to passive listening.")
-                                speak_config("Shutting down.")
-                                break
-
-                            # Web search detection (Wake)
-                            triggers = ["search for ", "look up ", "find "]
-                            lowered = user_input.lower()
-                            if any(lowered.startswith(t) for t in triggers):
-                                for t in triggers:
-                                    if lowered.startswith(t):
-                                        query = user_input[len(t):].strip()
+                audio = listener.listen(calibration=0.5, phrase_time_limit=5)
+                try:
+                    transcript = recognize(recognizer, audio).lower()
+                    print(f"[Heard]: {transcript}")
+                    match = assistant.router.route(transcript)
+                    if match is not None and match.name == "shutdown":
+                        print("[Wake Mode] Shutdown command received in passive phase.")
+                        speak_config("Shutting down.")
+                        break
+                    if match is not None and match.name == "wake":
+                        print("Wake word detected. Entering active mode. Say 'shutdown' or 'goodbye' to exit.")
+                        # "hey cortex, what's the weather" in one breath
+                        pending = match.argument
+                        # Stay in active mode until shutdown/goodbye
+                        while True:
+                            # The turn covers capture too, so its endpoint delay is attributed to it
+                            with turn():
+                                try:
+                                    speculation = None
+                                    if pending:
+                                        user_input, pending = pending, None
+                                    else:
+                                        print("Awaiting command...")
+                                        partials = partial_transcriber(assistant)
+                                        command_audio = listener.listen(calibration=0.3, phrase_time_limit=10, partials=partials)
+                                        user_input = recognize(recognizer, command_audio).lower()
+                                        if partials is not None:
+                                            speculation = partials.finish()
+                                    print(f"[You said]: {user_input}")
+
+                                    response = assistant.respond(user_input, speculation=speculation)
+
+                                    # Exit active mode on shutdown/goodbye
+                                    if response.intent == "shutdown":
+                                        print("[Active Mode] Shutdown or goodbye received. Returning to passive listening.")
+                                        speak_config("Shutting down.")
+                                        listener.skip_own_speech()
                                         break
-                                result = search_brave(query)
-                                print(f"Web: {result}")
-                                speak_config(result)
-                                continue
-
-                            reply = chat_with_groq(user_input)
-                            print(f"Groq: {reply}")
-                            speak_config(reply)
-                        except sr.UnknownValueError:
-                            print("[Command Phase] Could not understand input.")
-                            print("Sorry, I didn't catch that.")  # Print only
-                        except sr.RequestError as e:
-                            print(f"[Command Phase Error]: {e}")
-                            print("There was a problem reaching the recognition service.")
-            except sr.UnknownValueError:
-                pass
-            except sr.RequestError as e:
-                print(f"[Passive Phase Error]: {e}")
-        except KeyboardInterrupt:
-            print("\n[Wake Mode] Interrupted.")
-            speak_config("Goodbye.")
-            break
+
+                                    speak_response(response)
+                                    listener.skip_own_speech()
+                                except sr.UnknownValueError:
+                                    print("[Command Phase] Could not understand input.")
+                                    print("Sorry, I didn't catch that.")  # Print only
+                                except sr.RequestError as e:
+                                    print(f"[Command Phase Error]: {e}")
+                                    print("There was a problem reaching the recognition service.")
+                except sr.UnknownValueError:
+                    pass
+                except sr.RequestError as e:
+                    print(f"[Passive Phase Error]: {e}")
+            except KeyboardInterrupt:
+                print("\n[Wake Mode] Interrupted.")
+                speak_config("Goodbye.")
+                break
+            except (CaptureError, EOFError) as e:
+                # A replayed session ran out, or the microphone went away
+                logger.info("Audio input ended: %s", e)
+                print("\n[Wake Mode] Audio input ended.")
+                break
 
 def cli_mode():
+    assistant = Assistant(config, mode="cli")
     print("🧠 Groq Assistant - Core Edition (TTS: {})".format(config.voice.engine.upper()))
     print("Type 'exit' to quit. Type 'listen' to speak.")
 
@@ -362,40 +584,66 @@ def cli_mode():
             print("Goodbye!")
             speak_config("Goodbye!")
             break
-        elif user_input.lower() == "listen":
-            user_input = listen()
-            if not user_input:
-                continue
         elif not user_input:
             continue
 
-        # Web search detection (CLI)
-        triggers = ["search for ", "look up ", "find "]
-        lowered = user_input.lower()
-        if any(lowered.startswith(t) for t in triggers):
-            for t in triggers:
-                if lowered.startswith(t):
-                    query = user_input[len(t):].strip()
-                    break
-            result = search_brave(query)
-            print(f"Web: {result}")
-            speak_config(result)
-            continue
+        with turn():
+            speculation = None
+            if user_input.lower() == "listen":
+                partials = partial_transcriber(assistant)
+                user_input = listen(partials=partials)
+                if partials is not None:
+                    speculation = partials.finish()
+                if not user_input:
+                    continue
+            speak_response(assistant.respond(user_input, speculation=speculation))
 
-        reply = chat_with_groq(user_input)
-        print(f"Groq: {reply}")
-        speak_config(reply)
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    """
+    Parse command-line options that override config.yaml.
+    
+    Args:
+        argv: Arguments to parse (defaults to sys.argv)
+        
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Cortex Desktop Assistant")
+    parser.add_argument("--mode", choices=MODES, help="Operation mode (overrides config)")
+    parser.add_argument("--input", help="Batch mode: JSONL prompts file ('-' for stdin)")
+    parser.add_argument("--output", help="Batch mode: JSONL results file ('-' for stdout)")
+    parser.add_argument("--concurrency", type=int, help="Batch mode: prompts processed at once")
+    parser.add_argument("--audio-dir", help="Batch mode: render replies to audio files here")
+    return parser.parse_args(argv)
 
 def main() -> None:
     """
     Main entry point for the Cortex Desktop Assistant.
     """
+    args = parse_args()
+    if args.mode:
+        config.mode = args.mode
+    for option in ("input", "output", "concurrency", "audio_dir"):
+        if getattr(args, option) is not None:
+            setattr(config.batch, option, getattr(args, option))
+    
+    configure_logging(config.logging)
+    configure_tracing(config.tracing)
+    configure_metrics(config.metrics)
+    configure_usage(config.usage)
+    
     try:
         logger.info("Starting Cortex Desktop Assistant")
         
         # Determine the mode to run in
         mode = config.mode.lower()
         
+        # Batch mode may write results to stdout, so keep it clean
+        if mode == "batch":
+            from batch import run_batch
+            run_batch(config)
+            return
+        
         # Print welcome message
         print(
             f"\n{'='*50}\n"
@@ -406,9 +654,16 @@ def main() -> None:
             f"{'='*50}\n"
         )
         
+        if mode in ("cli", "wake"):
+            configure_audio(config.audio, rate=playback_rate(config))
+            start_phrase_bank()
+        
         # Run the appropriate mode
         if mode == "wake":
             wake_mode()
+        elif mode == "server":
+            from server import run_server
+            run_server(config)
         else:  # Default to CLI mode
             cli_mode()
             
@@ -420,6 +675,10 @@ def main() -> None:
         print(f"\n❌ A fatal error occurred: {str(e)}")
         print("Check the logs for more details.")
     finally:
+        # Let queued speech (e.g. "Goodbye!") finish before exiting
+        wait_for_audio(timeout=10)
+        if isinstance(capture_source, RecordingSource):
+            capture_source.close()
         logger.info("Cortex Desktop Assistant stopped")
 
 if __name__ == "__main__":
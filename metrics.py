@@ -0,0 +1,375 @@
+"""In-process metrics for Cortex Desktop Assistant.
+
+A small registry of counters, gauges and histograms with labels, rendered in
+the Prometheus text exposition format. The LLM, search, speech recognition
+and TTS paths record into the process-wide ``REGISTRY``; the metrics can be
+served on a local HTTP endpoint for scraping and written to a file on exit.
+
+Example:
+    TTS_REQUESTS.inc(engine="edge", status="ok")
+    with timer(TTS_LATENCY, engine="edge"):
+        ...
+"""
+
+import atexit
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from logger import get_logger
+
+# Initialize logger
+logger = get_logger("metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a fast cache hit to a slow LLM reply
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class MetricsError(Exception):
+    """Exception raised for invalid metric definitions or label sets."""
+    pass
+
+
+class Metric:
+    """Base class for labelled metrics."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise MetricsError(
+                f"{self.name} expects labels {list(self.labelnames)}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up, such as a request count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise MetricsError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Metric):
+    """A value that goes up and down, such as in-flight turns."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, such as latencies."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (plus +Inf), sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = ("le", "+Inf" if bound == math.inf else _number(bound))
+                lines.append(f"{self.name}_bucket{self._format_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """A named collection of metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise MetricsError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+    def dump(self, path: Union[str, Path]) -> Path:
+        """Write the rendered metrics to a file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.render(), encoding="utf-8")
+        logger.info("Wrote metrics to %s", path)
+        return path
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+@contextmanager
+def timer(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Observe the duration of a block in seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+# Process-wide registry and the metrics recorded by the assistant
+REGISTRY = Registry()
+
+TURNS = REGISTRY.counter("cortex_turns_total", "Turns handled, by intent", ["intent"])
+TURNS_IN_FLIGHT = REGISTRY.gauge("cortex_turns_in_flight", "Turns currently being processed")
+
+LLM_REQUESTS = REGISTRY.counter(
+    "cortex_llm_requests_total", "LLM requests, by call type and outcome", ["kind", "status"]
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "cortex_llm_latency_seconds", "Time to a complete LLM reply", ["kind"]
+)
+LLM_FIRST_TOKEN = REGISTRY.histogram(
+    "cortex_llm_first_token_seconds", "Time to the first token of a streamed LLM reply"
+)
+
+SEARCH_REQUESTS = REGISTRY.counter(
+    "cortex_search_requests_total", "Search provider requests, by provider and outcome", ["provider", "status"]
+)
+SEARCH_LATENCY = REGISTRY.histogram(
+    "cortex_search_latency_seconds", "Search provider latency", ["provider"]
+)
+SEARCH_CACHE = REGISTRY.counter(
+    "cortex_search_cache_total", "Search cache lookups, by result", ["result"]
+)
+
+STT_REQUESTS = REGISTRY.counter(
+    "cortex_stt_requests_total", "Speech recognition requests, by outcome", ["status"]
+)
+STT_LATENCY = REGISTRY.histogram("cortex_stt_latency_seconds", "Speech recognition latency")
+STT_ENDPOINT = REGISTRY.histogram(
+    "cortex_stt_endpoint_seconds", "Trailing silence waited before an utterance was closed",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 1.5),
+)
+SPECULATIONS = REGISTRY.counter(
+    "cortex_speculations_total",
+    "Replies started from partial transcripts, by whether the final transcript matched",
+    ["outcome"],
+)
+
+COALESCED = REGISTRY.counter(
+    "cortex_coalesced_requests_total", "Requests served by joining an identical call already in flight", ["kind"]
+)
+
+TTS_REQUESTS = REGISTRY.counter(
+    "cortex_tts_requests_total", "TTS requests, by engine and outcome", ["engine", "status"]
+)
+TTS_LATENCY = REGISTRY.histogram(
+    "cortex_tts_latency_seconds", "Time to synthesize an utterance and queue it for playback", ["engine"]
+)
+TTS_QUEUE_WAIT = REGISTRY.histogram(
+    "cortex_tts_queue_seconds", "Time a synthesis job waited for a slot, by priority class", ["priority"]
+)
+TTS_FALLBACKS = REGISTRY.counter(
+    "cortex_tts_fallbacks_total", "Utterances spoken by a fallback engine", ["engine"]
+)
+
+
+USAGE_UNITS = REGISTRY.counter(
+    "cortex_usage_units_total", "Billable units used (tokens, characters or queries), by provider", ["provider"]
+)
+BUDGET_REFUSALS = REGISTRY.counter(
+    "cortex_budget_refusals_total", "Calls refused because the provider's usage budget was spent", ["provider"]
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("Metrics request: " + format, *args)
+
+
+def start_http_server(host: str = "127.0.0.1", port: int = 9464, registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Serve ``/metrics`` on a background thread.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on (0 picks a free one)
+        registry: Registry to expose
+
+    Returns:
+        The running server; call ``shutdown()`` to stop it
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="cortex-metrics", daemon=True)
+    thread.start()
+    logger.info("Serving metrics on http://%s:%d/metrics", *server.server_address[:2])
+    return server
+
+
+_http_server: Optional[ThreadingHTTPServer] = None
+
+
+def configure_metrics(metrics_config) -> None:
+    """
+    Start the metrics endpoint and exit dump from the ``metrics`` config section.
+
+    Args:
+        metrics_config: MetricsConfig instance
+    """
+    global _http_server
+    if metrics_config.port and _http_server is None:
+        try:
+            _http_server = start_http_server(metrics_config.host, metrics_config.port)
+        except OSError as e:
+            logger.error("Could not start metrics endpoint: %s", str(e))
+    if metrics_config.dump_file:
+        atexit.register(REGISTRY.dump, metrics_config.dump_file)
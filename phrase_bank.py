@@ -0,0 +1,248 @@
+"""Pre-rendered audio for the assistant's fixed utterances.
+
+Phrases such as "Shutting down." or the intro line never change, so they are
+synthesized once for the active voice, decoded to PCM and kept in memory;
+speaking one then starts playback without a TTS round trip. Renders are also
+written to a cache directory keyed by engine, voice, rate and text, so later
+runs (or ``python phrase_bank.py`` at install time) only load them, and a
+voice change renders the phrases afresh. Renders run at ``prefetch``
+priority, so they wait while a live reply is being synthesized. Each render's measured loudness is
+stored beside it, so clips are normalized once as they are loaded and replay
+without any processing.
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from audio_output import loudness_normalizer, play_clip, synthesis_rate
+from audio_utils import AudioError, PCMClip, decode_audio, decode_wav, encode_wav
+from logger import get_logger
+from loudness import LoudnessNormalizer, loudness
+from tts_scheduler import PREFETCH, priority
+
+# Initialize logger
+logger = get_logger("phrase_bank")
+
+
+def normalize(text: str) -> str:
+    """Key used to match spoken text against bank phrases."""
+    return " ".join(text.split()).lower()
+
+
+class PhraseBank:
+    """Decoded clips of fixed phrases for one voice."""
+
+    def __init__(
+        self,
+        phrases: Iterable[str],
+        synthesize: Callable[..., Union[bytes, PCMClip]],
+        engine: str,
+        voice: Optional[str] = None,
+        rate: Optional[float] = None,
+        fmt: str = "mp3",
+        cache_dir: Optional[Union[str, Path]] = None,
+        player: Callable[[PCMClip], object] = play_clip,
+        normalizer: Optional[LoudnessNormalizer] = None,
+    ):
+        """
+        Initialize the bank. Nothing is rendered until ``warm`` is called.
+
+        Args:
+            phrases: Texts to pre-render
+            synthesize: Engine function ``synthesize(text, voice, speaking_rate)``
+                returning encoded audio or a ``PCMClip``
+            engine: Engine name (part of the cache key)
+            voice: Voice ID to render with
+            rate: Speaking rate to render with
+            fmt: Container format of encoded audio from ``synthesize``
+            cache_dir: Directory for rendered WAV files (None keeps them in memory only)
+            player: Plays a decoded clip
+            normalizer: Normalizes clips as they are rendered or loaded (None keeps them as rendered)
+        """
+        self.phrases = list(dict.fromkeys(p for p in phrases if p and p.strip()))
+        self.synthesize = synthesize
+        self.engine = engine
+        self.voice = voice
+        self.rate = rate
+        self.fmt = fmt
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.player = player
+        self.normalizer = normalizer
+        self._clips: Dict[str, PCMClip] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config, synthesize: Callable[..., Union[bytes, PCMClip]], fmt: str = "mp3") -> "PhraseBank":
+        """
+        Build a bank for the active voice from the ``voice`` and ``phrase_bank`` sections.
+
+        The intro line and the web search failure messages are always included.
+
+        Args:
+            config: Application configuration
+            synthesize: The active engine's synthesize function
+            fmt: Container format ``synthesize`` returns
+        """
+        from web_search import NO_PROVIDER_MESSAGE, NO_RESULTS_MESSAGE
+
+        phrases = [config.voice.intro_line, *config.phrase_bank.phrases, NO_RESULTS_MESSAGE, NO_PROVIDER_MESSAGE]
+        return cls(
+            phrases,
+            synthesize,
+            config.voice.engine,
+            voice=config.voice.id,
+            rate=synthesis_rate(config),
+            fmt=fmt,
+            cache_dir=config.phrase_bank.cache_dir,
+            normalizer=loudness_normalizer(config.audio),
+        )
+
+    def key(self, text: str) -> str:
+        """Cache key of a phrase for the current voice."""
+        ident = f"{self.engine}|{self.voice}|{self.rate}|{normalize(text)}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    def _measure(self, clip: PCMClip, path: Optional[Path]) -> float:
+        """Loudness of a cached render, read from beside it or measured and stored there."""
+        meta = path.with_suffix(".json") if path is not None else None
+        if meta is not None and meta.exists():
+            try:
+                return float(json.loads(meta.read_text(encoding="utf-8"))["loudness"])
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.debug("Re-measuring phrase %s: %s", path.name, str(e))
+        measured = loudness(clip.samples, clip.sample_rate)
+        if meta is not None:
+            meta.write_text(json.dumps({"loudness": round(measured, 3)}), encoding="utf-8")
+        return measured
+
+    def _render(self, text: str) -> PCMClip:
+        path = self.cache_dir / f"{self.key(text)}.wav" if self.cache_dir else None
+        clip = None
+        if path is not None and path.exists():
+            try:
+                clip = decode_wav(path.read_bytes())
+            except AudioError as e:
+                logger.warning("Re-rendering unreadable phrase cache %s: %s", path.name, str(e))
+        if clip is None:
+            with priority(PREFETCH):
+                audio = self.synthesize(text, voice=self.voice, speaking_rate=self.rate)
+            clip = audio if isinstance(audio, PCMClip) else decode_audio(audio, self.fmt)
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(encode_wav(clip))
+                path.with_suffix(".json").unlink(missing_ok=True)
+        if self.normalizer is None:
+            return clip
+        return self.normalizer(clip, self._measure(clip, path))
+
+    def _prune(self) -> None:
+        """Remove cached renders of other voices or phrases."""
+        if self.cache_dir is None or not self.cache_dir.exists():
+            return
+        current = {self.key(p) for p in self.phrases}
+        for path in [*self.cache_dir.glob("*.wav"), *self.cache_dir.glob("*.json")]:
+            if path.stem not in current:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logger.debug("Could not remove stale phrase %s: %s", path.name, str(e))
+
+    def render_all(self) -> int:
+        """
+        Render (or load) every phrase that isn't ready yet.
+
+        Returns:
+            Number of phrases ready afterwards
+        """
+        self._prune()
+        for text in self.phrases:
+            if self.get(text) is not None:
+                continue
+            try:
+                clip = self._render(text)
+            except Exception as e:
+                logger.warning("Could not pre-render phrase %r: %s", text, str(e))
+                continue
+            with self._lock:
+                self._clips[normalize(text)] = clip
+        logger.info("Phrase bank ready: %d/%d phrases for %s", len(self._clips), len(self.phrases), self.engine.upper())
+        return len(self._clips)
+
+    def warm(self, background: bool = True) -> None:
+        """
+        Render the phrases, by default on a background thread.
+
+        Args:
+            background: Return immediately and render on a daemon thread
+        """
+        if not background:
+            self.render_all()
+            return
+        self._thread = threading.Thread(target=self.render_all, name="cortex-phrase-bank", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until a background warm-up finishes."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def set_voice(self, engine: str, synthesize: Callable[..., Union[bytes, PCMClip]], voice: Optional[str], rate: Optional[float], fmt: str = "mp3") -> None:
+        """
+        Switch to another voice, dropping the old clips and rendering anew in the background.
+
+        Args:
+            engine: Engine name
+            synthesize: The engine's synthesize function
+            voice: Voice ID
+            rate: Speaking rate
+            fmt: Container format ``synthesize`` returns
+        """
+        if (engine, voice, rate) == (self.engine, self.voice, self.rate):
+            return
+        self.wait()
+        with self._lock:
+            self.engine, self.synthesize, self.voice, self.rate, self.fmt = engine, synthesize, voice, rate, fmt
+            self._clips.clear()
+        self.warm()
+
+    def get(self, text: str) -> Optional[PCMClip]:
+        """The decoded clip for a phrase, or None if it isn't in the bank (yet)."""
+        with self._lock:
+            return self._clips.get(normalize(text))
+
+    def play(self, text: str) -> bool:
+        """
+        Play a phrase from the bank.
+
+        Args:
+            text: The text to speak
+
+        Returns:
+            True if the phrase was played, False if it has to be synthesized
+        """
+        clip = self.get(text)
+        if clip is None:
+            return False
+        self.player(clip)
+        return True
+
+
+def main() -> None:
+    """Pre-render the configured phrases into the cache (e.g. at install time)."""
+    from config_utils import get_config
+    from tts_utils import AUDIO_FORMATS, get_synthesizer
+
+    config = get_config()
+    engine = config.voice.engine.lower()
+    synthesize = get_synthesizer(engine, pcm=config.tts.audio_format == "pcm")
+    bank = PhraseBank.from_config(config, synthesize, AUDIO_FORMATS.get(engine, "mp3"))
+    ready = bank.render_all()
+    print(f"Rendered {ready}/{len(bank.phrases)} phrases to {bank.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Plugin system for Cortex Desktop Assistant.
+
+Plugins declare their intents up front as metadata. The router learns the
+phrases immediately, but a plugin's module is only imported the first time one
+of its intents matches, so unused plugins cost nothing at startup. Handlers run
+locally and return text (or a stream of text) for the TTS path.
+
+A handler is a function in the plugin module taking the
+:class:`intent_router.RouteMatch` and returning a string or an iterator of
+strings. A handler that fails raises ``PluginError`` (so the assistant can
+answer with the LLM instead); a stream is run up to its first chunk before it
+is returned, and one failing after that ends with an apology.
+"""
+
+import importlib
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from intent_router import PREFIX, Intent, IntentRouter, RouteMatch
+from logger import get_logger
+
+# Initialize logger
+logger = get_logger("plugins")
+
+# Spoken when a streamed plugin reply fails part-way through
+PLUGIN_FAILED_MESSAGE = "Sorry, I couldn't finish that."
+
+
+class PluginError(Exception):
+    """Exception raised when a plugin fails to load or handle an intent."""
+    pass
+
+
+@dataclass
+class PluginIntent:
+    """Metadata for one intent a plugin handles."""
+
+    name: str
+    phrases: List[str]
+    handler: str
+    match: str = PREFIX
+    priority: int = 10
+    fuzzy: bool = True
+
+
+@dataclass
+class PluginSpec:
+    """Metadata describing a plugin; the module itself is imported lazily."""
+
+    name: str
+    module: str
+    intents: List[PluginIntent]
+    description: str = ""
+
+
+@dataclass
+class PluginStats:
+    """Load and handler timings for one plugin."""
+
+    import_ms: Optional[float] = None
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    first_chunk_ms: Dict[str, float] = field(default_factory=dict)
+
+    def record(self, elapsed_ms: float) -> None:
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+class PluginManager:
+    """Register plugins and wire their intents into an intent router."""
+
+    def __init__(self):
+        self.specs: Dict[str, PluginSpec] = {}
+        self.stats: Dict[str, PluginStats] = {}
+        self._modules: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> "PluginManager":
+        """
+        Build a plugin manager from the application configuration.
+
+        Args:
+            config: Application configuration
+
+        Returns:
+            PluginManager: Manager with built-in and configured plugins registered
+        """
+        from plugins import BUILTIN_PLUGINS
+
+        manager = cls()
+        plugins_config = config.plugins
+        if not plugins_config.enabled:
+            return manager
+        for spec in BUILTIN_PLUGINS:
+            if spec.name not in plugins_config.disabled:
+                manager.register(spec)
+        for custom in plugins_config.custom:
+            manager.register(PluginSpec(
+                name=custom.name,
+                module=custom.module,
+                description=custom.description,
+                intents=[PluginIntent(**intent.dict()) for intent in custom.intents],
+            ))
+        return manager
+
+    def register(self, spec: PluginSpec) -> None:
+        """
+        Register a plugin's metadata without importing it.
+
+        Args:
+            spec: The plugin description
+        """
+        self.specs[spec.name] = spec
+        self.stats.setdefault(spec.name, PluginStats())
+        logger.debug("Registered plugin '%s' (%d intents)", spec.name, len(spec.intents))
+
+    def install(self, router: IntentRouter) -> None:
+        """
+        Add every registered plugin intent to a router.
+
+        Args:
+            router: The router to add intents to
+        """
+        for spec in self.specs.values():
+            for intent in spec.intents:
+                router.add(Intent(
+                    name=f"{spec.name}.{intent.name}",
+                    phrases=intent.phrases,
+                    match=intent.match,
+                    priority=intent.priority,
+                    fuzzy=intent.fuzzy,
+                    handler=self._lazy_handler(spec, intent),
+                ))
+
+    def load(self, name: str) -> Any:
+        """
+        Import a plugin's module, timing the import on first load.
+
+        Args:
+            name: Plugin name
+
+        Returns:
+            The imported module
+
+        Raises:
+            PluginError: If the plugin is unknown or fails to import
+        """
+        module = self._modules.get(name)
+        if module is not None:
+            return module
+        with self._lock:
+            if name in self._modules:
+                return self._modules[name]
+            spec = self.specs.get(name)
+            if spec is None:
+                raise PluginError(f"Unknown plugin: {name}")
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(spec.module)
+            except Exception as e:
+                raise PluginError(f"Failed to import plugin '{name}': {e}") from e
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stats[name].import_ms = elapsed
+            self._modules[name] = module
+            logger.info("Loaded plugin '%s' in %.1f ms", name, elapsed)
+            return module
+
+    def _lazy_handler(self, spec: PluginSpec, intent: PluginIntent) -> Callable[[RouteMatch], Any]:
+        def handle(match: RouteMatch) -> Any:
+            stats = self.stats[spec.name]
+            module = self.load(spec.name)
+            handler = getattr(module, intent.handler, None)
+            if handler is None:
+                raise PluginError(f"Plugin '{spec.name}' has no handler '{intent.handler}'")
+
+            start = time.perf_counter()
+            try:
+                reply = handler(match)
+            except Exception as e:
+                stats.errors += 1
+                # A buggy plugin falls back to the LLM rather than ending the session
+                raise PluginError(f"Plugin '{spec.name}' failed: {e}") from e
+            if isinstance(reply, str) or reply is None:
+                elapsed = (time.perf_counter() - start) * 1000
+                stats.record(elapsed)
+                logger.debug("Plugin intent %s.%s took %.2f ms", spec.name, intent.name, elapsed)
+                return reply
+            stream = self._timed_stream(spec.name, intent.name, reply, start)
+            # Fail here rather than while the reply is being spoken, if the plugin fails straight away
+            first = next(stream, None)
+            return iter(()) if first is None else itertools.chain([first], stream)
+
+        return handle
+
+    def _timed_stream(self, plugin: str, intent: str, chunks, start: float) -> Iterator[str]:
+        stats = self.stats[plugin]
+        first = True
+        try:
+            for chunk in chunks:
+                if first:
+                    stats.first_chunk_ms[intent] = (time.perf_counter() - start) * 1000
+                    first = False
+                yield chunk
+        except Exception as e:
+            stats.errors += 1
+            if first:
+                raise PluginError(f"Plugin '{plugin}' failed: {e}") from e
+            # Part of the reply has been spoken; finish it rather than ending the session
+            logger.warning("Plugin '%s' failed part-way through a reply: %s", plugin, str(e))
+            yield " " + PLUGIN_FAILED_MESSAGE
+        finally:
+            stats.record((time.perf_counter() - start) * 1000)
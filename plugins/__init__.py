@@ -0,0 +1,29 @@
+"""Built-in Cortex plugins.
+
+Only metadata lives here; each plugin module is imported on first use.
+"""
+
+from intent_router import EXACT
+from plugin_manager import PluginIntent, PluginSpec
+
+BUILTIN_PLUGINS = [
+    PluginSpec(
+        name="clock",
+        module="plugins.clock",
+        description="Current time and date",
+        intents=[
+            PluginIntent(
+                name="time",
+                phrases=["what time is it", "what's the time", "tell me the time", "time please"],
+                handler="current_time",
+                match=EXACT,
+            ),
+            PluginIntent(
+                name="date",
+                phrases=["what's the date", "what is the date", "what's today's date", "what day is it"],
+                handler="current_date",
+                match=EXACT,
+            ),
+        ],
+    ),
+]
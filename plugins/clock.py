@@ -0,0 +1,17 @@
+"""Clock plugin: answers time and date questions locally."""
+
+from datetime import datetime
+
+from intent_router import RouteMatch
+
+
+def current_time(match: RouteMatch) -> str:
+    """Say the current local time."""
+    now = datetime.now()
+    return f"It's {now:%I:%M %p}.".replace(" 0", " ", 1)
+
+
+def current_date(match: RouteMatch) -> str:
+    """Say today's date."""
+    now = datetime.now()
+    return f"Today is {now:%A, %B} {now.day}, {now.year}."
@@ -0,0 +1,182 @@
+"""Search-grounded answers for Cortex Desktop Assistant.
+
+The search is started as soon as an utterance arrives, while routing is still
+deciding what to do with it, and the Groq connection is warmed in parallel. Once
+results are in they are trimmed to a token budget and handed to a streaming
+completion, so the reply starts after roughly max(search, warm-up) plus the
+LLM's first token instead of their sum.
+"""
+
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from groq_engine import stream_chat_with_groq, warm_up
+from logger import get_logger
+from tracing import bind, span
+from usage import BUDGET_SPENT_MESSAGE, BudgetExceededError
+from web_search import NO_RESULTS_MESSAGE, SearchResult, search_results
+
+# Initialize logger
+logger = get_logger("retrieval")
+
+# Rough characters-per-token ratio for English text
+CHARS_PER_TOKEN = 4
+
+GROUNDING_PROMPT = (
+    "Answer the user's question using the web search results below. "
+    "Keep it short enough to be spoken aloud, and mention the source site if useful. "
+    "If the results don't answer the question, say so.\n\n"
+    "Search results:\n{results}"
+)
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cortex-retrieval")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a piece of text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def trim_results(results: List[SearchResult], token_budget: int) -> str:
+    """
+    Format search results as context, trimming snippets to fit a token budget.
+
+    The budget is split evenly across results; any budget a short result leaves
+    unused carries over to the next one.
+
+    Args:
+        results: Search results, best first
+        token_budget: Maximum tokens of context to produce
+
+    Returns:
+        Numbered result snippets, one per line
+    """
+    lines = []
+    remaining = token_budget * CHARS_PER_TOKEN
+    for i, result in enumerate(results):
+        share = remaining // (len(results) - i)
+        if share <= 3:
+            break
+        line = f"[{i + 1}] {result.title} ({result.url}): {result.description}"
+        if len(line) > share:
+            line = line[:share - 3].rsplit(" ", 1)[0] + "..."
+        lines.append(line)
+        remaining -= len(line) + 1
+    return "\n".join(lines)
+
+
+def split_sentences(buffer: str) -> Tuple[List[str], str]:
+    """
+    Split buffered text into complete sentences and an unfinished remainder.
+
+    Args:
+        buffer: Text received so far
+
+    Returns:
+        Tuple of (complete sentences, remainder still waiting for more text)
+    """
+    *complete, remainder = _SENTENCE_END.split(buffer)
+    return [s.strip() for s in complete if s.strip()], remainder
+
+
+def iter_sentences(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Regroup a stream of text deltas into whole sentences.
+
+    Args:
+        chunks: Text fragments as they arrive from a streaming source
+
+    Yields:
+        Complete sentences, with any trailing remainder yielded last
+    """
+    buffer = ""
+    for chunk in chunks:
+        sentences, buffer = split_sentences(buffer + chunk)
+        yield from sentences
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class SpeculativeSearch:
+    """A web search started ahead of knowing whether its results will be used."""
+
+    def __init__(self, query: str, count: Optional[int] = None):
+        self.query = query
+        self.started = time.perf_counter()
+        self._future: Future = _executor.submit(bind(search_results), query, count)
+        # Open the LLM connection while the search is in flight
+        _executor.submit(bind(warm_up))
+
+    def results(self, timeout: Optional[float] = None) -> List[SearchResult]:
+        """
+        Wait for the search results.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The results, or an empty list if the search failed or timed out
+        """
+        try:
+            with span("search.wait"):
+                results = self._future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.warning("Search for '%s' timed out; answering without it", self.query)
+            return []
+        except Exception as e:
+            logger.warning("Search for '%s' failed: %s", self.query, e)
+            return []
+        logger.debug(
+            "Search ready %.0f ms after start", (time.perf_counter() - self.started) * 1000
+        )
+        return results
+
+
+def grounded_answer(
+    question: str,
+    search: SpeculativeSearch,
+    token_budget: int = 600,
+    timeout: Optional[float] = None,
+    require_results: bool = False,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> Iterator[str]:
+    """
+    Stream an LLM answer grounded in web search results.
+
+    Args:
+        question: The user's question
+        search: A search already started for the question
+        token_budget: Maximum tokens of search context to send
+        timeout: Maximum seconds to wait for the search
+        require_results: If True, answer with a "no results" message instead of
+            falling back to an ungrounded answer
+        history: Optional earlier conversation messages
+
+    Yields:
+        Text deltas of the answer
+    """
+    results = search.results(timeout)
+    if not results and require_results:
+        yield NO_RESULTS_MESSAGE
+        return
+
+    context = GROUNDING_PROMPT.format(results=trim_results(results, token_budget)) if results else None
+    first = True
+    try:
+        for delta in stream_chat_with_groq(question, context, history):
+            if first:
+                logger.debug(
+                    "First answer token %.0f ms after search start",
+                    (time.perf_counter() - search.started) * 1000,
+                )
+                first = False
+            yield delta
+    except BudgetExceededError as e:
+        # Refused before any text was streamed
+        logger.warning("%s; not answering", e)
+        yield BUDGET_SPENT_MESSAGE
@@ -0,0 +1,509 @@
+"""Headless HTTP/WebSocket server for Cortex Desktop Assistant.
+
+Serves many thin clients from one Cortex process. Each client gets a session
+holding its recent conversation; turns are processed on a worker pool with a
+global concurrency limit, and replies can be returned as text or streamed as
+MP3 audio. Sessions asking the same question or speaking the same sentence at
+once share one upstream call (see :mod:`single_flight`).
+
+Endpoints:
+    POST /v1/sessions   Create a session
+    POST /v1/chat       {"text", "session_id"?} -> JSON reply
+    POST /v1/speak      {"text", "session_id"?} -> chunked audio/mpeg stream
+    GET  /v1/ws         WebSocket; send {"text", "audio"?}, receive deltas/replies/audio
+    GET  /v1/health     Liveness check
+    GET  /v1/stats      Session counts, throughput and latency percentiles
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Set
+
+try:
+    from aiohttp import WSCloseCode, WSMsgType, web
+except ImportError as e:  # pragma: no cover
+    raise ImportError("Server mode requires aiohttp: pip install aiohttp") from e
+
+from assistant import Assistant, Reply
+from config_utils import AppConfig, ServerConfig
+from logger import configure_logging, get_logger
+from metrics import CONTENT_TYPE, REGISTRY, TURNS_IN_FLIGHT, configure_metrics
+from retrieval import split_sentences
+from single_flight import SingleFlight
+from tracing import bind, configure_tracing, span, turn
+from tts_utils import preprocess_for_tts
+from usage import configure_usage
+
+# Initialize logger
+logger = get_logger("server")
+
+# Produces audio chunks for a piece of text
+Synthesizer = Callable[[str], AsyncIterator[bytes]]
+
+
+@dataclass
+class Session:
+    """Conversation state for one client."""
+
+    id: str
+    history: Deque[Dict[str, str]]
+    created: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def remember(self, text: str, reply: str) -> None:
+        """Add a completed turn to the history."""
+        self.history.append({"role": "user", "content": text})
+        self.history.append({"role": "assistant", "content": reply})
+        self.last_seen = time.monotonic()
+
+
+class SessionStore:
+    """In-memory sessions with idle expiry and a size cap."""
+
+    def __init__(self, max_sessions: int, ttl: float, history_turns: int):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.history_turns = history_turns
+        self._sessions: Dict[str, Session] = {}
+        self.created = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self) -> Session:
+        """Create a new session, evicting the least recently used one if full."""
+        if len(self._sessions) >= self.max_sessions:
+            oldest = min(self._sessions.values(), key=lambda s: s.last_seen)
+            del self._sessions[oldest.id]
+            logger.debug("Evicted session %s", oldest.id)
+        session = Session(uuid.uuid4().hex, deque(maxlen=2 * self.history_turns))
+        self._sessions[session.id] = session
+        self.created += 1
+        return session
+
+    def get_or_create(self, session_id: Optional[str]) -> Session:
+        """Return an existing session, or a new one if the id is unknown."""
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            return self.create()
+        session.last_seen = time.monotonic()
+        return session
+
+    def prune(self) -> int:
+        """Drop idle sessions; returns the number removed."""
+        cutoff = time.monotonic() - self.ttl
+        expired = [s.id for s in self._sessions.values() if s.last_seen < cutoff and not s.lock.locked()]
+        for session_id in expired:
+            del self._sessions[session_id]
+        return len(expired)
+
+
+class LatencyStats:
+    """Rolling latency samples per route."""
+
+    def __init__(self, window: int = 4096):
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def observe(self, route: str, elapsed_ms: float) -> None:
+        self._samples[route].append(elapsed_ms)
+        self.counts[route] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count and p50/p95/p99/max latency (ms) per route."""
+        result = {}
+        for route, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[route] = {
+                "count": self.counts[route],
+                "errors": self.errors[route],
+                "p50_ms": _percentile(ordered, 50),
+                "p95_ms": _percentile(ordered, 95),
+                "p99_ms": _percentile(ordered, 99),
+                "max_ms": ordered[-1] if ordered else 0.0,
+            }
+        return result
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 2)
+
+
+def default_synthesizer(engine: str) -> Synthesizer:
+    """
+    Get an audio synthesizer for a TTS engine.
+
+    Args:
+        engine: TTS engine name (edge or google)
+
+    Returns:
+        Synthesizer: Async generator function producing MP3 chunks
+
+    Raises:
+        ValueError: If the engine can't produce streamable audio
+    """
+    if engine == "edge":
+        from edge_tts_module import stream_speech
+
+        return stream_speech
+    if engine == "google":
+        from google_tts_module import synthesize
+
+        async def google_stream(text: str) -> AsyncIterator[bytes]:
+            yield await asyncio.get_running_loop().run_in_executor(None, synthesize, text)
+
+        return google_stream
+    raise ValueError(f"TTS engine '{engine}' does not support audio streaming")
+
+
+class CortexServer:
+    """HTTP/WebSocket front end for the assistant."""
+
+    def __init__(
+        self,
+        config: AppConfig,
+        assistant: Optional[Assistant] = None,
+        synthesizer: Optional[Synthesizer] = None,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            config: Application configuration
+            assistant: Assistant to answer with (built from config if omitted)
+            synthesizer: Audio synthesizer (chosen from server.audio_engine if omitted)
+        """
+        self.config = config
+        self.server_config: ServerConfig = config.server
+        self.assistant = assistant or Assistant(config, mode="server")
+        self._synthesizer = synthesizer
+        self.sessions = SessionStore(
+            self.server_config.max_sessions,
+            self.server_config.session_ttl,
+            self.server_config.history_turns,
+        )
+        self.stats = LatencyStats()
+        self.started = time.monotonic()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.server_config.max_concurrency,
+            thread_name_prefix="cortex-turn",
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._closing = False
+        self._websockets: Set[web.WebSocketResponse] = set()
+        self._pruner: Optional[asyncio.Task] = None
+        # Sessions speaking the same sentence at once share one audio stream
+        self._renders = SingleFlight("tts.stream")
+
+    @property
+    def synthesizer(self) -> Synthesizer:
+        if self._synthesizer is None:
+            self._synthesizer = default_synthesizer(self.server_config.audio_engine)
+        return self._synthesizer
+
+    def build_app(self) -> web.Application:
+        """Create the aiohttp application."""
+        app = web.Application()
+        app.add_routes([
+            web.post("/v1/sessions", self.handle_create_session),
+            web.post("/v1/chat", self.handle_chat),
+            web.post("/v1/speak", self.handle_speak),
+            web.get("/v1/ws", self.handle_websocket),
+            web.get("/v1/health", self.handle_health),
+            web.get("/v1/stats", self.handle_stats),
+            web.get("/metrics", self.handle_metrics),
+        ])
+        app.on_startup.append(self._on_startup)
+        app.on_shutdown.append(self._on_shutdown)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    # Lifecycle
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._slots = asyncio.Semaphore(self.server_config.max_concurrency)
+        self._pruner = asyncio.create_task(self._prune_sessions())
+
+    async def _on_shutdown(self, app: web.Application) -> None:
+        logger.info("Shutting down server; draining %d in-flight turn(s)", self._in_flight)
+        self._closing = True
+        for ws in list(self._websockets):
+            await ws.close(code=WSCloseCode.GOING_AWAY, message=b"Server shutting down")
+        deadline = time.monotonic() + self.server_config.shutdown_timeout
+        while self._in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        if self._pruner is not None:
+            self._pruner.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def _prune_sessions(self) -> None:
+        interval = max(1.0, min(60.0, self.server_config.session_ttl / 4))
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.sessions.prune()
+            if removed:
+                logger.debug("Expired %d idle session(s)", removed)
+
+    # Turn processing
+
+    @asynccontextmanager
+    async def _turn_slot(self):
+        """Hold one of the concurrency slots for the duration of a turn."""
+        if self._closing:
+            raise web.HTTPServiceUnavailable(text="Server is shutting down")
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.server_config.queue_timeout)
+        except asyncio.TimeoutError:
+            raise web.HTTPServiceUnavailable(text="Server busy, try again later")
+        self._in_flight += 1
+        TURNS_IN_FLIGHT.inc()
+        try:
+            with turn():
+                yield
+        finally:
+            TURNS_IN_FLIGHT.dec()
+            self._in_flight -= 1
+            self._slots.release()
+
+    async def _respond(self, session: Session, text: str):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, bind(self.assistant.respond), text, list(session.history)
+        )
+
+    async def _iterate(self, reply: Optional[Reply]) -> AsyncIterator[str]:
+        """Iterate a (possibly blocking, streamed) reply without blocking the loop."""
+        if reply is None:
+            return
+        if isinstance(reply, str):
+            yield reply
+            return
+        loop = asyncio.get_running_loop()
+        done = object()
+        while True:
+            chunk = await loop.run_in_executor(self._executor, bind(next), reply, done)
+            if chunk is done:
+                return
+            yield chunk
+
+    async def _speak(self, text: str) -> AsyncIterator[bytes]:
+        engine = self.server_config.audio_engine
+        text = preprocess_for_tts(text, engine)
+        with span("tts.synthesize", engine=engine):
+            async for chunk in self._renders.stream_async((engine, text), self.synthesizer, text):
+                yield chunk
+
+    # HTTP handlers
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        status = "closing" if self._closing else "ok"
+        return web.json_response({"status": status})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        uptime = time.monotonic() - self.started
+        requests_total = sum(self.stats.counts.values())
+        return web.json_response({
+            "uptime_s": round(uptime, 1),
+            "active_sessions": len(self.sessions),
+            "sessions_created": self.sessions.created,
+            "sessions_per_s": round(self.sessions.created / uptime, 3) if uptime else 0.0,
+            "requests_per_s": round(requests_total / uptime, 3) if uptime else 0.0,
+            "in_flight": self._in_flight,
+            "routes": self.stats.summary(),
+        })
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=REGISTRY.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE}
+        )
+
+    async def handle_create_session(self, request: web.Request) -> web.Response:
+        session = self.sessions.create()
+        return web.json_response({"session_id": session.id})
+
+    async def handle_chat(self, request: web.Request) -> web.Response:
+        text, session = await self._read_turn(request)
+        start = time.perf_counter()
+        try:
+            async with self._turn_slot(), session.lock:
+                response = await self._respond(session, text)
+                reply = "".join([chunk async for chunk in self._iterate(response.reply)])
+                session.remember(text, reply)
+        except web.HTTPException:
+            raise
+        except Exception as e:
+            self.stats.errors["chat"] += 1
+            logger.error("Chat turn failed: %s", str(e), exc_info=True)
+            raise web.HTTPBadGateway(text=f"Turn failed: {e}")
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stats.observe("chat", elapsed)
+        return web.json_response({
+            "session_id": session.id,
+            "intent": response.intent,
+            "reply": reply,
+            "latency_ms": round(elapsed, 2),
+        })
+
+    async def handle_speak(self, request: web.Request) -> web.StreamResponse:
+        text, session = await self._read_turn(request)
+        start = time.perf_counter()
+        stream = web.StreamResponse(headers={
+            "Content-Type": "audio/mpeg",
+            "X-Cortex-Session": session.id,
+        })
+        async with self._turn_slot(), session.lock:
+            try:
+                response = await self._respond(session, text)
+            except Exception as e:
+                self.stats.errors["speak"] += 1
+                raise web.HTTPBadGateway(text=f"Turn failed: {e}")
+            await stream.prepare(request)
+            first_audio = None
+            parts = []
+            try:
+                async for sentence in self._sentences(response.reply, parts):
+                    async for chunk in self._speak(sentence):
+                        if first_audio is None:
+                            first_audio = (time.perf_counter() - start) * 1000
+                            self.stats.observe("speak_first_audio", first_audio)
+                        await stream.write(chunk)
+            except (ConnectionResetError, asyncio.CancelledError):
+                logger.debug("Client for session %s disconnected mid-stream", session.id)
+                raise
+            except Exception as e:
+                # Headers are already sent; all we can do is end the stream early
+                self.stats.errors["speak"] += 1
+                logger.error("Audio streaming failed: %s", str(e), exc_info=True)
+            session.remember(text, "".join(parts))
+        await stream.write_eof()
+        self.stats.observe("speak", (time.perf_counter() - start) * 1000)
+        return stream
+
+    async def _sentences(self, reply: Optional[Reply], parts: List[str]) -> AsyncIterator[str]:
+        """Regroup a reply into sentences, recording the raw text in ``parts``."""
+        buffer = ""
+        async for chunk in self._iterate(reply):
+            parts.append(chunk)
+            sentences, buffer = split_sentences(buffer + chunk)
+            for sentence in sentences:
+                yield sentence
+        if buffer.strip():
+            yield buffer.strip()
+
+    async def _read_turn(self, request: web.Request):
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text="Request body must be JSON")
+        text = str(body.get("text", "")).strip() if isinstance(body, dict) else ""
+        if not text:
+            raise web.HTTPBadRequest(text="Missing 'text'")
+        return text, self.sessions.get_or_create(body.get("session_id"))
+
+    # WebSocket handler
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        session = self.sessions.get_or_create(request.query.get("session_id"))
+        self._websockets.add(ws)
+        await ws.send_json({"type": "session", "session_id": session.id})
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    body = json.loads(message.data)
+                    text = str(body.get("text", "")).strip()
+                except (json.JSONDecodeError, AttributeError):
+                    await ws.send_json({"type": "error", "error": "Messages must be JSON objects"})
+                    continue
+                if not text:
+                    await ws.send_json({"type": "error", "error": "Missing 'text'"})
+                    continue
+                await self._websocket_turn(ws, session, text, bool(body.get("audio")))
+        finally:
+            self._websockets.discard(ws)
+        return ws
+
+    async def _websocket_turn(
+        self, ws: web.WebSocketResponse, session: Session, text: str, audio: bool
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            async with self._turn_slot(), session.lock:
+                response = await self._respond(session, text)
+                parts: List[str] = []
+                async for sentence in self._sentences(response.reply, parts):
+                    await ws.send_json({"type": "delta", "text": sentence})
+                    if audio:
+                        async for chunk in self._speak(sentence):
+                            await ws.send_bytes(chunk)
+                reply = "".join(parts)
+                session.remember(text, reply)
+        except web.HTTPServiceUnavailable as e:
+            await ws.send_json({"type": "error", "error": e.text})
+            return
+        except Exception as e:
+            self.stats.errors["ws"] += 1
+            logger.error("WebSocket turn failed: %s", str(e), exc_info=True)
+            await ws.send_json({"type": "error", "error": f"Turn failed: {e}"})
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stats.observe("ws", elapsed)
+        if audio:
+            await ws.send_json({"type": "audio_end"})
+        await ws.send_json({
+            "type": "reply",
+            "intent": response.intent,
+            "text": reply,
+            "latency_ms": round(elapsed, 2),
+        })
+
+
+def run_server(config: AppConfig) -> None:
+    """
+    Run the server until interrupted.
+
+    Logging, tracing, metrics and usage accounting are configured by the
+    entry point (``main.py`` or ``python server.py``), once per process.
+
+    Args:
+        config: Application configuration
+    """
+    server = CortexServer(config)
+    server_config = config.server
+    logger.info("Starting server on %s:%d", server_config.host, server_config.port)
+    print(f"🌐 Cortex server listening on http://{server_config.host}:{server_config.port}")
+    web.run_app(
+        server.build_app(),
+        host=server_config.host,
+        port=server_config.port,
+        shutdown_timeout=server_config.shutdown_timeout,
+        print=None,
+    )
+
+
+if __name__ == "__main__":
+    from config_utils import get_config
+
+    app_config = get_config()
+    configure_logging(app_config.logging)
+    configure_tracing(app_config.tracing)
+    configure_metrics(app_config.metrics)
+    configure_usage(app_config.usage)
+    run_server(app_config)
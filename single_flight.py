@@ -0,0 +1,247 @@
+"""Request coalescing for Cortex Desktop Assistant.
+
+When several sessions (or a batch job) ask the same question or render the
+same sentence at once, each used to make its own upstream call. A
+``SingleFlight`` group lets concurrent identical requests share one call:
+the first caller for a key runs it and everyone who asks for the same key
+while it is in flight waits for that result (or exception) instead. Streams
+are shared the same way: chunks are kept as they arrive, so a caller joining
+late replays what it missed and then follows along live. Keys are built the
+same way as the caches (e.g. the normalized query for searches), and a key
+is forgotten as soon as its call finishes, so later requests go to the
+cache or upstream as before.
+
+Example:
+    flight = SingleFlight("llm.chat")
+    reply = flight.do(key, chat_with_groq, prompt)
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterator, List, Optional
+
+from logger import get_logger
+from metrics import COALESCED
+
+# Initialize logger
+logger = get_logger("single_flight")
+
+
+class _Broadcast:
+    """Chunks of one shared stream, pulled from the source by whichever reader needs the next one."""
+
+    def __init__(self, group: "SingleFlight", key: Hashable, source: Iterator[Any]):
+        self.group = group
+        self.key = key
+        self.source = source
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        # Held while pulling from the source
+        self._pull = threading.Lock()
+
+    def read(self) -> Iterator[Any]:
+        index = 0
+        try:
+            while True:
+                if index < len(self.chunks):
+                    index += 1
+                    yield self.chunks[index - 1]
+                    continue
+                with self._pull:
+                    if index < len(self.chunks):
+                        continue
+                    if self.done:
+                        if self.error is not None:
+                            raise self.error
+                        return
+                    try:
+                        self.chunks.append(next(self.source))
+                    except StopIteration:
+                        self._finish()
+                    except Exception as e:
+                        self.error = e
+                        self._finish()
+        finally:
+            if self.group._leave(self) and hasattr(self.source, "close"):
+                self.source.close()
+
+    def _finish(self) -> None:
+        self.done = True
+        self.group._forget(self.key, self)
+
+
+class _AsyncBroadcast:
+    """Chunks of one shared async stream (readers must share an event loop).
+
+    Each pull runs as a task the reader awaits through ``asyncio.shield``, so a
+    reader that is cancelled (e.g. its client disconnected) doesn't cut the
+    stream short for the others.
+    """
+
+    def __init__(self, group: "SingleFlight", key: Hashable, source: AsyncIterator[Any]):
+        self.group = group
+        self.key = key
+        self.source = source
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        self._pull = asyncio.Lock()
+        self._pending: Optional[asyncio.Future] = None
+
+    async def read(self) -> AsyncIterator[Any]:
+        index = 0
+        try:
+            while True:
+                if index < len(self.chunks):
+                    index += 1
+                    yield self.chunks[index - 1]
+                    continue
+                async with self._pull:
+                    if index < len(self.chunks):
+                        continue
+                    if self.done:
+                        if self.error is not None:
+                            raise self.error
+                        return
+                    if self._pending is None:
+                        self._pending = asyncio.ensure_future(self.source.__anext__())
+                    try:
+                        chunk = await asyncio.shield(self._pending)
+                    except StopAsyncIteration:
+                        self._pending = None
+                        self._finish()
+                    except Exception as e:
+                        self._pending = None
+                        self.error = e
+                        self._finish()
+                    else:
+                        self._pending = None
+                        self.chunks.append(chunk)
+        finally:
+            if self.group._leave(self):
+                if self._pending is not None:
+                    self._pending.cancel()
+                else:
+                    await self.source.aclose()
+
+    def _finish(self) -> None:
+        self.done = True
+        self.group._forget(self.key, self)
+
+
+class SingleFlight:
+    """Share in-flight calls and streams between concurrent callers with the same key."""
+
+    def __init__(self, kind: str):
+        """
+        Initialize the group.
+
+        Args:
+            kind: Name of the calls (metric label and log context)
+        """
+        self.kind = kind
+        self._calls: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call ``fn(*args, **kwargs)``, or wait for the identical call already in flight.
+
+        Args:
+            key: Identifies identical calls
+            fn: The call
+
+        Returns:
+            The call's result (the same object for every caller)
+
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            COALESCED.inc(kind=self.kind)
+            logger.debug("Joined in-flight %s call", self.kind)
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._forget(key, future)
+
+    def stream(self, key: Hashable, fn: Callable[..., Iterator[Any]], *args, **kwargs) -> Iterator[Any]:
+        """
+        Iterate ``fn(*args, **kwargs)``, or join the identical stream already in flight.
+
+        The source is closed once every reader has stopped early.
+
+        Args:
+            key: Identifies identical streams
+            fn: Returns the stream
+
+        Returns:
+            An iterator over every chunk of the stream from its start
+        """
+        with self._lock:
+            broadcast = self._calls.get(key)
+            if broadcast is None:
+                broadcast = self._calls[key] = _Broadcast(self, key, iter(fn(*args, **kwargs)))
+            else:
+                COALESCED.inc(kind=self.kind)
+                logger.debug("Joined in-flight %s stream", self.kind)
+            broadcast.readers += 1
+        return broadcast.read()
+
+    def stream_async(self, key: Hashable, fn: Callable[..., AsyncIterator[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Async version of ``stream`` for async generators (readers share one event loop).
+
+        Args:
+            key: Identifies identical streams
+            fn: Returns the async stream
+
+        Returns:
+            An async iterator over every chunk of the stream from its start
+        """
+        with self._lock:
+            broadcast = self._calls.get(key)
+            if broadcast is None:
+                broadcast = self._calls[key] = _AsyncBroadcast(self, key, fn(*args, **kwargs).__aiter__())
+            else:
+                COALESCED.inc(kind=self.kind)
+                logger.debug("Joined in-flight %s stream", self.kind)
+            broadcast.readers += 1
+        return broadcast.read()
+
+    def in_flight(self) -> int:
+        """Number of calls and streams currently shared."""
+        with self._lock:
+            return len(self._calls)
+
+    def _forget(self, key: Hashable, call: Any) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def _leave(self, broadcast) -> bool:
+        """Drop a reader; True if it was the last one of an unfinished stream (the source should close)."""
+        with self._lock:
+            broadcast.readers -= 1
+            abandoned = broadcast.readers == 0 and not broadcast.done
+            if abandoned:
+                broadcast.done = True
+                if self._calls.get(broadcast.key) is broadcast:
+                    del self._calls[broadcast.key]
+        return abandoned
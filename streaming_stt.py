@@ -0,0 +1,139 @@
+"""Partial transcripts for Cortex Desktop Assistant.
+
+Google's free speech recognition only accepts a whole phrase, so recognition
+used to start after the endpointer closed the utterance, and the LLM call
+only after recognition returned. A ``PartialTranscriber`` is hooked into
+``vad.capture`` instead: while the user is still speaking it re-recognizes
+the audio captured so far every ``interval`` seconds (one request in flight
+at a time), and once more as soon as they pause. A hypothesis that repeats,
+or one taken at a pause, is considered stable and handed to ``speculate``
+(normally ``Assistant.speculate``) so the reply can be under way before the
+final transcript arrives.
+
+Example:
+    partials = PartialTranscriber(recognize_pcm, speculate=assistant.speculate)
+    utterance = capture(read_chunk, 16000, endpointer, on_chunk=partials)
+    text = recognize_final(utterance)
+    response = assistant.respond(text, speculation=partials.finish())
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, List, Optional
+
+from logger import get_logger
+from tracing import bind, span
+from vad import Endpointer
+
+# Initialize logger
+logger = get_logger("stt.partial")
+
+# Audio kept from before speech was confirmed, so the first word is not clipped
+LEAD_SECONDS = 0.3
+# Trailing silence after which the user is taken to have paused
+PAUSE_SECONDS = 0.1
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cortex-stt")
+
+
+class PartialTranscriber:
+    """Recognize an utterance in progress and speculate on stable hypotheses."""
+
+    def __init__(
+        self,
+        recognize: Callable[[bytes, int], str],
+        interval: float = 0.7,
+        stable_partials: int = 2,
+        speculate: Optional[Callable[[str], Any]] = None,
+    ):
+        """
+        Initialize the transcriber.
+
+        Args:
+            recognize: Transcribes 16-bit mono PCM at the given sample rate
+                (raises if nothing was understood)
+            interval: Seconds of new speech between partial recognitions
+            stable_partials: Identical consecutive partials that count as stable
+            speculate: Called with each new stable partial; its return value is
+                kept as the speculation
+        """
+        self.recognize = recognize
+        self.interval = interval
+        self.stable_partials = max(1, stable_partials)
+        self.speculate = speculate
+        self.partials: List[str] = []
+        self.stable: Optional[str] = None
+        self.speculation: Any = None
+        self._lead: Deque[bytes] = deque()
+        self._audio: List[bytes] = []
+        self._bytes = 0
+        self._submitted = 0
+        self._paused = False
+        self._future: Optional[Future] = None
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def __call__(self, data: bytes, endpointer: Endpointer) -> None:
+        """Take the next chunk from ``vad.capture``."""
+        if self._finished or endpointer.done:
+            return
+        rate = endpointer.vad.sample_rate
+        if not endpointer.started:
+            self._lead.append(data)
+            while len(self._lead) > 1 and sum(map(len, self._lead)) - len(self._lead[0]) >= LEAD_SECONDS * rate * 2:
+                self._lead.popleft()
+            return
+        if self._lead:
+            self._audio.extend(self._lead)
+            self._bytes += sum(map(len, self._lead))
+            self._lead.clear()
+        self._audio.append(data)
+        self._bytes += len(data)
+
+        pausing = endpointer.endpoint_delay >= PAUSE_SECONDS
+        if not pausing:
+            self._paused = False
+        if self._future is not None and not self._future.done():
+            return
+        new = self._bytes - self._submitted
+        at_pause = pausing and not self._paused and new > 0
+        if at_pause or new >= self.interval * rate * 2:
+            self._paused = self._paused or at_pause
+            self._submitted = self._bytes
+            self._future = _executor.submit(bind(self._transcribe), b"".join(self._audio), rate, at_pause)
+
+    def _transcribe(self, audio: bytes, sample_rate: int, at_pause: bool) -> None:
+        try:
+            with span("stt.partial", seconds=round(len(audio) / 2 / sample_rate, 2)):
+                text = " ".join(self.recognize(audio, sample_rate).lower().split())
+        except Exception as e:
+            logger.debug("Partial recognition failed: %s", e)
+            return
+        with self._lock:
+            if self._finished or not text:
+                return
+            self.partials.append(text)
+            logger.debug("Partial transcript: %s", text)
+            recent = self.partials[-self.stable_partials:]
+            stable = at_pause or (len(recent) == self.stable_partials and len(set(recent)) == 1)
+            if not stable or text == self.stable:
+                return
+            self.stable = text
+            if self.speculate is not None:
+                try:
+                    self.speculation = self.speculate(text)
+                except Exception as e:
+                    logger.warning("Speculation on '%s' failed: %s", text, e)
+                    self.speculation = None
+
+    def finish(self) -> Any:
+        """
+        Stop taking partials once the final transcript is known.
+
+        Returns:
+            The speculation for the last stable partial, if any
+        """
+        with self._lock:
+            self._finished = True
+            return self.speculation
@@ -0,0 +1,127 @@
+"""Tests for continuous microphone capture."""
+
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from audio_input import CaptureBuffer, CaptureError, Cursor, MicrophoneCapture, RecordingSource, WavSource
+
+
+def write_wav(path, samples, rate=8000, channels=1):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+
+
+def test_ring_wraps_with_zero_copy_views():
+    """Test that views alias the ring and split where it wraps."""
+    ring = CaptureBuffer(8)
+    ring.write(np.arange(6, dtype=np.int16))
+    ring.write(np.arange(6, 10, dtype=np.int16))
+    assert ring.position == 10 and ring.oldest == 2
+
+    views = ring.views(4, 10)
+    assert len(views) == 2
+    assert list(np.concatenate(views)) == [4, 5, 6, 7, 8, 9]
+    assert all(np.shares_memory(view, ring._data) for view in views)
+    assert list(ring.views(2, 6)[0]) == [2, 3, 4, 5]
+
+
+def test_overwritten_and_future_ranges_raise():
+    """Test that a range outside the held samples is refused."""
+    ring = CaptureBuffer(4)
+    ring.write(np.arange(6, dtype=np.int16))
+    with pytest.raises(CaptureError):
+        ring.views(1, 4)
+    with pytest.raises(CaptureError):
+        ring.views(4, 8)
+
+
+def test_cursor_pre_roll_and_seek():
+    """Test that a cursor reads captured audio from its position and catches up after an overrun."""
+    ring = CaptureBuffer(16)
+    ring.write(np.arange(12, dtype=np.int16))
+    cursor = Cursor(ring, 8, chunk=4)
+    assert np.frombuffer(cursor.read(), "<i2").tolist() == [8, 9, 10, 11]
+
+    cursor.seek(0)
+    assert cursor.position == 0
+    ring.write(np.arange(12, 24, dtype=np.int16))
+    # Fell behind: resumes at the oldest sample still held
+    assert np.concatenate(cursor.read_views()).tolist() == [8, 9, 10, 11]
+
+    cursor.skip_to_now()
+    assert cursor.position == 24
+    with pytest.raises(CaptureError):
+        ring.close()
+        cursor.read(timeout=1)
+
+
+def test_microphone_capture_feeds_cursors():
+    """Test that the capture thread fills the ring and cursors can start in the past."""
+    chunks = iter(np.arange(i * 4, i * 4 + 4, dtype="<i2").tobytes() for i in range(5))
+    finished = threading.Event()
+
+    def read_chunk():
+        try:
+            return next(chunks)
+        except StopIteration:
+            finished.set()
+            raise EOFError("stream closed")
+
+    mic = MicrophoneCapture(read_chunk, 10, seconds=1.6, chunk=4).start()
+    assert finished.wait(1)
+    mic.stop()
+    assert mic.buffer.position == 20 and mic.buffer.closed
+
+    cursor = mic.cursor(pre_roll=0.8)
+    assert cursor.position == 12
+    assert np.frombuffer(cursor.read(), "<i2").tolist() == [12, 13, 14, 15]
+
+
+def test_wav_source_replays_like_a_microphone(tmp_path):
+    """Test that a recording is read in chunks, paced in real time, continued across reopens and ends with EOFError."""
+    path = tmp_path / "session.wav"
+    write_wav(path, np.repeat(np.arange(100, dtype=np.int16), 2).reshape(-1, 2), channels=2)  # Stereo is mixed down
+
+    source = WavSource(str(path), realtime=False, chunk=40)
+    assert source.SAMPLE_RATE == 8000 and source.duration == pytest.approx(100 / 8000)
+    with source:
+        first = np.frombuffer(source.stream.read(source.CHUNK), "<i2")
+    with source:
+        second = np.frombuffer(source.stream.read(source.CHUNK), "<i2")
+        third = np.frombuffer(source.stream.read(source.CHUNK), "<i2")
+        with pytest.raises(EOFError):
+            source.stream.read(source.CHUNK)
+    assert first.tolist() == list(range(40)) and second[0] == 40
+    assert third[:20].tolist() == list(range(80, 100)) and not third[20:].any()  # Padded with silence
+
+    paced = WavSource(str(path), realtime=True, chunk=40)
+    began = time.monotonic()
+    for _ in range(3):
+        paced.stream.read(paced.CHUNK)
+    assert time.monotonic() - began >= 0.012
+
+
+def test_recording_source_saves_what_was_read(tmp_path):
+    """Test that reads through a recording source are written to a WAV file across reopens."""
+    original = tmp_path / "in.wav"
+    write_wav(original, np.arange(64))
+    recording = RecordingSource(WavSource(str(original), realtime=False, chunk=16), str(tmp_path / "out.wav"))
+    for _ in range(2):
+        with recording as source:
+            assert source.SAMPLE_RATE == 8000
+            source.stream.read(source.CHUNK)
+    recording.close()
+
+    replay = WavSource(str(tmp_path / "out.wav"), realtime=False, chunk=32)
+    assert np.frombuffer(replay.stream.read(32), "<i2").tolist() == list(range(32))
+
+    with pytest.raises(CaptureError):
+        (tmp_path / "bad.wav").write_bytes(b"not a wav")
+        WavSource(str(tmp_path / "bad.wav"))
@@ -0,0 +1,110 @@
+"""Tests for the gapless audio output queue."""
+
+import time
+
+import numpy as np
+import pytest
+
+from audio_output import AudioOutput, RingBuffer, remix, resample
+from audio_utils import PCMClip
+
+
+def drain(output, frames=256, timeout=2.0):
+    """Pull blocks like a device callback until everything submitted has played."""
+    blocks = []
+    deadline = time.monotonic() + timeout
+    while not output.idle and time.monotonic() < deadline:
+        blocks.append(output.render(frames))
+        time.sleep(0.001)
+    return np.concatenate(blocks)[:, 0] if blocks else np.zeros(0)
+
+
+def trim(samples):
+    """Drop the silence padded around the rendered audio."""
+    nonzero = np.flatnonzero(samples)
+    return samples[nonzero[0]:nonzero[-1] + 1]
+
+
+def test_ring_buffer_wraps():
+    """Test that reads and writes wrap around the end of the buffer."""
+    ring = RingBuffer(8)
+    assert ring.write(np.arange(6, dtype=np.float32)[:, None]) == 6
+    block, taken = ring.read(4)
+    assert taken == 4 and list(block[:, 0]) == [0, 1, 2, 3]
+    assert ring.write(np.arange(6, 12, dtype=np.float32)[:, None]) == 6
+    assert ring.space == 0
+    block, taken = ring.read(10)
+    assert taken == 8 and list(block[:8, 0]) == [4, 5, 6, 7, 8, 9, 10, 11]
+    assert not block[8:].any()
+
+
+def test_resample_and_remix():
+    """Test rate and channel conversion."""
+    ramp = np.linspace(0, 1, 240, dtype=np.float32)
+    up = resample(ramp, 24000, 48000)
+    assert len(up) == 480 and np.all(np.diff(up) >= 0)
+    assert np.isclose(up[0], 0) and np.isclose(up[-1], 1)
+    assert len(resample(np.zeros((441, 2), np.float32), 44100, 16000)) == 160
+
+    assert remix(ramp, 2).shape == (240, 2)
+    stereo = np.stack([ramp, -ramp], axis=1)
+    assert np.allclose(remix(stereo, 1), 0)
+
+
+def test_clips_play_back_to_back():
+    """Test that queued clips are played without a gap and then reported done."""
+    output = AudioOutput(sample_rate=8000, buffer_seconds=0.5).start()
+    first = output.submit(PCMClip(np.full(1000, 0.5, np.float32), 8000))
+    second = output.submit(PCMClip(np.full(500, 0.25, np.float32), 4000))  # Resampled to 1000 frames
+    audio = trim(drain(output))
+    output.close()
+
+    assert first.done and second.done and not first.cancelled
+    assert len(audio) == 2000
+    assert np.allclose(audio[:1000], 0.5) and np.allclose(audio[1000:], 0.25)
+
+
+def test_crossfade_and_volume():
+    """Test that consecutive clips overlap by the crossfade and volume scales output."""
+    output = AudioOutput(sample_rate=8000, crossfade=0.01, volume=0.5).start()  # 80 frame fade
+    output.submit(PCMClip(np.full(400, 0.8, np.float32), 8000))
+    output.submit(PCMClip(np.full(400, 0.4, np.float32), 8000))
+    # Nothing is pulled yet, so the last clip's held-back end is flushed once no clip follows
+    deadline = time.monotonic() + 2
+    while output.ring.available < 720 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    audio = trim(drain(output))
+    output.close()
+
+    assert len(audio) == 720
+    assert np.allclose(audio[:320], 0.4) and np.allclose(audio[-320:], 0.2)
+    fade = audio[320:400]
+    assert np.all(np.diff(fade) <= 1e-6) and 0.2 <= fade.min() <= fade.max() <= 0.4
+
+
+def test_rate_applied_at_play_time():
+    """Test that the speaking rate shortens queued clips without a new rendering."""
+    output = AudioOutput(sample_rate=8000, buffer_seconds=1.0, rate=1.25).start()
+    t = np.arange(4000) / 8000
+    playback = output.submit(PCMClip((0.5 * np.sin(2 * np.pi * 200 * t)).astype(np.float32), 8000))
+    audio = drain(output)
+    output.close()
+    assert playback.done
+    assert len(trim(audio)) == pytest.approx(3200, abs=10)
+
+
+def test_clear_cancels_pending_clips():
+    """Test that clear() drops buffered and queued audio."""
+    output = AudioOutput(sample_rate=8000, buffer_seconds=0.1).start()
+    playing = output.submit(PCMClip(np.ones(4000, np.float32), 8000))
+    queued = output.submit(PCMClip(np.ones(4000, np.float32), 8000))
+    output.render(100)
+    output.clear()
+    assert playing.wait(1) and queued.wait(1)
+    assert playing.cancelled and queued.cancelled
+    assert output.wait_idle(timeout=1)
+
+    after = output.submit(PCMClip(np.full(100, 0.5, np.float32), 8000))
+    assert np.allclose(trim(drain(output)), 0.5)
+    assert after.done and not after.cancelled
+    output.close()
@@ -0,0 +1,141 @@
+"""Tests for batch mode."""
+
+import io
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from assistant import Response
+from audio_utils import PCMClip, decode_wav, encode_wav
+from batch import BatchRunner, read_items
+from config_utils import AppConfig
+from tts_scheduler import BULK, current_priority
+
+
+class SlowAssistant:
+    """Answers after a short delay and tracks peak concurrency."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def respond(self, text, history=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        if text == "boom":
+            raise RuntimeError("upstream failed")
+        return Response("chat", iter(["Re: ", text]), "Groq")
+
+
+def test_read_items_accepts_strings_and_objects():
+    """Test parsing of the supported input line formats."""
+    stream = io.StringIO('"hello"\n\n{"id": "b", "prompt": "hi", "audio": "b.mp3"}\n')
+    items = list(read_items(stream))
+
+    assert [(i.id, i.text, i.audio) for i in items] == [("0", "hello", None), ("b", "hi", "b.mp3")]
+
+
+def test_read_items_rejects_missing_text():
+    """Test that lines without text are reported."""
+    with pytest.raises(ValueError, match="Line 1"):
+        list(read_items(io.StringIO('{"id": 1}\n')))
+
+
+def test_batch_runs_concurrently_in_order(tmp_path):
+    """Test concurrency, ordering, timings, errors and audio output."""
+    config = AppConfig(batch={"concurrency": 4, "audio_dir": str(tmp_path)})
+    assistant = SlowAssistant()
+    runner = BatchRunner(config, assistant, synthesize=lambda text: text.encode())
+    prompts = io.StringIO("\n".join(json.dumps(p) for p in ["one", "two", "boom", "four"]))
+    output = io.StringIO()
+
+    summary = runner.run(read_items(prompts), output)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r["text"] for r in results] == ["one", "two", "boom", "four"]
+    assert results[0]["reply"] == "Re: one"
+    assert "error" in results[2]
+    assert (tmp_path / "0.mp3").read_bytes() == b"Re: one"
+    assert "tts_ms" in results[0]["timings"]
+    assert assistant.peak > 1
+    assert summary["items"] == 4 and summary["errors"] == 1
+
+
+def test_audio_names_cannot_leave_audio_dir(tmp_path):
+    """Test that per-item audio names with a path are rejected instead of written elsewhere."""
+    audio_dir = tmp_path / "audio"
+    config = AppConfig(batch={"concurrency": 1, "audio_dir": str(audio_dir)})
+    runner = BatchRunner(config, SlowAssistant(), synthesize=lambda text: text.encode())
+    prompts = [
+        {"text": "one", "audio": "../escape.mp3"},
+        {"text": "two", "audio": str(tmp_path / "absolute.mp3")},
+        {"text": "three", "audio": "ok.mp3"},
+    ]
+    output = io.StringIO()
+
+    runner.run(read_items(io.StringIO("\n".join(json.dumps(p) for p in prompts))), output)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert "must not contain a path" in results[0]["error"]
+    assert "must not contain a path" in results[1]["error"]
+    assert not (tmp_path / "escape.mp3").exists() and not (tmp_path / "absolute.mp3").exists()
+    assert (audio_dir / "ok.mp3").read_bytes() == b"Re: three"
+
+
+def test_bad_lines_reported_and_input_streamed():
+    """Test that a malformed line gets an error result in place and input is read a window at a time."""
+    pulled = []
+    first_write = []
+
+    class Output(io.StringIO):
+        def write(self, text):
+            if not first_write:
+                first_write.append(len(pulled))
+            return super().write(text)
+
+    def lines():
+        for n in range(20):
+            pulled.append(n)
+            yield "{oops\n" if n == 1 else json.dumps(f"prompt {n}") + "\n"
+
+    config = AppConfig(batch={"concurrency": 2})
+    runner = BatchRunner(config, SlowAssistant())
+    output = Output()
+
+    summary = runner.run(read_items(lines(), strict=False), output)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(results) == 20
+    assert results[1]["id"] == "1" and "invalid JSON" in results[1]["error"]
+    assert results[2]["reply"] == "Re: prompt 2"
+    assert summary["items"] == 20 and summary["errors"] == 1
+    # The first result was written before the whole input was read
+    assert first_write[0] <= 5
+
+
+def test_audio_rendered_one_sentence_at_a_time(tmp_path):
+    """Test that replies are synthesized per sentence at bulk priority and joined into one file."""
+    class TwoSentences(SlowAssistant):
+        def respond(self, text, history=None):
+            return Response("chat", "First one. Second one!", "Groq")
+
+    rendered = []
+
+    def synthesize(text):
+        rendered.append((text, current_priority()))
+        return encode_wav(PCMClip(np.full(100, 0.5, np.float32), 8000))
+
+    config = AppConfig(batch={"concurrency": 1, "audio_dir": str(tmp_path), "engine": "chatterbox"})
+    runner = BatchRunner(config, TwoSentences(), synthesize=synthesize)
+    runner.run(read_items(io.StringIO('"hi"')), io.StringIO())
+
+    assert rendered == [("First one.", BULK), ("Second one!", BULK)]
+    assert decode_wav((tmp_path / "0.wav").read_bytes()).frames == 200
@@ -60,6 +60,15 @@ def test_config_validation():
     assert config.mode == "wake"
 
 
+def test_replay_requires_vad():
+    """Test that replaying or recording a session needs the VAD endpointer."""
+    with pytest.raises(ValueError, match="require vad.enabled"):
+        AppConfig(vad={"enabled": False}, capture={"replay": "session.wav"})
+    with pytest.raises(ValueError, match="require vad.enabled"):
+        AppConfig(vad={"enabled": False}, capture={"record": "session.wav"})
+    assert AppConfig(capture={"replay": "session.wav"}).capture.replay == "session.wav"
+
+
 def test_voice_config_defaults():
     """Test voice config defaults."""
     from config_utils import VoiceConfig
@@ -0,0 +1,96 @@
+"""Tests for the intent router."""
+
+from unittest.mock import patch
+
+from assistant import Assistant
+from config_utils import AppConfig
+from intent_router import CONTAINS, EXACT, PREFIX, Intent, IntentRouter
+
+
+def make_router():
+    router = IntentRouter()
+    router.add(Intent("search", ["search for", "look up", "find"], match=PREFIX))
+    router.add(Intent("shutdown", ["shutdown", "goodbye"], match=CONTAINS, priority=100))
+    router.add(Intent("time", ["what time is it"], match=EXACT))
+    return router
+
+
+def test_prefix_match_extracts_argument():
+    """Test that prefix intents match at the start and return the remainder."""
+    match = make_router().route("Search for the best pizza")
+    assert match.name == "search"
+    assert match.argument == "the best pizza"
+
+
+def test_prefix_must_start_utterance():
+    """Test that a prefix phrase in the middle doesn't match."""
+    assert make_router().route("can you look up something") is None
+
+
+def test_contains_and_priority():
+    """Test that higher-priority intents win over earlier matches."""
+    match = make_router().route("find a way to say goodbye")
+    assert match.name == "shutdown"
+
+
+def test_exact_match():
+    """Test that exact intents only match the whole utterance."""
+    router = make_router()
+    assert router.route("What time is it?").name == "time"
+    assert router.route("what time is it in Tokyo") is None
+
+
+def test_fuzzy_match_for_stt_errors():
+    """Test that a one-edit recognition error still routes."""
+    match = make_router().route("serch for cats")
+    assert match.name == "search"
+    assert match.fuzzy
+    assert match.argument == "cats"
+
+
+def test_fuzzy_can_be_disabled_per_intent():
+    """Test that intents with fuzzy=False require exact words."""
+    router = IntentRouter()
+    router.add(Intent("shutdown", ["shutdown"], match=CONTAINS, fuzzy=False))
+    assert router.route("shutdwn") is None
+    assert router.route("please shutdown") is not None
+
+
+def test_many_commands_single_automaton():
+    """Test routing with many registered phrases."""
+    router = make_router()
+    for i in range(500):
+        router.add(Intent(f"cmd{i}", [f"run command number {i}"], match=EXACT))
+    assert router.route("run command number 321").name == "cmd321"
+    assert router.route("search for cats").name == "search"
+
+
+def test_dispatch_default():
+    """Test that unmatched utterances go to the default handler."""
+    router = make_router()
+    router.add(Intent("hello", ["hello"], match=EXACT, handler=lambda m: "hi"))
+    assert router.dispatch("hello") == "hi"
+    assert router.dispatch("tell me a joke", default=lambda text: "llm") == "llm"
+
+
+@patch("assistant.search_web")
+@patch("assistant.chat_with_groq", return_value="LLM reply")
+def test_bare_search_trigger_goes_to_llm(mock_chat, mock_search):
+    """Test that a search trigger with nothing to search for is answered by the LLM."""
+    assistant = Assistant(AppConfig(search={"grounding": "off"}))
+
+    response = assistant.respond("look up")
+    assert response.intent == "chat"
+    assert response.reply == "LLM reply"
+    assert assistant.speculate("find ").intent == "chat"
+    mock_search.assert_not_called()
+
+
+@patch("assistant.chat_with_groq")
+def test_assistant_wake_routes_without_llm(mock_chat):
+    """Test that control intents never reach the LLM."""
+    assistant = Assistant(AppConfig(mode="wake"))
+
+    assert assistant.respond("ok goodbye").intent == "shutdown"
+    assert assistant.respond("hey cortex").intent == "wake"
+    mock_chat.assert_not_called()
@@ -0,0 +1,81 @@
+"""Tests for queue-based and structured logging."""
+
+import json
+import logging
+import logging.handlers
+
+import pytest
+
+from logger import DebugSampler, flush_logs, setup_logger, turn_id
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    yield tmp_path / "cortex.log"
+    # Restore the default application logger
+    setup_logger("cortex", "info")
+
+
+def test_queue_logging_writes_on_background_thread(log_file):
+    """Test that the logger only enqueues and the listener writes the file."""
+    logger = setup_logger("cortex", "info", log_file=log_file, console=False)
+    [handler] = logger.handlers
+    assert isinstance(handler, logging.handlers.QueueHandler)
+
+    logger.info("queued %s", "message")
+    flush_logs()
+    assert "queued message" in log_file.read_text()
+
+
+def test_json_format_includes_turn_and_extra_fields(log_file):
+    """Test JSON lines carry the turn id and timing fields."""
+    setup_logger("cortex", "info", log_file=log_file, console=False, json_format=True)
+    token = turn_id.set("turn-7")
+    try:
+        logging.getLogger("cortex.search").info("done", extra={"elapsed_ms": 12.5})
+    finally:
+        turn_id.reset(token)
+    flush_logs()
+
+    record = json.loads(log_file.read_text().splitlines()[-1])
+    assert record["message"] == "done"
+    assert record["logger"] == "cortex.search"
+    assert record["turn"] == "turn-7"
+    assert record["elapsed_ms"] == 12.5
+
+
+def test_message_arguments_are_frozen_at_call_time(log_file):
+    """Test later changes to mutable arguments don't change queued records."""
+    logger = setup_logger("cortex", "info", log_file=log_file, console=False)
+    items = ["a"]
+    logger.info("items=%s", items)
+    items.append("b")
+    flush_logs()
+    assert "items=['a']" in log_file.read_text()
+
+
+def test_synchronous_mode(log_file):
+    """Test the handlers can still run on the calling thread."""
+    logger = setup_logger("cortex", "info", log_file=log_file, console=False, use_queue=False)
+    logger.info("direct")
+    for handler in logger.handlers:
+        handler.flush()
+    assert "direct" in log_file.read_text()
+
+
+def make_record(level=logging.DEBUG, msg="tick %d"):
+    return logging.LogRecord("cortex.audio", level, __file__, 1, msg, (1,), None)
+
+
+def test_debug_sampler_sampling_and_rate_limit():
+    """Test debug records are sampled and rate-limited per call site."""
+    sampled = DebugSampler(sample_rate=0.25)
+    kept = sum(sampled.filter(make_record()) for _ in range(100))
+    assert kept == 25 and sampled.dropped == 75
+
+    limited = DebugSampler(max_per_second=5)
+    kept = sum(limited.filter(make_record()) for _ in range(50))
+    assert kept == 5
+    # Other call sites and higher levels are unaffected
+    assert limited.filter(make_record(msg="other %d"))
+    assert all(limited.filter(make_record(logging.INFO)) for _ in range(20))
@@ -0,0 +1,50 @@
+"""Tests for loudness normalization."""
+
+import numpy as np
+import pytest
+
+from audio_output import AudioOutput
+from audio_utils import PCMClip
+from loudness import SILENCE, LoudnessNormalizer, limit, loudness
+
+
+def tone(amplitude, seconds=2.0, rate=48000, freq=997.0):
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_loudness_matches_reference_and_gates_silence():
+    """Test the BS.1770 reference level (997 Hz full scale sine is -3.01 LUFS) and that silence is gated out."""
+    assert loudness(tone(1.0), 48000) == pytest.approx(-3.01, abs=0.1)
+    assert loudness(tone(0.1), 48000) == pytest.approx(-23.01, abs=0.1)
+    # Pauses don't drag the level of speech down (averaged in, 2 s of silence would cost 3 dB)
+    padded = np.concatenate([tone(0.1), np.zeros(96000, np.float32)])
+    assert loudness(padded, 48000) == pytest.approx(-23.01, abs=0.5)
+    assert loudness(np.zeros(4800, np.float32), 48000) == SILENCE
+    assert loudness(np.zeros(0, np.float32), 48000) == SILENCE
+
+
+def test_limiter_holds_peaks_under_ceiling():
+    """Test that the limiter keeps peaks under the ceiling and leaves quiet audio alone."""
+    samples = tone(0.5, rate=16000)
+    samples[8000:8040] *= 4
+    limited = limit(samples, 16000, ceiling=0.8)
+    assert np.abs(limited).max() <= 0.8
+    assert np.allclose(limited[:7000], samples[:7000])  # Untouched away from the peak
+    quiet = tone(0.5, rate=16000)
+    assert limit(quiet, 16000, ceiling=0.8) is quiet
+
+
+def test_engines_play_at_the_same_level():
+    """Test that clips at different levels are brought to the target once, including at play time."""
+    normalizer = LoudnessNormalizer(target=-20.0, ceiling_db=-1.0)
+    quiet = normalizer(PCMClip(tone(0.02, rate=24000), 24000))
+    loud = normalizer(PCMClip(np.stack([tone(0.9, rate=24000)] * 2, axis=1), 24000))
+    assert loudness(quiet.samples, 24000) == pytest.approx(-20.0, abs=0.2)
+    assert loudness(loud.samples, 24000) == pytest.approx(-20.0, abs=0.2)
+    assert quiet.gain > 1 > loud.gain
+    assert normalizer(quiet) is quiet  # Already normalized
+
+    output = AudioOutput(sample_rate=24000, loudness=normalizer)
+    played = output.convert(PCMClip(tone(0.02, rate=24000), 24000))
+    assert np.allclose(played[:, 0], quiet.samples, atol=1e-6)
@@ -0,0 +1,84 @@
+"""Tests for the metrics registry."""
+
+import urllib.request
+
+import pytest
+
+from metrics import MetricsError, Registry, start_http_server, timer
+
+
+def test_counter_and_gauge_render():
+    """Test counters and gauges in the Prometheus text format."""
+    registry = Registry()
+    requests = registry.counter("tts_requests_total", "TTS requests", ["engine", "status"])
+    in_flight = registry.gauge("turns_in_flight", "Turns in flight")
+
+    requests.inc(engine="edge", status="ok")
+    requests.inc(2, engine="edge", status="ok")
+    requests.inc(engine="google", status="error")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    text = registry.render()
+    assert "# TYPE tts_requests_total counter" in text
+    assert 'tts_requests_total{engine="edge",status="ok"} 3' in text
+    assert 'tts_requests_total{engine="google",status="error"} 1' in text
+    assert "turns_in_flight 1" in text
+    assert requests.value(engine="edge", status="ok") == 3
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test histogram bucket, sum and count samples."""
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, route="chat")
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="chat",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="chat",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="chat",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{route="chat"} 4.05' in text
+    assert 'latency_seconds_count{route="chat"} 4' in text
+
+
+def test_timer_observes_even_on_error():
+    """Test the timer records a duration when the block raises."""
+    registry = Registry()
+    latency = registry.histogram("stage_seconds", "Stage latency")
+    with pytest.raises(RuntimeError):
+        with timer(latency):
+            raise RuntimeError("boom")
+    assert latency.count() == 1
+
+
+def test_label_and_registration_errors():
+    """Test mismatched labels and conflicting registrations are rejected."""
+    registry = Registry()
+    counter = registry.counter("c_total", "C", ["engine"])
+    assert registry.counter("c_total", "C", ["engine"]) is counter
+    with pytest.raises(MetricsError):
+        counter.inc(status="ok")
+    with pytest.raises(MetricsError):
+        registry.gauge("c_total", "C", ["engine"])
+    with pytest.raises(MetricsError):
+        counter.inc(-1, engine="edge")
+
+
+def test_http_endpoint_and_dump(tmp_path):
+    """Test serving and dumping the metrics."""
+    registry = Registry()
+    registry.counter("hits_total", "Hits").inc()
+    server = start_http_server("127.0.0.1", 0, registry)
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "hits_total 1" in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    path = registry.dump(tmp_path / "metrics.prom")
+    assert "hits_total 1" in path.read_text()
@@ -0,0 +1,115 @@
+"""Tests for the pre-rendered phrase bank."""
+
+import json
+
+import numpy as np
+import pytest
+
+from audio_utils import PCMClip, decode_wav, encode_wav
+from loudness import LoudnessNormalizer
+from phrase_bank import PhraseBank
+
+
+class FakeSynth:
+    """Renders a WAV tone whose pitch depends on the voice."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text, voice=None, speaking_rate=None):
+        self.calls.append((text, voice, speaking_rate))
+        t = np.arange(1600) / 16000
+        freq = 440 if voice == "a" else 880
+        return encode_wav(PCMClip((0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32), 16000))
+
+
+def make_bank(synth, tmp_path=None, voice="a", played=None):
+    return PhraseBank(
+        ["Shutting down.", "Goodbye!", "Goodbye!", ""],
+        synth,
+        "fake",
+        voice=voice,
+        rate=1.0,
+        fmt="wav",
+        cache_dir=tmp_path,
+        player=(played.append if played is not None else lambda clip: None),
+    )
+
+
+def test_wav_round_trip():
+    """Test that encoding and decoding keeps the samples."""
+    clip = PCMClip(np.linspace(-1, 1, 100, dtype=np.float32), 24000)
+    decoded = decode_wav(encode_wav(clip))
+    assert decoded.sample_rate == 24000
+    assert np.allclose(decoded.samples, clip.samples, atol=1e-4)
+
+
+def test_play_uses_prerendered_clip():
+    """Test that phrases play from memory and unknown text falls through."""
+    synth, played = FakeSynth(), []
+    bank = make_bank(synth, played=played)
+    assert not bank.play("Goodbye!")  # Not rendered yet
+    bank.warm(background=False)
+    assert len(synth.calls) == 2  # Duplicates and blanks skipped
+
+    assert bank.play("  goodbye! ")
+    assert not bank.play("Hello there.")
+    assert len(played) == 1 and played[0].duration == 0.1
+    assert len(synth.calls) == 2
+
+
+def test_cache_persists_and_voice_change_rerenders(tmp_path):
+    """Test that cached renders are reused until the voice changes."""
+    synth = FakeSynth()
+    make_bank(synth, tmp_path).warm(background=False)
+    assert len(list(tmp_path.glob("*.wav"))) == 2
+
+    make_bank(synth, tmp_path).warm(background=False)
+    assert len(synth.calls) == 2  # Loaded from the cache
+
+    bank = make_bank(synth, tmp_path, voice="b")
+    bank.warm(background=False)
+    assert len(synth.calls) == 4
+    assert len(list(tmp_path.glob("*.wav"))) == 2  # Old voice pruned
+
+    bank.set_voice("fake", synth, "a", 1.0, fmt="wav")
+    bank.wait(timeout=5)
+    assert bank.get("Goodbye!") is not None and bank.voice == "a"
+
+
+def test_failed_render_is_skipped():
+    """Test that a failing engine leaves the phrase to be synthesized live."""
+    def broken(text, voice=None, speaking_rate=None):
+        raise RuntimeError("engine down")
+
+    bank = make_bank(broken)
+    assert bank.render_all() == 0
+    assert not bank.play("Goodbye!")
+
+
+def test_pcm_synthesizer_skips_decoding(tmp_path):
+    """Test that clips from a PCM synthesizer are used as is and encoded only for the cache."""
+    clip = PCMClip(np.zeros(800, np.float32), 8000)
+    bank = PhraseBank(["Goodbye!"], lambda text, voice=None, speaking_rate=None: clip, "fake", fmt="mp3", cache_dir=tmp_path)
+    bank.warm(background=False)
+    assert bank.get("Goodbye!") is clip
+    assert decode_wav(next(tmp_path.glob("*.wav")).read_bytes()).duration == 0.1
+
+
+def test_cached_loudness_is_reused(tmp_path):
+    """Test that renders are normalized with the loudness stored beside them instead of re-measuring."""
+    synth = FakeSynth()
+    bank = make_bank(synth, tmp_path)
+    bank.normalizer = LoudnessNormalizer(target=-20.0)
+    bank.warm(background=False)
+    clip = bank.get("Goodbye!")
+    assert clip.gain is not None
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+    for meta in tmp_path.glob("*.json"):
+        meta.write_text(json.dumps({"loudness": -26.0}))
+    reloaded = make_bank(synth, tmp_path)
+    reloaded.normalizer = LoudnessNormalizer(target=-20.0)
+    reloaded.warm(background=False)
+    assert len(synth.calls) == 2
+    assert reloaded.get("Goodbye!").gain == pytest.approx(10 ** (6 / 20))
@@ -0,0 +1,126 @@
+"""Tests for the plugin system."""
+
+import sys
+
+from assistant import Assistant
+from config_utils import AppConfig
+from intent_router import EXACT, IntentRouter
+from plugin_manager import PLUGIN_FAILED_MESSAGE, PluginIntent, PluginManager, PluginSpec
+
+PLUGIN_SOURCE = '''
+def echo(match):
+    return "echo " + match.argument
+
+def count(match):
+    for i in range(3):
+        yield f"{i}. "
+
+def broken(match):
+    raise RuntimeError("oops")
+
+def broken_stream(match):
+    yield "0. "
+    raise KeyError("oops")
+
+def broken_at_start(match):
+    raise ImportError("oops")
+    yield "never"
+'''
+
+
+def write_plugin(tmp_path, monkeypatch, name):
+    (tmp_path / f"{name}.py").write_text(PLUGIN_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return PluginSpec(
+        name="demo",
+        module=name,
+        intents=[
+            PluginIntent(name="echo", phrases=["echo"], handler="echo"),
+            PluginIntent(name="count", phrases=["count to three"], handler="count", match=EXACT),
+            PluginIntent(name="broken", phrases=["break"], handler="broken"),
+            PluginIntent(name="broken_stream", phrases=["stream and break"], handler="broken_stream", match=EXACT),
+        ],
+    )
+
+
+def test_plugin_module_imported_lazily(tmp_path, monkeypatch):
+    """Test that a plugin is only imported when one of its intents matches."""
+    manager = PluginManager()
+    manager.register(write_plugin(tmp_path, monkeypatch, "cortex_lazy_plugin"))
+    router = IntentRouter()
+    manager.install(router)
+
+    router.route("echo hello")
+    assert "cortex_lazy_plugin" not in sys.modules
+
+    assert router.dispatch("echo hello") == "echo hello"
+    assert "cortex_lazy_plugin" in sys.modules
+    assert manager.stats["demo"].import_ms is not None
+    assert manager.stats["demo"].calls == 1
+
+
+def test_streaming_handler_is_timed(tmp_path, monkeypatch):
+    """Test that streamed plugin replies are passed through and timed."""
+    manager = PluginManager()
+    manager.register(write_plugin(tmp_path, monkeypatch, "cortex_stream_plugin"))
+    router = IntentRouter()
+    manager.install(router)
+
+    assert "".join(router.dispatch("count to three")) == "0. 1. 2. "
+    stats = manager.stats["demo"]
+    assert stats.calls == 1
+    assert "count" in stats.first_chunk_ms
+
+
+def test_failing_handler_falls_back_to_llm(tmp_path, monkeypatch):
+    """Test that a handler raising an arbitrary error is answered by the LLM instead."""
+    spec = write_plugin(tmp_path, monkeypatch, "cortex_broken_plugin")
+    config = AppConfig(plugins={"custom": [{
+        "name": spec.name,
+        "module": spec.module,
+        "intents": [{"name": "broken", "phrases": ["break"], "handler": "broken"}],
+    }]})
+    monkeypatch.setattr("assistant.chat_with_groq", lambda text, history=None: f"LLM: {text}")
+    assistant = Assistant(config)
+
+    response = assistant.respond("break the thing")
+    assert response.intent == "chat"
+    assert response.reply == "LLM: break the thing"
+    assert assistant.plugins.stats["demo"].errors == 1
+
+
+def test_failing_stream_ends_with_apology_or_falls_back(tmp_path, monkeypatch):
+    """Test that a generator failing part-way ends with an apology, and one failing at once falls back to the LLM."""
+    spec = write_plugin(tmp_path, monkeypatch, "cortex_broken_stream_plugin")
+    config = AppConfig(plugins={"custom": [{
+        "name": spec.name,
+        "module": spec.module,
+        "intents": [
+            {"name": "partway", "phrases": ["stream and break"], "handler": "broken_stream", "match": EXACT},
+            {"name": "at_start", "phrases": ["break at once"], "handler": "broken_at_start", "match": EXACT},
+        ],
+    }]})
+    monkeypatch.setattr("assistant.chat_with_groq", lambda text, history=None: f"LLM: {text}")
+    assistant = Assistant(config)
+
+    response = assistant.respond("stream and break")
+    assert response.intent == "demo.partway"
+    assert "".join(response.reply) == "0.  " + PLUGIN_FAILED_MESSAGE
+
+    response = assistant.respond("break at once")
+    assert response.intent == "chat"
+    assert response.reply == "LLM: break at once"
+    assert assistant.plugins.stats["demo"].errors == 2
+
+
+def test_builtin_clock_plugin_answers_locally():
+    """Test that the clock plugin answers without the LLM."""
+    response = Assistant(AppConfig()).respond("What time is it?")
+    assert response.intent == "clock.time"
+    assert response.reply.startswith("It's ")
+
+
+def test_builtin_plugins_can_be_disabled():
+    """Test that disabled built-in plugins aren't registered."""
+    config = AppConfig(plugins={"disabled": ["clock"]})
+    assert "clock" not in PluginManager.from_config(config).specs
@@ -0,0 +1,51 @@
+"""Tests for search-grounded answers."""
+
+from unittest.mock import patch
+
+import retrieval
+from retrieval import SpeculativeSearch, estimate_tokens, grounded_answer, iter_sentences, trim_results
+from web_search import NO_RESULTS_MESSAGE, SearchResult
+
+RESULTS = [
+    SearchResult("Python", "A programming language " * 40, "https://python.org"),
+    SearchResult("PyPI", "The package index", "https://pypi.org"),
+]
+
+
+def test_trim_results_respects_budget():
+    """Test that trimmed context stays within the token budget."""
+    context = trim_results(RESULTS, token_budget=50)
+
+    assert estimate_tokens(context) <= 50
+    assert "[1] Python" in context
+    assert "[2] PyPI (https://pypi.org): The package index" in context
+
+
+def test_iter_sentences_regroups_deltas():
+    """Test that streamed deltas are regrouped into sentences."""
+    chunks = ["Hel", "lo there. How", " are you? I'm", " fine"]
+    assert list(iter_sentences(chunks)) == ["Hello there.", "How are you?", "I'm fine"]
+
+
+@patch("retrieval.warm_up")
+@patch("retrieval.search_results", return_value=RESULTS)
+def test_grounded_answer_sends_results(mock_search, mock_warm_up):
+    """Test that search results are passed to the LLM as context."""
+    with patch("retrieval.stream_chat_with_groq", return_value=iter(["It's ", "a language."])) as mock_chat:
+        answer = "".join(grounded_answer("what is python", SpeculativeSearch("python"), timeout=1))
+
+    assert answer == "It's a language."
+    question, context, _ = mock_chat.call_args[0]
+    assert question == "what is python"
+    assert "https://pypi.org" in context
+
+
+@patch("retrieval.warm_up")
+@patch("retrieval.search_results", return_value=[])
+def test_grounded_answer_without_results(mock_search, mock_warm_up):
+    """Test the no-results message when results are required."""
+    with patch.object(retrieval, "stream_chat_with_groq") as mock_chat:
+        answer = list(grounded_answer("q", SpeculativeSearch("q"), timeout=1, require_results=True))
+
+    assert answer == [NO_RESULTS_MESSAGE]
+    mock_chat.assert_not_called()
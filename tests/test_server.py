@@ -0,0 +1,99 @@
+"""Tests for the headless server mode."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from assistant import Response
+from config_utils import AppConfig
+from server import CortexServer
+
+
+class FakeAssistant:
+    """Echoes the input and the number of remembered messages."""
+
+    def respond(self, text, history=None):
+        return Response("chat", iter([f"You said {text}. ", f"History {len(history or [])}."]), "Groq")
+
+
+async def fake_synthesizer(text):
+    yield text.encode()
+
+
+def run(coro_fn, **config):
+    async def runner():
+        server = CortexServer(AppConfig(**config), FakeAssistant(), fake_synthesizer)
+        async with TestClient(TestServer(server.build_app())) as client:
+            return await coro_fn(client)
+    return asyncio.run(runner())
+
+
+def test_chat_keeps_session_history():
+    """Test that a session remembers earlier turns."""
+    async def scenario(client):
+        first = await (await client.post("/v1/chat", json={"text": "hi"})).json()
+        second = await (await client.post(
+            "/v1/chat", json={"text": "again", "session_id": first["session_id"]}
+        )).json()
+        return first, second
+
+    first, second = run(scenario)
+    assert first["reply"] == "You said hi. History 0."
+    assert second["session_id"] == first["session_id"]
+    assert second["reply"].endswith("History 2.")
+
+
+def test_chat_requires_text():
+    """Test that empty requests are rejected."""
+    async def scenario(client):
+        return (await client.post("/v1/chat", json={})).status
+
+    assert run(scenario) == 400
+
+
+def test_speak_streams_audio_per_sentence():
+    """Test that audio is streamed sentence by sentence."""
+    async def scenario(client):
+        resp = await client.post("/v1/speak", json={"text": "hello"})
+        return resp.headers["Content-Type"], await resp.read()
+
+    content_type, body = run(scenario)
+    assert content_type == "audio/mpeg"
+    assert body == b"You said hello.History 0."
+
+
+def test_websocket_turn_and_stats():
+    """Test a WebSocket turn and the stats endpoint."""
+    async def scenario(client):
+        async with client.ws_connect("/v1/ws") as ws:
+            session = await ws.receive_json()
+            await ws.send_json({"text": "yo"})
+            messages = []
+            while True:
+                message = await ws.receive_json()
+                messages.append(message)
+                if message["type"] == "reply":
+                    break
+        stats = await (await client.get("/v1/stats")).json()
+        return session, messages, stats
+
+    session, messages, stats = run(scenario)
+    assert session["type"] == "session"
+    assert [m["text"] for m in messages if m["type"] == "delta"] == ["You said yo.", "History 0."]
+    assert stats["routes"]["ws"]["count"] == 1
+    assert stats["sessions_created"] == 1
+
+
+def test_metrics_endpoint():
+    """Test that Prometheus metrics are served alongside the API."""
+    async def scenario(client):
+        resp = await client.get("/metrics")
+        return resp.headers["Content-Type"], await resp.text()
+
+    content_type, text = run(scenario)
+    assert content_type.startswith("text/plain")
+    assert "# TYPE cortex_turns_in_flight gauge" in text
@@ -0,0 +1,97 @@
+"""Tests for request coalescing."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    """Test that identical calls in flight share one call, its result and its errors."""
+    flight, calls, release = SingleFlight("test"), [], threading.Event()
+
+    def slow(value):
+        calls.append(value)
+        release.wait(1)
+        if value == "bad":
+            raise ValueError("upstream failed")
+        return [value]
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        same = [pool.submit(flight.do, "a", slow, "a") for _ in range(3)]
+        other = pool.submit(flight.do, "b", slow, "b")
+        failing = [pool.submit(flight.do, "bad", slow, "bad") for _ in range(2)]
+        while len(calls) < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        results = [f.result() for f in same]
+
+    assert results[0] == ["a"] and all(r is results[0] for r in results)
+    assert other.result() == ["b"]
+    for future in failing:
+        with pytest.raises(ValueError):
+            future.result()
+    assert sorted(calls) == ["a", "b", "bad"]
+    assert flight.in_flight() == 0
+    assert flight.do("a", slow, "a") == ["a"] and len(calls) == 4  # Forgotten once finished
+
+
+def test_stream_is_replayed_to_late_joiners():
+    """Test that a reader joining a stream gets every chunk and the source is iterated once."""
+    flight, started = SingleFlight("test"), []
+
+    def source():
+        started.append(True)
+        yield from "abc"
+
+    first = flight.stream("k", source)
+    assert next(first) == "a"
+    second = flight.stream("k", source)
+    assert list(second) == ["a", "b", "c"]
+    assert list(first) == ["b", "c"]
+    assert len(started) == 1 and flight.in_flight() == 0
+
+
+def test_abandoned_stream_is_closed():
+    """Test that the source is closed once every reader stops early."""
+    flight, closed = SingleFlight("test"), []
+
+    def source():
+        try:
+            yield from range(10)
+        finally:
+            closed.append(True)
+
+    first, second = flight.stream("k", source), flight.stream("k", source)
+    assert next(first) == 0 and next(second) == 0
+    first.close()
+    assert not closed
+    second.close()
+    assert closed and flight.in_flight() == 0
+
+
+def test_async_stream_survives_a_cancelled_reader():
+    """Test that cancelling one reader of a shared async stream leaves the others whole."""
+    flight, started = SingleFlight("test"), []
+
+    async def source():
+        started.append(True)
+        for chunk in (b"1", b"2", b"3"):
+            await asyncio.sleep(0.02)
+            yield chunk
+
+    async def collect():
+        return [chunk async for chunk in flight.stream_async("k", source)]
+
+    async def run():
+        quitter = asyncio.ensure_future(collect())
+        stayer = asyncio.ensure_future(collect())
+        await asyncio.sleep(0.03)
+        quitter.cancel()
+        return await stayer
+
+    assert asyncio.run(run()) == [b"1", b"2", b"3"]
+    assert len(started) == 1
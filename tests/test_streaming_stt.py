@@ -0,0 +1,94 @@
+"""Tests for partial transcripts and speculative replies."""
+
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from assistant import Assistant
+from config_utils import AppConfig
+from streaming_stt import PartialTranscriber
+from vad import Endpointer, VoiceActivityDetector, capture
+
+RATE = 16000
+
+
+def command(speech=1.2, silence=1.0):
+    """Harmonic 'speech' followed by quiet noise, as 16-bit PCM chunks read in real time."""
+    t = np.arange(int(speech * RATE)) / RATE
+    voiced = 0.2 * sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    quiet = 0.001 * np.random.default_rng(0).standard_normal(int(silence * RATE))
+    pcm = (np.concatenate([quiet[:3200], voiced, quiet]) * 32767).astype("<i2").tobytes()
+    chunks = iter(pcm[i:i + 2048] for i in range(0, len(pcm), 2048))
+
+    def read():
+        time.sleep(0.002)
+        return next(chunks, bytes(2048))
+
+    return read
+
+
+def words_heard(audio, sample_rate):
+    """Fake recognizer: the longer the audio, the more of the sentence is heard."""
+    words = "what is the weather in paris".split()
+    return " ".join(words[:int(len(audio) / 2 / sample_rate / 0.25)])
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_partials_speculate_at_pause():
+    """Test that partials arrive while speaking and the one taken at the pause is speculated on."""
+    started = []
+    partials = PartialTranscriber(words_heard, interval=0.4, speculate=lambda text: started.append(text) or text)
+    vad = VoiceActivityDetector(RATE)
+    capture(command(), RATE, Endpointer(vad), on_chunk=partials)
+
+    assert wait_for(lambda: started)
+    assert started == ["what is the weather in paris"]
+    assert len(partials.partials) >= 2
+    assert partials.partials[0] != partials.stable  # Earlier partials were incomplete
+    assert partials.finish() == "what is the weather in paris"
+
+
+def test_repeated_partial_is_stable_and_finish_stops_speculating():
+    """Test stability by repetition and that nothing is started after finish()."""
+    started = []
+    partials = PartialTranscriber(lambda audio, rate: "hello", interval=0.1, stable_partials=3, speculate=started.append)
+    partials._transcribe(b"", RATE, at_pause=False)
+    partials._transcribe(b"", RATE, at_pause=False)
+    assert started == []
+    partials._transcribe(b"", RATE, at_pause=False)
+    partials._transcribe(b"", RATE, at_pause=False)
+    assert started == ["hello"]  # Only once per distinct hypothesis
+
+    partials.finish()
+    partials._transcribe(b"", RATE, at_pause=True)
+    assert started == ["hello"]
+
+
+@patch("assistant.chat_with_groq", return_value="It's sunny.")
+def test_speculative_reply_reused_when_final_matches(mock_chat):
+    """Test that a matching final transcript reuses the in-flight LLM call."""
+    assistant = Assistant(AppConfig())
+    speculation = assistant.speculate("What's the weather in Paris")
+    response = assistant.respond("what's the weather in paris?", speculation=speculation)
+    assert response.intent == "chat" and response.reply == "It's sunny."
+    mock_chat.assert_called_once()
+
+
+@patch("assistant.chat_with_groq", return_value="reply")
+def test_speculative_reply_discarded_on_mismatch(mock_chat):
+    """Test that a different final transcript is answered afresh and control intents are not speculated."""
+    assistant = Assistant(AppConfig(mode="wake"))
+    speculation = assistant.speculate("what's the weather")
+    assistant.respond("what's the weather in paris", speculation=speculation)
+    assert wait_for(lambda: mock_chat.call_count == 2)  # The speculative call is abandoned, not reused
+    assert {call.args[0] for call in mock_chat.call_args_list} == {"what's the weather", "what's the weather in paris"}
+
+    assert assistant.speculate("ok goodbye") is None
+    assert assistant.speculate("hey cortex") is None
@@ -0,0 +1,50 @@
+"""Tests for the pitch-preserving time-stretch."""
+
+import time
+
+import numpy as np
+import pytest
+
+from time_stretch import time_stretch
+
+RATE = 24000
+
+
+def tone(seconds, freq=220.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (0.3 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def peak_frequency(samples):
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.fft.rfftfreq(len(samples), 1 / RATE)[np.argmax(spectrum)]
+
+
+@pytest.mark.parametrize("rate", [0.75, 1.25, 1.6])
+def test_changes_duration_but_not_pitch(rate):
+    """Test that the length scales with 1/rate while the pitch and level stay put."""
+    samples = tone(1.0)
+    stretched = time_stretch(samples, rate, RATE)
+    assert len(stretched) == round(len(samples) / rate)
+    assert peak_frequency(stretched) == pytest.approx(220, abs=2)
+    body = stretched[1000:-1000]
+    assert np.sqrt(np.mean(body ** 2)) == pytest.approx(np.sqrt(np.mean(samples ** 2)), rel=0.05)
+
+
+def test_unity_rate_and_channels():
+    """Test that rate 1.0 is a no-op and channels are stretched together."""
+    samples = tone(0.5)
+    assert time_stretch(samples, 1.0, RATE) is samples
+
+    stereo = np.stack([samples, -samples], axis=1)
+    stretched = time_stretch(stereo, 1.5, RATE)
+    assert stretched.shape == (round(len(samples) / 1.5), 2)
+    assert np.allclose(stretched[:, 0], -stretched[:, 1])
+
+
+def test_faster_than_real_time():
+    """Test that stretching takes a small fraction of the audio's duration."""
+    samples = tone(5.0)
+    start = time.perf_counter()
+    time_stretch(samples, 1.3, RATE)
+    assert time.perf_counter() - start < 5.0 / 10
@@ -0,0 +1,101 @@
+"""Tests for latency tracing."""
+
+import json
+import threading
+import time
+
+import pytest
+
+import tracing
+from config_utils import TracingConfig
+from tracing import Tracer, bind, span, traced, turn
+
+
+@pytest.fixture
+def enabled_tracer():
+    """Enable the process-wide tracer for one test."""
+    tracing.tracer.clear()
+    tracing.tracer.enabled = True
+    yield tracing.tracer
+    tracing.tracer.enabled = False
+    tracing.tracer.clear()
+
+
+def test_disabled_tracer_records_nothing():
+    """Test that spans are shared no-ops while tracing is off."""
+    assert not tracing.tracer.enabled
+    first, second = span("a"), span("b")
+    assert first is second
+    with first:
+        pass
+    assert tracing.tracer.events() == []
+
+
+def test_spans_record_duration_and_turn(enabled_tracer):
+    """Test that spans carry their duration, args and turn id."""
+    with turn("turn-x"):
+        with span("llm.chat", model="m") as s:
+            time.sleep(0.01)
+            s.set(tokens=3)
+
+    events = {e["name"]: e for e in enabled_tracer.events()}
+    chat = events["llm.chat"]
+    assert chat["ph"] == "X" and chat["cat"] == "llm"
+    assert chat["dur"] >= 10_000
+    assert chat["args"] == {"turn": "turn-x", "model": "m", "tokens": 3}
+    assert events["turn"]["args"]["turn"] == "turn-x"
+
+
+def test_traced_decorator_marks_errors(enabled_tracer):
+    """Test the decorator records a span even when the call fails."""
+    @traced("stage.fail")
+    def fail():
+        raise ValueError("nope")
+
+    with pytest.raises(ValueError):
+        fail()
+    [event] = enabled_tracer.events()
+    assert event["name"] == "stage.fail"
+    assert event["args"]["error"] == "ValueError"
+
+
+def test_bind_carries_turn_into_threads(enabled_tracer):
+    """Test that bound callables keep the turn id on another thread."""
+    def work():
+        with span("worker"):
+            pass
+
+    with turn("turn-t"):
+        thread = threading.Thread(target=bind(work))
+        thread.start()
+        thread.join()
+
+    worker = next(e for e in enabled_tracer.events() if e["name"] == "worker")
+    assert worker["args"]["turn"] == "turn-t"
+
+
+def test_export_writes_chrome_trace(tmp_path):
+    """Test the exported file is in the Chrome trace event format."""
+    tracer = Tracer(enabled=True, max_events=2)
+    for name in ("a", "b", "c"):
+        with tracer.span(name):
+            pass
+    tracer.instant("mark")
+
+    path = tracer.export(tmp_path / "trace.json")
+    data = json.loads(path.read_text())
+    names = [e["name"] for e in data["traceEvents"] if e["ph"] != "M"]
+    assert names == ["c", "mark"]  # oldest dropped past max_events
+    assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in data["traceEvents"])
+
+
+def test_configure_tracing(tmp_path):
+    """Test enabling tracing from the config section."""
+    try:
+        tracer = tracing.configure_tracing(
+            TracingConfig(enabled=True, output=str(tmp_path / "t.json"), max_events=10)
+        )
+        assert tracer.enabled and tracer._events.maxlen == 10
+    finally:
+        tracing.configure_tracing(TracingConfig())
+    assert not tracing.tracer.enabled
@@ -60,19 +60,37 @@ def test_google_tts_mock(mock_client):
         mock_playsound.assert_called_once()
 
 
+def test_google_pcm_played_as_clip():
+    """Test that Google PCM output is queued as a clip, not labelled as MP3."""
+    import numpy as np
+
+    import google_tts_module
+    from audio_utils import PCMClip
+
+    clip = PCMClip(np.zeros(100, np.float32), 24000)
+    with patch.object(google_tts_module.config.tts, "audio_format", "pcm"), \
+         patch("google_tts_module.synthesize_pcm", return_value=clip), \
+         patch("google_tts_module.play_clip") as mock_play_clip, \
+         patch("google_tts_module.play_audio") as mock_play_audio:
+        google_tts_module.speak("Test text")
+
+    mock_play_clip.assert_called_once_with(clip)
+    mock_play_audio.assert_not_called()
+
+
 @patch("chatterbox_tts_module.ChatterboxTTS")
 def test_chatterbox_tts_mock(mock_chatterbox):
     """Test chatterbox_tts with a mock."""
+    import torch
+    
     # Setup mock
     mock_instance = MagicMock()
-    mock_instance.generate.return_value = (MagicMock(), 22050)  # waveform, sample_rate
+    mock_instance.generate.return_value = (torch.zeros(1, 2205), 22050)  # waveform, sample_rate
     mock_chatterbox.from_pretrained.return_value = mock_instance
     
-    # Mock torchaudio.save
+    # The waveform is queued as PCM without being saved to a file
     with patch("torchaudio.save") as mock_save, \
-         patch("os.path.exists", return_value=True), \
-         patch("os.remove") as mock_remove, \
-         patch("playsound.playsound") as mock_playsound:
+         patch("chatterbox_tts_module.play_clip") as mock_play:
         
         from chatterbox_tts_module import speak as chatterbox_speak
         
@@ -80,6 +98,23 @@ def test_chatterbox_tts_mock(mock_chatterbox):
         chatterbox_speak("Test text")
         
         # Verify the mock was called
-        mock_save.assert_called_once()
-        mock_playsound.assert_called_once()
-        mock_remove.assert_called_once()
+        mock_save.assert_not_called()
+        mock_play.assert_called_once()
+        clip = mock_play.call_args[0][0]
+        assert clip.sample_rate == 22050 and clip.samples.shape == (2205,)
+
+
+def test_chatterbox_int8_quantizes_token_model():
+    """Test that int8 precision swaps the token model's linear layers for quantized ones."""
+    import torch
+    from chatterbox_tts_module import physical_cores, quantize
+
+    model = MagicMock()
+    model.t3 = torch.nn.Sequential(torch.nn.Linear(8, 8), torch.nn.ReLU())
+    quantize(model)
+    assert type(model.t3[0]).__name__ == "Linear" and type(model.t3[0]) is not torch.nn.Linear
+    with torch.inference_mode():
+        assert model.t3(torch.ones(1, 8)).shape == (1, 8)
+
+    cores = physical_cores()
+    assert cores and set(cores) <= set(range(1024))
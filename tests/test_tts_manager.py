@@ -0,0 +1,242 @@
+"""Tests for TTS engine fallback with circuit breakers."""
+
+import time
+
+import pytest
+
+from tts_manager import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, TTSError, TTSManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEngine:
+    """Records calls and fails while ``failing`` is set."""
+
+    def __init__(self, failing=False):
+        self.failing = failing
+        self.calls = []
+
+    def __call__(self, text, voice=None, speaking_rate=None):
+        self.calls.append((text, voice, speaking_rate))
+        if self.failing:
+            raise RuntimeError("engine down")
+
+
+def test_breaker_opens_and_probes_once():
+    """Test the closed -> open -> half-open -> closed cycle."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    """Test a failing half-open probe opens the circuit again."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now = 9
+    assert not breaker.allow()
+
+
+def test_open_engine_is_skipped_without_being_called():
+    """Test failing engines cost nothing once their circuit opens."""
+    clock = FakeClock()
+    edge, google = FakeEngine(failing=True), FakeEngine()
+    manager = TTSManager({"edge": edge, "google": google}, "edge", failure_threshold=2, clock=clock)
+
+    for _ in range(5):
+        assert manager.speak("Hi *waves*", "v", 1.0) == "google"
+    assert len(edge.calls) == 2
+    assert manager.stats()["edge"]["state"] == OPEN
+
+    # After the reset timeout the recovered primary is probed and used again
+    edge.failing = False
+    clock.now = 31
+    assert manager.speak("Hi") == "edge"
+    assert manager.stats()["edge"]["state"] == CLOSED
+
+
+def test_fallbacks_ordered_by_health():
+    """Test the most reliable fallback is tried first."""
+    flaky, steady = FakeEngine(), FakeEngine()
+    manager = TTSManager(
+        {"edge": FakeEngine(failing=True), "google": flaky, "chatterbox": steady},
+        "edge",
+        failure_threshold=100,
+    )
+    manager.engines["google"].record(False, 0.1)
+    manager.engines["chatterbox"].record(True, 0.5)
+
+    assert manager.speak("Hello") == "chatterbox"
+    assert flaky.calls == []
+
+
+def test_signature_aware_kwargs_and_preprocessing():
+    """Test engines only receive the parameters they accept."""
+    received = []
+
+    def plain(text):
+        received.append(text)
+
+    manager = TTSManager({"chatterbox": plain}, "chatterbox")
+    manager.speak("Use `code` here", voice="ignored", rate=1.2)
+    assert received == ["Use code here"]
+
+
+def test_all_engines_failing_raises():
+    """Test the error when nothing can speak."""
+    manager = TTSManager({"edge": FakeEngine(failing=True)}, "edge", failure_threshold=1)
+    with pytest.raises(TTSError, match="engine down"):
+        manager.speak("Hello")
+    with pytest.raises(TTSError, match="circuit is open"):
+        manager.speak("Hello")
+
+
+def test_unavailable_and_disallowed_engines_are_dropped():
+    """Test None engines and engines outside the fallback list are ignored."""
+    manager = TTSManager(
+        {"edge": FakeEngine(), "google": None, "chatterbox": FakeEngine()}, "edge", fallbacks=["google"]
+    )
+    assert list(manager.engines) == ["edge"]
+    with pytest.raises(TTSError):
+        TTSManager({"edge": None}, "edge")
+
+
+class SlowSynth:
+    """Synthesizer returning fixed audio after a delay."""
+
+    def __init__(self, audio, delay=0.0, fail=False):
+        self.audio = audio
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def __call__(self, text, voice=None, speaking_rate=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("synthesis failed")
+        return self.audio
+
+
+def hedged_manager(synths, hedge_after=0.05):
+    played = []
+    manager = TTSManager(
+        {name: FakeEngine() for name in synths},
+        "edge",
+        synthesizers=synths,
+        hedge_after=hedge_after,
+        player=lambda audio, fmt: played.append((audio, fmt)),
+    )
+    return manager, played
+
+
+def test_hedge_plays_backup_when_primary_is_slow():
+    """Test a backup engine is raced and wins when the primary is slow."""
+    edge, google = SlowSynth(b"edge", delay=0.5), SlowSynth(b"google", delay=0.01)
+    manager, played = hedged_manager({"edge": edge, "google": google})
+
+    assert manager.speak("Hello") == "google"
+    assert played == [(b"google", "mp3")]
+    stats = manager.stats()
+    assert stats["edge"]["hedges"] == 1
+    assert stats["google"]["hedge_wins"] == 1
+
+    # The slow engine's audio is discarded, but its latency is accounted for
+    time.sleep(0.6)
+    assert manager.stats()["edge"]["hedge_saved_ms"] > 300
+
+
+def test_no_time_saved_when_primary_wins_after_hedge():
+    """Test that a backup finishing after the slow primary doesn't count as time saved."""
+    edge, google = SlowSynth(b"edge", delay=0.15), SlowSynth(b"google", delay=0.4)
+    manager, played = hedged_manager({"edge": edge, "google": google})
+
+    assert manager.speak("Hello") == "edge"
+    assert played == [(b"edge", "mp3")]
+
+    time.sleep(0.5)
+    stats = manager.stats()
+    assert stats["edge"]["hedges"] == 1
+    assert google.calls == 1
+    assert stats["google"]["hedge_wins"] == 0
+    assert stats["edge"]["hedge_saved_ms"] == 0
+    assert stats["google"]["hedge_saved_ms"] == 0
+
+
+def test_no_hedge_when_primary_is_fast():
+    """Test the backup is never started when audio arrives in time."""
+    edge, google = SlowSynth(b"edge"), SlowSynth(b"google")
+    manager, played = hedged_manager({"edge": edge, "google": google}, hedge_after=0.5)
+
+    assert manager.speak("Hello") == "edge"
+    assert google.calls == 0
+    assert manager.stats()["edge"]["hedges"] == 0
+
+
+def test_hedge_falls_through_failures():
+    """Test a failed synthesis moves on to the next engine."""
+    edge, google = SlowSynth(b"", fail=True), SlowSynth(b"google")
+    manager, played = hedged_manager({"edge": edge, "google": google}, hedge_after=5)
+
+    assert manager.speak("Hello") == "google"
+    assert played == [(b"google", "mp3")]
+
+
+def test_hedge_delay_restarts_after_quick_failure():
+    """Test that a backup started after a quick failure gets the full hedge delay before being hedged itself."""
+    edge = SlowSynth(b"", delay=0.1, fail=True)
+    google, chatterbox = SlowSynth(b"google", delay=0.1), SlowSynth(b"chatterbox")
+    manager, played = hedged_manager({"edge": edge, "google": google, "chatterbox": chatterbox}, hedge_after=0.15)
+
+    assert manager.speak("Hello") == "google"
+    assert chatterbox.calls == 0
+    assert manager.stats()["google"]["hedges"] == 0
+
+
+def test_pcm_synthesizer_lookup(monkeypatch):
+    """Test that PCM synthesizers are native where available and decoded otherwise."""
+    import sys
+    import types
+
+    import numpy as np
+
+    import tts_utils
+    from audio_utils import PCMClip, encode_wav
+
+    clip = PCMClip(np.zeros(160, np.float32), 16000)
+    encoded = types.ModuleType("fake_encoded_tts")
+    encoded.synthesize = lambda text, voice=None, speaking_rate=None: encode_wav(clip)
+    native = types.ModuleType("fake_native_tts")
+    native.synthesize = encoded.synthesize
+    native.synthesize_pcm = lambda text, voice=None, speaking_rate=None: clip
+    monkeypatch.setitem(sys.modules, "fake_encoded_tts", encoded)
+    monkeypatch.setitem(sys.modules, "fake_native_tts", native)
+    monkeypatch.setitem(tts_utils.TTS_MODULES, "encoded", "fake_encoded_tts")
+    monkeypatch.setitem(tts_utils.TTS_MODULES, "native", "fake_native_tts")
+    monkeypatch.setitem(tts_utils.AUDIO_FORMATS, "encoded", "wav")
+
+    assert tts_utils.get_synthesizer("encoded") is encoded.synthesize
+    decoded = tts_utils.get_synthesizer("encoded", pcm=True)("Hi", voice="a")
+    assert isinstance(decoded, PCMClip) and decoded.duration == 0.01
+    assert tts_utils.get_synthesizer("native", pcm=True) is native.synthesize_pcm
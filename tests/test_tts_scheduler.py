@@ -0,0 +1,130 @@
+"""Tests for priority scheduling of speech synthesis."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tts_scheduler import BULK, INTERACTIVE, PREFETCH, TTSScheduler, current_priority, priority
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_background_yields_to_interactive_between_sentences():
+    """Test that bulk work pauses between sentences while a live reply is synthesized, and prefetch goes before bulk."""
+    scheduler, order = TTSScheduler(), []
+    reply_started, reply_done = threading.Event(), threading.Event()
+
+    def bulk_job():
+        with priority(BULK):
+            for sentence in range(3):
+                with scheduler.slot():
+                    order.append(f"bulk{sentence}")
+                    if sentence == 0:
+                        reply_started.wait(1)
+                        time.sleep(0.02)
+
+    def reply():
+        with scheduler.slot():
+            reply_started.set()
+            order.append("reply")
+            wait_until(lambda: scheduler.stats()[PREFETCH]["waiting"] == 1)
+        reply_done.set()
+
+    def prefetch():
+        with scheduler.slot(PREFETCH):
+            order.append("prefetch")
+
+    bulk = threading.Thread(target=bulk_job)
+    bulk.start()
+    wait_until(lambda: order == ["bulk0"])
+    live = threading.Thread(target=reply)
+    live.start()
+    wait_until(lambda: reply_started.is_set() and scheduler.stats()[BULK]["waiting"] == 1)
+    warm = threading.Thread(target=prefetch)
+    warm.start()
+    for thread in (bulk, live, warm):
+        thread.join(2)
+
+    # The reply started while bulk0 was still in progress, but bulk1 waited for it
+    assert order == ["bulk0", "reply", "prefetch", "bulk1", "bulk2"]
+
+
+def test_per_class_concurrency_limits():
+    """Test that each class runs at most its limit of jobs at once."""
+    scheduler = TTSScheduler({BULK: 2})
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    def job():
+        with scheduler.slot(BULK):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.03)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=job) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert peak[0] == 2
+    assert scheduler.stats()[BULK] == {"running": 0, "waiting": 0}
+
+
+def test_priority_context_and_nested_slots():
+    """Test the default class, context overrides and that nested slots are taken once."""
+    scheduler = TTSScheduler({INTERACTIVE: 1})
+    assert current_priority() == INTERACTIVE
+    with priority(PREFETCH):
+        assert current_priority() == PREFETCH
+    with scheduler.slot(), scheduler.slot():
+        assert scheduler.stats()[INTERACTIVE]["running"] == 1
+    with pytest.raises(ValueError):
+        with priority("urgent"):
+            pass
+
+
+def test_async_slot_holds_background_work_without_blocking_the_loop():
+    """Test that an async slot counts as interactive, waits off the event loop and is released on cancellation."""
+    scheduler = TTSScheduler({INTERACTIVE: 1})
+
+    async def stream():
+        async with scheduler.slot_async():
+            await asyncio.sleep(0.05)
+
+    async def main():
+        live = asyncio.ensure_future(stream())
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()[INTERACTIVE]["running"] == 1
+        # A second stream waits for the slot while the loop keeps running
+        blocked = asyncio.ensure_future(stream())
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()[INTERACTIVE]["waiting"] == 1
+        blocked.cancel()
+        await live
+        await asyncio.sleep(0.05)
+
+    bulk_started = threading.Event()
+
+    def bulk():
+        with scheduler.slot(BULK):
+            bulk_started.set()
+
+    asyncio.run(main())
+    assert scheduler.stats()[INTERACTIVE] == {"running": 0, "waiting": 0}
+    worker = threading.Thread(target=bulk)
+    worker.start()
+    worker.join(2)
+    assert bulk_started.is_set()
+
+    # Inside a blocking slot (asyncio.run from a synchronous engine) no second slot is taken
+    with scheduler.slot():
+        asyncio.run(stream())
@@ -0,0 +1,153 @@
+"""Tests for usage accounting and budgets."""
+
+import logging
+import time
+
+import pytest
+
+from assistant import Assistant
+from config_utils import AppConfig, UsageConfig
+from retrieval import grounded_answer
+from usage import (
+    BUDGET_SPENT_MESSAGE,
+    BudgetExceededError,
+    UsageLedger,
+    aggregate,
+    configure_usage,
+    read_log,
+    turn_costs,
+)
+
+# A fixed local time, so hour and day buckets don't depend on when tests run
+NOON = time.mktime((2026, 10, 19, 12, 0, 0, 0, 0, -1))
+
+
+class FakeClock:
+    def __init__(self, now=NOON):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_budgets_warn_then_throttle_and_survive_restart(tmp_path, caplog):
+    """Test that a budget warns as it nears, refuses calls once spent, and is reloaded from the log."""
+    path, clock = tmp_path / "usage.jsonl", FakeClock()
+    budgets = {"google": {"daily": 100, "hourly": None}}
+    ledger = UsageLedger(path, budgets, warn_at=0.8, throttle=True, clock=clock)
+
+    with caplog.at_level(logging.WARNING):
+        ledger.record("google", 85, 0.2, turn="t1")
+    assert "85% of its daily budget" in caplog.text
+    ledger.check("google")
+
+    ledger.record("google", 20, 0.2, turn="t1")
+    assert ledger.used("google") == 105
+    assert not ledger.allows("google")
+    with pytest.raises(BudgetExceededError):
+        ledger.check("google")
+    # Other providers are unaffected
+    ledger.check("groq")
+    ledger.close()
+
+    # Totals are seeded from the log, and a new day starts afresh
+    restarted = UsageLedger(path, budgets, throttle=True, clock=clock)
+    assert restarted.used("google") == 105
+    assert not restarted.allows("google")
+    clock.now += 24 * 3600
+    assert restarted.used("google") == 0
+    assert restarted.allows("google")
+    restarted.close()
+
+
+def test_aggregate_per_hour_and_day(tmp_path):
+    """Test that calls are totalled per provider for each hour and day."""
+    path, clock = tmp_path / "usage.jsonl", FakeClock()
+    ledger = UsageLedger(path, clock=clock)
+    ledger.record("groq", 300, 0.4)
+    ledger.record("groq", 100, 0.2)
+    clock.now += 3600
+    ledger.record("groq", 50, 0.3)
+    ledger.record("brave", 1, 0.5)
+    ledger.close()
+
+    entries = list(read_log(path))
+    hourly = aggregate(entries, "hour")
+    assert hourly["2026-10-19 12:00"] == {"groq": {"calls": 2, "units": 400, "mean_ms": 300}}
+    assert hourly["2026-10-19 13:00"]["brave"] == {"calls": 1, "units": 1, "mean_ms": 500}
+    daily = aggregate(entries, "day")
+    assert daily["2026-10-19"]["groq"] == {"calls": 3, "units": 450, "mean_ms": 300}
+
+
+def test_turn_costs_by_feature(tmp_path):
+    """Test that calls are attributed to turns and priced per feature, skipping malformed lines."""
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(path, clock=FakeClock())
+    for turn in ("t1", "t2"):
+        ledger.record("groq", 1000, 0.5, turn=turn)
+        ledger.record("google", 200, 0.3, turn=turn)
+        ledger.tag_turn("chat", turn=turn)
+    ledger.record("brave", 1, 0.4, turn="t3")
+    ledger.record("groq", 500, 0.5, turn="t3")
+    ledger.tag_turn("search", turn="t3")
+    ledger.record("edge", 40, 0.1)
+    ledger.close()
+    with open(path, "a", encoding="utf-8") as f:
+        # An entry from an older format, an unknown kind and a torn last write
+        f.write('["c", 1.0, "groq", 10]\n["t", 2.0]\n["x"]\n["c", 1.0, "gro')
+
+    entries = list(read_log(path))
+    assert aggregate(entries)["2026-10-19"]["groq"]["calls"] == 3
+    reopened = UsageLedger(path, clock=FakeClock())
+    assert reopened.used("groq") == 2500
+    reopened.close()
+
+    report = turn_costs(entries, {"groq": 0.5, "google": 16.0, "brave": 5.0})
+    assert report["chat"] == {
+        "turns": 2,
+        "cost_per_turn": pytest.approx(0.5 + 3.2),
+        "units_per_turn": {"google": 200.0, "groq": 1000.0},
+    }
+    assert report["search"]["cost_per_turn"] == pytest.approx(0.005 + 0.25)
+    assert report["untagged"]["units_per_turn"] == {"edge": 40.0}
+
+
+def test_turns_from_separate_runs_kept_apart(tmp_path):
+    """Test that turn ids reused by a restarted process aren't merged in the report."""
+    path = tmp_path / "usage.jsonl"
+    for _ in range(2):
+        ledger = UsageLedger(path, clock=FakeClock())
+        ledger.record("groq", 100, 0.5, turn="turn-1")
+        ledger.tag_turn("chat", turn="turn-1")
+        ledger.close()
+
+    report = turn_costs(list(read_log(path)))
+    assert report["chat"]["turns"] == 2
+    assert report["chat"]["units_per_turn"] == {"groq": 100.0}
+
+
+@pytest.fixture
+def spent_groq_budget(tmp_path):
+    ledger = configure_usage(UsageConfig(
+        path=str(tmp_path / "usage.jsonl"), budgets={"groq": {"daily": 10}}, throttle=True,
+    ))
+    ledger.record("groq", 10, 0.1)
+    yield ledger
+    configure_usage(UsageConfig(enabled=False))
+
+
+def test_spent_llm_budget_answers_with_notice(spent_groq_budget):
+    """Test that a refused LLM call is answered with a spoken notice instead of ending the session."""
+    assistant = Assistant(AppConfig(search={"grounding": "off"}))
+    response = assistant.respond("tell me a joke")
+    assert response.intent == "chat"
+    assert response.reply == BUDGET_SPENT_MESSAGE
+    assert assistant.speculate("tell me a joke").response().reply == BUDGET_SPENT_MESSAGE
+
+    class NoResults:
+        started = time.perf_counter()
+
+        def results(self, timeout=None):
+            return []
+
+    assert list(grounded_answer("tell me a joke", NoResults())) == [BUDGET_SPENT_MESSAGE]
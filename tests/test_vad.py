@@ -0,0 +1,76 @@
+"""Tests for voice activity detection and end-pointing."""
+
+import numpy as np
+import pytest
+
+from vad import Endpointer, VADTimeout, VoiceActivityDetector, capture
+
+RATE = 16000
+
+
+def voiced(seconds, level=0.2):
+    """A harmonic tone standing in for speech."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    return level * sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+
+
+def noise(seconds, level=0.001, seed=0):
+    return level * np.random.default_rng(seed).standard_normal(int(seconds * RATE))
+
+
+def reader(samples, chunk=1024):
+    """Serve 16-bit PCM chunks like a microphone stream (silence once exhausted)."""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+    position = [0]
+
+    def read():
+        start = position[0]
+        position[0] += chunk * 2
+        data = pcm[start:start + chunk * 2]
+        return data + bytes(chunk * 2 - len(data))
+
+    return read
+
+
+def record(signal, **kwargs):
+    vad = VoiceActivityDetector(RATE)
+    vad.calibrate(noise(0.2, seed=1))
+    return capture(reader(signal), RATE, Endpointer(vad, **kwargs), pre_speech=0.1)
+
+
+def test_detects_speech_frames():
+    """Test that tones are speech while quiet and loud white noise are not."""
+    vad = VoiceActivityDetector(RATE)
+    vad.calibrate(noise(0.2))
+    assert vad.process(voiced(0.2)).all()
+    assert not vad.process(noise(0.2, seed=2)).any()
+    assert not vad.process(noise(0.2, level=0.1, seed=3)).any()
+
+
+def test_utterance_closes_after_short_silence():
+    """Test that trailing silence well under a second ends the utterance."""
+    signal = np.concatenate([noise(0.5), voiced(0.8), noise(2.0)])
+    utterance = record(signal)
+    assert 0.2 <= utterance.endpoint_delay <= 0.4
+    assert utterance.speech_seconds == pytest.approx(0.8, abs=0.05)
+    # Pre-roll + speech + trailing silence, without the leading noise
+    assert utterance.duration == pytest.approx(0.1 + 0.8 + utterance.endpoint_delay, abs=0.05)
+    assert not utterance.truncated
+
+
+def test_endpoint_adapts_to_utterance_length():
+    """Test that long requests are closed sooner than ones that just started."""
+    short = record(np.concatenate([noise(0.2), voiced(0.3), noise(2.0)]))
+    long = record(np.concatenate([noise(0.2), voiced(2.0), noise(2.0)]))
+    assert long.endpoint_delay < short.endpoint_delay
+    assert long.endpoint_delay == pytest.approx(0.2, abs=0.03)
+
+
+def test_long_utterance_is_cut_and_silence_times_out():
+    """Test max_duration truncation and the start timeout."""
+    utterance = record(voiced(3.0), max_duration=1.0)
+    assert utterance.truncated and utterance.duration <= 1.1
+
+    vad = VoiceActivityDetector(RATE)
+    with pytest.raises(VADTimeout):
+        capture(reader(noise(0.5)), RATE, Endpointer(vad), start_timeout=0)
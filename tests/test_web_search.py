@@ -0,0 +1,105 @@
+"""Tests for the multi-provider web search."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from web_search import (
+    MultiSearch,
+    SearchCache,
+    SearchError,
+    SearchResult,
+    StaticProvider,
+    normalize_query,
+)
+
+RESULTS = {
+    "python": [
+        SearchResult("Python", "A programming language", "https://www.python.org/"),
+        SearchResult("PyPI", "Package index", "https://pypi.org"),
+    ]
+}
+
+
+def test_normalize_query():
+    """Test that queries differing only in case/punctuation share a key."""
+    assert normalize_query("  What IS   Python?? ") == "what is python"
+
+
+def test_repeat_search_uses_cache():
+    """Test that a repeated search is served from the cache."""
+    provider = StaticProvider(RESULTS)
+    search = MultiSearch([provider])
+
+    first = search.search("Python")
+    second = search.search("python!")
+
+    assert first == second
+    assert provider.calls == 1
+    assert search.cache.hits == 1
+
+
+def test_cache_ttl_expiry():
+    """Test that cached entries expire after the TTL."""
+    now = [0.0]
+    cache = SearchCache(ttl=10, clock=lambda: now[0])
+    cache.put(("q", 3), RESULTS["python"])
+
+    assert cache.get(("q", 3)) == RESULTS["python"]
+    now[0] = 11
+    assert cache.get(("q", 3)) is None
+
+
+def test_slow_provider_does_not_block():
+    """Test that the first good result wins over a slow provider."""
+    slow = StaticProvider(RESULTS, delay=2.0, name="slow")
+    fast = StaticProvider(RESULTS, name="fast")
+    search = MultiSearch([slow, fast], timeout=1.0)
+
+    start = time.perf_counter()
+    results = search.search("python")
+
+    assert time.perf_counter() - start < 1.0
+    assert results[0].provider == "fast"
+
+
+def test_failed_provider_falls_through():
+    """Test that a failing provider doesn't hide results from another."""
+    search = MultiSearch([StaticProvider(fail=True), StaticProvider(RESULTS)])
+    assert search.search("python")[0].title == "Python"
+
+
+def test_merge_deduplicates_by_url():
+    """Test that merged results are interleaved and de-duplicated."""
+    other = {
+        "python": [
+            SearchResult("Python.org", "Official site", "http://python.org"),
+            SearchResult("Wiki", "Encyclopedia entry", "https://en.wikipedia.org/wiki/Python"),
+        ]
+    }
+    search = MultiSearch(
+        [StaticProvider(RESULTS, name="a"), StaticProvider(other, name="b")],
+        strategy="merge",
+        max_results=5,
+    )
+
+    titles = [r.title for r in search.search("python")]
+    assert titles == ["Python", "PyPI", "Wiki"]
+
+
+def test_no_available_provider():
+    """Test that searching without providers raises SearchError."""
+    with pytest.raises(SearchError):
+        MultiSearch([]).search("python")
+
+
+def test_concurrent_identical_searches_share_one_fetch():
+    """Test that searches for a query already being fetched wait for that fetch."""
+    provider = StaticProvider(RESULTS, delay=0.2)
+    search = MultiSearch([provider])
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(search.search, ["python", "Python?", "PYTHON", "python"]))
+
+    assert len(results[0]) == 2 and all(r is results[0] for r in results)
+    assert provider.calls == 1
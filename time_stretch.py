@@ -0,0 +1,73 @@
+"""Pitch-preserving time-stretch for Cortex Desktop Assistant.
+
+Speaking rate used to be baked into every provider request, so a rate change
+meant re-synthesizing and cached renderings only matched one rate (and
+Chatterbox ignored it). The audio output applies it at play time instead with
+WSOLA (waveform similarity overlap-add): output is built from 30 ms Hann
+windowed frames overlapping by half, each taken from near its ideal input
+position ``k * hop * rate`` at the offset whose waveform best continues the
+previous frame. The candidate offsets of a frame are scored together with one
+matrix product over a strided view of the search region, so a second of 24 kHz
+speech takes 10-20 ms on one core.
+
+Example:
+    faster = time_stretch(clip.samples, 1.25, clip.sample_rate)
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Rates outside this range sound unnatural with WSOLA
+MIN_RATE = 0.5
+MAX_RATE = 2.0
+
+
+def time_stretch(samples: np.ndarray, rate: float, sample_rate: int, frame_ms: float = 30.0) -> np.ndarray:
+    """
+    Change the speed of audio without changing its pitch.
+
+    Args:
+        samples: Float samples shaped (frames,) or (frames, channels)
+        rate: Speed multiplier (1.25 plays 25% faster), clamped to 0.5-2.0
+        sample_rate: Sample rate of the samples
+        frame_ms: Analysis frame length
+
+    Returns:
+        The stretched samples, ``len(samples) / rate`` frames long
+    """
+    rate = min(max(float(rate), MIN_RATE), MAX_RATE)
+    if rate == 1.0 or len(samples) == 0:
+        return samples
+    x = samples if samples.ndim == 2 else samples[:, None]
+    frame = max(16, int(sample_rate * frame_ms / 1000)) // 2 * 2
+    hop = frame // 2
+    tolerance = hop // 2
+    out_length = int(round(len(x) / rate))
+    count = out_length // hop + 2
+
+    # Frame k is centred on input sample k * hop * rate; pad so every frame and
+    # its search region lie inside the array
+    lead = hop + tolerance
+    tail = int(count * hop * rate) + frame + 2 * tolerance + 1 - len(x)
+    padded = np.pad(x.astype(np.float32, copy=False), ((lead, max(0, tail)), (0, 0)))
+    mono = padded.mean(axis=1) if x.shape[1] > 1 else padded[:, 0]
+    squares = np.concatenate([[0.0], np.cumsum(mono.astype(np.float64) ** 2)])
+    # Periodic Hann windows at half overlap sum to one
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)[:, None]
+
+    out = np.zeros((count * hop + frame, x.shape[1]), dtype=np.float32)
+    position = tolerance
+    for k in range(count):
+        ideal = int(round(k * hop * rate)) + tolerance
+        if k:
+            # Pick the offset whose frame best continues the previous one
+            template = mono[position + hop:position + hop + frame]
+            start = ideal - tolerance
+            candidates = sliding_window_view(mono[start:start + frame + 2 * tolerance], frame)
+            energy = squares[start + frame:start + frame + 2 * tolerance + 1] - squares[start:start + 2 * tolerance + 1]
+            score = (candidates @ template) / np.sqrt(np.maximum(energy, 1e-12))
+            position = start + int(np.argmax(score))
+        out[k * hop:k * hop + frame] += padded[position:position + frame] * window
+    # Output frame 0 starts half a frame before the first output sample
+    result = out[hop:hop + out_length]
+    return result if samples.ndim == 2 else result[:, 0]
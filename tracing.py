@@ -0,0 +1,305 @@
+"""Per-stage latency tracing for Cortex Desktop Assistant.
+
+Stages of a turn (speech recognition, routing, search, LLM, TTS preprocessing,
+synthesis, playback) are wrapped in spans that record their start time and
+duration along with the id of the turn they belong to. Spans are exported in
+the Chrome trace event format, which can be opened in ``chrome://tracing`` or
+https://ui.perfetto.dev.
+
+Tracing is off by default. When disabled, ``span`` returns a shared no-op
+context manager and ``traced`` functions call straight through, so the only
+cost is one attribute check.
+
+Example:
+    with turn():
+        with span("llm.chat", model="mixtral"):
+            ...
+
+    @traced("tts.preprocess")
+    def preprocess(text): ...
+"""
+
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, TypeVar, Union
+
+from logger import get_logger
+from logger import turn_id as _turn_id
+
+# Initialize logger
+logger = get_logger("tracing")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_turn_counter = itertools.count(1)
+
+
+class _NoopSpan:
+    """Context manager used when tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """A timed stage; records itself on the tracer when it ends."""
+
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, end - self.start, self.args)
+        return False
+
+    def set(self, **args: Any) -> None:
+        """Attach extra arguments to the span (e.g. result sizes)."""
+        self.args.update(args)
+
+
+class Tracer:
+    """Collects spans in memory and exports them as a Chrome trace."""
+
+    def __init__(self, enabled: bool = False, output: Optional[Union[str, Path]] = None, max_events: int = 100_000):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled: Whether spans are recorded
+            output: File written by ``export`` when no path is given
+            max_events: Events kept in memory; the oldest are dropped first
+        """
+        self.enabled = enabled
+        self.output = Path(output) if output else None
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._threads: Dict[int, str] = {}
+
+    def span(self, name: str, **args: Any) -> Union[Span, _NoopSpan]:
+        """
+        Time a block of code.
+
+        Args:
+            name: Stage name, dotted by component (e.g. "tts.synthesize")
+            **args: Extra values shown with the span
+
+        Returns:
+            A context manager; a shared no-op one when tracing is disabled
+        """
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, args)
+
+    def instant(self, name: str, **args: Any) -> None:
+        """Mark a point in time, such as the first LLM token."""
+        if self.enabled:
+            self._append(name, "i", time.perf_counter(), None, args)
+
+    def record(self, name: str, start: float, duration: float, args: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Record a completed span measured elsewhere.
+
+        Args:
+            name: Stage name
+            start: ``time.perf_counter()`` value when the stage began
+            duration: Stage duration in seconds
+            args: Extra values shown with the span
+        """
+        if self.enabled:
+            self._append(name, "X", start, duration, args or {})
+
+    def _append(self, name: str, phase: str, start: float, duration: Optional[float], args: Dict[str, Any]) -> None:
+        tid = threading.get_ident()
+        turn_id = _turn_id.get()
+        if turn_id is not None:
+            args = {"turn": turn_id, **args}
+        event: Dict[str, Any] = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": phase,
+            "ts": round((start - self._origin) * 1e6, 1),
+            "pid": self._pid,
+            "tid": tid,
+            "args": args,
+        }
+        if duration is not None:
+            event["dur"] = round(duration * 1e6, 1)
+        else:
+            event["s"] = "t"
+        with self._lock:
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+            self._events.append(event)
+
+    def events(self) -> list:
+        """Return a copy of the recorded events."""
+        with self._lock:
+            return list(self._events)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+
+    def export(self, path: Optional[Union[str, Path]] = None) -> Optional[Path]:
+        """
+        Write the recorded events as a Chrome trace JSON file.
+
+        Args:
+            path: Destination (defaults to the configured output)
+
+        Returns:
+            The written path, or None if there was nothing to write
+        """
+        path = Path(path) if path else self.output
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        if path is None or not events:
+            return None
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+        logger.info("Wrote %d trace events to %s", len(events), path)
+        return path
+
+
+# Process-wide tracer
+tracer = Tracer()
+_export_registered = False
+
+
+def span(name: str, **args: Any) -> Union[Span, _NoopSpan]:
+    """Time a block of code on the process-wide tracer. See ``Tracer.span``."""
+    if not tracer.enabled:
+        return _NOOP
+    return Span(tracer, name, args)
+
+
+def instant(name: str, **args: Any) -> None:
+    """Mark a point in time on the process-wide tracer."""
+    if tracer.enabled:
+        tracer.instant(name, **args)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorator timing every call of a function as a span.
+
+    Args:
+        name: Span name (defaults to the function's qualified name)
+    """
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(tracer, span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+@contextmanager
+def turn(turn_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Tag spans recorded inside the block with a turn id.
+
+    Args:
+        turn_id: Id to use (a process-unique one is generated if omitted)
+
+    Yields:
+        The turn id
+    """
+    turn_id = turn_id or f"turn-{next(_turn_counter)}"
+    token = _turn_id.set(turn_id)
+    try:
+        with span("turn"):
+            yield turn_id
+    finally:
+        _turn_id.reset(token)
+
+
+def current_turn() -> Optional[str]:
+    """Return the id of the turn being traced, if any."""
+    return _turn_id.get()
+
+
+def bind(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Carry the current turn id into another thread.
+
+    Context variables don't follow work handed to threads or executors, so
+    wrap callables with this before submitting them. The context is copied
+    whenever a turn is under way, so usage accounting can attribute calls to
+    it even with tracing off.
+    """
+    if not tracer.enabled and _turn_id.get() is None:
+        return func
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func)
+
+
+def configure_tracing(tracing_config) -> Tracer:
+    """
+    Enable or disable tracing from the ``tracing`` config section.
+
+    When enabled, the trace is written to the configured file on exit.
+
+    Args:
+        tracing_config: TracingConfig instance
+
+    Returns:
+        The process-wide tracer
+    """
+    tracer.enabled = tracing_config.enabled
+    tracer.output = Path(tracing_config.output) if tracing_config.output else None
+    if tracer._events.maxlen != tracing_config.max_events:
+        tracer._events = deque(tracer._events, maxlen=tracing_config.max_events)
+    global _export_registered
+    if tracer.enabled:
+        logger.info("Tracing enabled; writing spans to %s on exit", tracer.output)
+        if not _export_registered:
+            atexit.register(tracer.export)
+            _export_registered = True
+    return tracer
@@ -0,0 +1,476 @@
+"""TTS engine selection with circuit breakers and health-ranked fallback.
+
+Each engine gets a circuit breaker: after ``failure_threshold`` consecutive
+failures it opens and the engine is skipped without being called until
+``reset_timeout`` has passed, when a single half-open probe decides whether it
+closes again. The configured engine is tried first while it is healthy;
+fallbacks are ordered by their rolling success rate and latency.
+
+With hedging enabled, synthesis starts on the first engine and, if no audio
+is ready after ``hedge_after`` seconds, a backup engine is started in
+parallel; whichever finishes first is played and the other is discarded.
+"""
+
+import inspect
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from audio_utils import PCMClip
+from logger import get_logger
+from metrics import REGISTRY, TTS_FALLBACKS, TTS_LATENCY, TTS_REQUESTS
+from tracing import bind, span
+from tts_utils import AUDIO_FORMATS, get_synthesizer, play_audio, preprocess_for_tts
+
+# Initialize logger
+logger = get_logger("tts.manager")
+
+# Circuit states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+TTS_CIRCUIT_OPEN = REGISTRY.gauge(
+    "cortex_tts_circuit_open", "Whether an engine's circuit breaker is open (1) or not (0)", ["engine"]
+)
+
+TTS_HEDGES = REGISTRY.counter(
+    "cortex_tts_hedges_total", "Backup syntheses started because an engine was slow", ["engine"]
+)
+TTS_HEDGE_WINS = REGISTRY.counter(
+    "cortex_tts_hedge_wins_total", "Hedged syntheses won by the backup engine", ["engine"]
+)
+TTS_HEDGE_SAVED = REGISTRY.histogram(
+    "cortex_tts_hedge_saved_seconds", "Time saved by playing the backup instead of the slow engine", ["engine"]
+)
+
+
+class TTSError(RuntimeError):
+    """Exception raised when no TTS engine could speak the text."""
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling an engine after repeated failures and probes it later."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds an open circuit waits before a probe
+            clock: Time source (injectable for tests)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = CLOSED
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go through, claiming the probe if half-open.
+
+        Returns:
+            True if the engine should be called
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release(self) -> None:
+        """Give back a claimed probe that was never used."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._state = CLOSED
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = OPEN
+                self.opened_at = self.clock()
+
+
+class TTSEngine:
+    """A speak function with its breaker and rolling health."""
+
+    def __init__(
+        self,
+        name: str,
+        speak: Callable[..., None],
+        breaker: CircuitBreaker,
+        window: int = 20,
+        synthesize: Optional[Callable[..., Union[bytes, PCMClip]]] = None,
+    ):
+        self.name = name
+        self.speak = speak
+        self.synthesize = synthesize
+        self.breaker = breaker
+        # Parameters the functions accept, looked up once
+        self.params = frozenset(inspect.signature(speak).parameters)
+        self.synth_params = frozenset(inspect.signature(synthesize).parameters) if synthesize else frozenset()
+        # Recent (succeeded, seconds) outcomes
+        self._outcomes: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedge_saved = 0.0
+
+    def kwargs(self, voice: Optional[str], rate: Optional[float], params: Optional[frozenset] = None) -> Dict[str, object]:
+        params = self.params if params is None else params
+        kwargs: Dict[str, object] = {}
+        if "voice" in params and voice is not None:
+            kwargs["voice"] = voice
+        if "speaking_rate" in params and rate is not None:
+            kwargs["speaking_rate"] = rate
+        return kwargs
+
+    def record(self, ok: bool, seconds: float) -> None:
+        with self._lock:
+            self._outcomes.append((ok, seconds))
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        TTS_CIRCUIT_OPEN.set(1 if self.breaker.state == OPEN else 0, engine=self.name)
+
+    @property
+    def success_rate(self) -> float:
+        """Share of recent calls that succeeded (1.0 before any call)."""
+        with self._lock:
+            if not self._outcomes:
+                return 1.0
+            return sum(ok for ok, _ in self._outcomes) / len(self._outcomes)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Mean seconds of recent successful calls."""
+        with self._lock:
+            times = [seconds for ok, seconds in self._outcomes if ok]
+        return sum(times) / len(times) if times else None
+
+    def health_key(self) -> Tuple[float, float]:
+        """Sort key: most reliable first, then fastest."""
+        latency = self.latency
+        return (-self.success_rate, latency if latency is not None else float("inf"))
+
+    def snapshot(self) -> Dict[str, object]:
+        latency = self.latency
+        return {
+            "state": self.breaker.state,
+            "success_rate": round(self.success_rate, 3),
+            "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            "consecutive_failures": self.breaker.failures,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_saved_ms": round(self.hedge_saved * 1000, 1),
+        }
+
+
+class TTSManager:
+    """Speak text with the healthiest available engine."""
+
+    def __init__(
+        self,
+        engines: Mapping[str, Optional[Callable[..., None]]],
+        primary: str,
+        fallbacks: Optional[Sequence[str]] = None,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        window: int = 20,
+        clock: Callable[[], float] = time.monotonic,
+        synthesizers: Optional[Mapping[str, Callable[..., Union[bytes, PCMClip]]]] = None,
+        hedge_after: Optional[float] = None,
+        player: Callable[[Union[bytes, PCMClip], str], object] = play_audio,
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            engines: Speak function per engine name; None marks an engine as
+                unavailable (e.g. its dependencies are missing)
+            primary: Engine tried first while its circuit is closed
+            fallbacks: Engines allowed as fallbacks (defaults to all others)
+            failure_threshold: Consecutive failures that open an engine's circuit
+            reset_timeout: Seconds before an open circuit is probed again
+            window: Recent calls used for success rate and latency
+            clock: Time source (injectable for tests)
+            synthesizers: Function rendering text to audio bytes (or a decoded
+                clip) per engine, used for hedged synthesis
+            hedge_after: Seconds to wait for audio before starting a backup
+                engine in parallel (None disables hedging)
+            player: Plays audio bytes of a given format, or a clip (hedged mode only)
+        """
+        self.primary = primary.lower()
+        self.hedge_after = hedge_after
+        self.player = player
+        synthesizers = synthesizers or {}
+        allowed = {self.primary} | {f.lower() for f in (fallbacks if fallbacks is not None else engines)}
+        self.engines: Dict[str, TTSEngine] = {
+            name: TTSEngine(
+                name,
+                func,
+                CircuitBreaker(failure_threshold, reset_timeout, clock),
+                window,
+                synthesizers.get(name),
+            )
+            for name, func in engines.items()
+            if func is not None and name in allowed
+        }
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if not self.engines:
+            raise TTSError("No TTS engine available. Please check your installation.")
+        if self.primary not in self.engines:
+            logger.warning(
+                "Configured TTS engine '%s' not available; falling back to %s",
+                self.primary, ", ".join(self.engines),
+            )
+
+    @classmethod
+    def from_config(cls, config, engines: Mapping[str, Optional[Callable[..., None]]]) -> "TTSManager":
+        """
+        Build a manager from the ``voice`` and ``tts`` config sections.
+
+        Args:
+            config: Application configuration
+            engines: Speak function per engine name (None if unavailable)
+        """
+        tts_config = config.tts
+        synthesizers = {}
+        pcm = tts_config.audio_format == "pcm"
+        if tts_config.hedge_after is not None:
+            for name, func in engines.items():
+                if func is None:
+                    continue
+                try:
+                    synthesizers[name] = get_synthesizer(name, pcm=pcm)
+                except (ImportError, ValueError, AttributeError) as e:
+                    logger.debug("%s TTS can't be hedged: %s", name.upper(), str(e))
+        return cls(
+            engines,
+            config.voice.engine,
+            fallbacks=tts_config.fallbacks,
+            failure_threshold=tts_config.failure_threshold,
+            reset_timeout=tts_config.reset_timeout,
+            window=tts_config.health_window,
+            synthesizers=synthesizers,
+            hedge_after=tts_config.hedge_after,
+        )
+
+    def candidates(self) -> List[TTSEngine]:
+        """
+        Engines to try, in order. Engines whose circuit is open (and not yet
+        due a probe) are left out without being called.
+
+        Returns:
+            The primary (if allowed) followed by the other engines, healthiest first
+        """
+        primary = self.engines.get(self.primary)
+        others = sorted(
+            (e for e in self.engines.values() if e is not primary),
+            key=TTSEngine.health_key,
+        )
+        ordered = ([primary] if primary is not None else []) + others
+        return [engine for engine in ordered if engine.breaker.state != OPEN]
+
+    def speak(self, text: str, voice: Optional[str] = None, rate: Optional[float] = None) -> str:
+        """
+        Speak text, falling back through healthy engines.
+
+        Args:
+            text: The text to speak
+            voice: Voice ID (engines that take one)
+            rate: Speaking rate multiplier (engines that take one)
+
+        Returns:
+            The name of the engine that spoke
+
+        Raises:
+            TTSError: If every engine failed or had an open circuit
+        """
+        if self.hedge_after is not None:
+            hedgeable = [e for e in self.candidates() if e.synthesize is not None]
+            if len(hedgeable) > 1:
+                return self._speak_hedged(hedgeable, text, voice, rate)
+
+        last_error: Optional[Exception] = None
+        for engine in self.candidates():
+            # Claims the probe slot for a half-open engine
+            if not engine.breaker.allow():
+                continue
+            processed = preprocess_for_tts(text, engine.name)
+            start = time.perf_counter()
+            try:
+                with span("tts.speak", engine=engine.name):
+                    engine.speak(processed, **engine.kwargs(voice, rate))
+            except Exception as e:
+                engine.record(False, time.perf_counter() - start)
+                TTS_REQUESTS.inc(engine=engine.name, status="error")
+                logger.warning("%s TTS failed: %s", engine.name.upper(), str(e))
+                last_error = e
+                continue
+            elapsed = time.perf_counter() - start
+            engine.record(True, elapsed)
+            TTS_REQUESTS.inc(engine=engine.name, status="ok")
+            TTS_LATENCY.observe(elapsed, engine=engine.name)
+            if engine.name != self.primary:
+                TTS_FALLBACKS.inc(engine=engine.name)
+            return engine.name
+
+        raise self._all_failed(last_error) from last_error
+
+    def _speak_hedged(
+        self, engines: List[TTSEngine], text: str, voice: Optional[str], rate: Optional[float]
+    ) -> str:
+        """
+        Race synthesis on a backup engine once the first one is slow, then play the winner.
+
+        The hedge delay counts from the latest engine launch, so a backup
+        started after a quick failure gets the full delay too. The winning
+        audio is played through ``self.player`` (``play_audio`` by default),
+        not the engine's own ``speak``.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cortex-tts")
+        queue = list(engines)
+        running: Dict[Future, TTSEngine] = {}
+        start = launched_at = time.perf_counter()
+
+        def launch_next() -> None:
+            nonlocal launched_at
+            while queue:
+                engine = queue.pop(0)
+                if engine.breaker.allow():
+                    running[self._executor.submit(bind(self._synthesize), engine, text, voice, rate)] = engine
+                    launched_at = time.perf_counter()
+                    return
+
+        launch_next()
+        hedged_engine: Optional[TTSEngine] = None
+        last_error: Optional[Exception] = None
+        while running:
+            timeout = None
+            if hedged_engine is None and queue:
+                timeout = max(0.0, self.hedge_after - (time.perf_counter() - launched_at))
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # No audio yet: start a backup alongside the slow engine
+                hedged_engine = next(iter(running.values()))
+                hedged_engine.hedges += 1
+                TTS_HEDGES.inc(engine=hedged_engine.name)
+                logger.debug("%s TTS is slow; starting a backup engine", hedged_engine.name.upper())
+                launch_next()
+                continue
+
+            for future in done:
+                engine = running.pop(future)
+                try:
+                    audio, elapsed = future.result()
+                except Exception as e:
+                    engine.record(False, time.perf_counter() - start)
+                    TTS_REQUESTS.inc(engine=engine.name, status="error")
+                    logger.warning("%s TTS failed: %s", engine.name.upper(), str(e))
+                    last_error = e
+                    if not running:
+                        launch_next()
+                    continue
+
+                engine.record(True, elapsed)
+                TTS_REQUESTS.inc(engine=engine.name, status="ok")
+                TTS_LATENCY.observe(elapsed, engine=engine.name)
+                if engine.name != self.primary:
+                    TTS_FALLBACKS.inc(engine=engine.name)
+                won_at = time.perf_counter() - start
+                for loser_future, loser in running.items():
+                    if loser_future.cancel():
+                        loser.breaker.release()
+                        continue
+                    # Already synthesizing; let it finish in the background and discard it
+                    backup_won = hedged_engine is loser
+                    if backup_won:
+                        engine.hedge_wins += 1
+                        TTS_HEDGE_WINS.inc(engine=engine.name)
+                    loser_future.add_done_callback(self._discarded_callback(loser, start, won_at, backup_won))
+                with span("tts.playback", engine=engine.name):
+                    self.player(audio, AUDIO_FORMATS.get(engine.name, "mp3"))
+                return engine.name
+
+        raise self._all_failed(last_error) from last_error
+
+    @staticmethod
+    def _synthesize(engine: TTSEngine, text: str, voice: Optional[str], rate: Optional[float]) -> Tuple[Union[bytes, PCMClip], float]:
+        start = time.perf_counter()
+        processed = preprocess_for_tts(text, engine.name)
+        with span("tts.synthesize", engine=engine.name):
+            audio = engine.synthesize(processed, **engine.kwargs(voice, rate, engine.synth_params))
+        return audio, time.perf_counter() - start
+
+    @staticmethod
+    def _discarded_callback(
+        slow: TTSEngine, start: float, won_at: float, backup_won: bool
+    ) -> Callable[[Future], None]:
+        """
+        Update a losing engine's health and, if it was the slow engine a
+        backup beat, record how much later its audio was ready.
+        """
+        def record(future: Future) -> None:
+            if future.exception() is not None:
+                slow.record(False, time.perf_counter() - start)
+                return
+            _, elapsed = future.result()
+            slow.record(True, elapsed)
+            if not backup_won:
+                # The slow engine won anyway; the backup saved nothing
+                return
+            saved = max(0.0, time.perf_counter() - start - won_at)
+            slow.hedge_saved += saved
+            TTS_HEDGE_SAVED.observe(saved, engine=slow.name)
+
+        return record
+
+    @staticmethod
+    def _all_failed(last_error: Optional[Exception]) -> TTSError:
+        message = "All TTS engines failed"
+        if last_error is not None:
+            message += f": {last_error}"
+        else:
+            message += ": every engine's circuit is open"
+        logger.error(message)
+        return TTSError(message)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """Health of every engine, for diagnostics."""
+        return {name: engine.snapshot() for name, engine in self.engines.items()}
@@ -0,0 +1,215 @@
+"""Priority scheduling of speech synthesis for Cortex Desktop Assistant.
+
+Every engine call used to run immediately, so pre-rendering phrases or a batch
+job competed equally with the reply the user is waiting for. Synthesis now
+takes a slot from one process-wide ``TTSScheduler`` shared by all the engine
+modules. Jobs belong to a priority class:
+
+- ``interactive``: the live reply (the default)
+- ``prefetch``: warming caches such as the phrase bank
+- ``bulk``: batch rendering
+
+Each class has its own concurrency limit. A background (prefetch or bulk)
+job only starts while no interactive job is running or waiting, and a
+higher class that is waiting always goes first, so interactive time to first
+audio doesn't depend on background load. A call already in progress can't be
+interrupted, but background work is synthesized one sentence (or phrase) per
+slot, so it yields to the user between sentences.
+
+The class is taken from context, so callers mark work rather than threading a
+parameter through every engine:
+
+Example:
+    with priority(BULK):
+        audio = synthesize(sentence)   # waits while the user is being answered
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional
+
+from logger import get_logger
+from metrics import TTS_QUEUE_WAIT
+
+# Initialize logger
+logger = get_logger("tts.scheduler")
+
+INTERACTIVE = "interactive"
+PREFETCH = "prefetch"
+BULK = "bulk"
+
+# Highest priority first
+PRIORITIES = (INTERACTIVE, PREFETCH, BULK)
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("tts_priority", default=INTERACTIVE)
+_holding: contextvars.ContextVar[bool] = contextvars.ContextVar("tts_slot_held", default=False)
+
+
+@contextmanager
+def priority(name: str) -> Iterator[None]:
+    """
+    Run synthesis inside the block at a priority class.
+
+    Args:
+        name: One of ``PRIORITIES``
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"TTS priority must be one of: {', '.join(PRIORITIES)}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    """Priority class of synthesis started from the current context."""
+    return _priority.get()
+
+
+class TTSScheduler:
+    """Admits synthesis jobs by priority class under per-class concurrency limits."""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            limits: Maximum concurrent jobs per class (classes left out are unlimited)
+        """
+        self.limits = dict(limits or {})
+        self.running: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self._waiting: Dict[str, Deque[object]] = {name: deque() for name in PRIORITIES}
+        self._cond = threading.Condition()
+
+    def _admissible(self, name: str, ticket: object) -> bool:
+        if self._waiting[name][0] is not ticket:
+            return False
+        limit = self.limits.get(name)
+        if limit is not None and self.running[name] >= limit:
+            return False
+        rank = PRIORITIES.index(name)
+        if any(self._waiting[higher] for higher in PRIORITIES[:rank]):
+            return False
+        # Background work doesn't start while the user is being answered
+        return name == INTERACTIVE or self.running[INTERACTIVE] == 0
+
+    @contextmanager
+    def slot(self, name: Optional[str] = None) -> Iterator[None]:
+        """
+        Hold a synthesis slot for the block, waiting until the job is admitted.
+
+        Nested slots in the same context (an engine function calling another)
+        are taken once.
+
+        Args:
+            name: Priority class (defaults to the context's, see ``priority``)
+        """
+        if _holding.get():
+            yield
+            return
+        name = name or current_priority()
+        self._acquire(name)
+        token = _holding.set(True)
+        try:
+            yield
+        finally:
+            _holding.reset(token)
+            self._release(name)
+
+    @asynccontextmanager
+    async def slot_async(self, name: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Hold a synthesis slot for the block from a coroutine or async generator.
+
+        The wait happens in a worker thread, so the event loop keeps running.
+        Inside a blocking ``slot`` (e.g. ``asyncio.run`` from a synchronous
+        engine function) no second slot is taken.
+
+        Args:
+            name: Priority class (defaults to the context's, see ``priority``)
+        """
+        if _holding.get():
+            yield
+            return
+        name = name or current_priority()
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self._acquire, name))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread still gets the slot; hand it back once it does
+            acquiring.add_done_callback(lambda task: task.cancelled() or task.exception() or self._release(name))
+            raise
+        try:
+            yield
+        finally:
+            self._release(name)
+
+    def _acquire(self, name: str) -> None:
+        ticket = object()
+        start = time.perf_counter()
+        with self._cond:
+            self._waiting[name].append(ticket)
+            try:
+                while not self._admissible(name, ticket):
+                    self._cond.wait()
+            finally:
+                self._waiting[name].remove(ticket)
+            self.running[name] += 1
+            # Others of this class may now be at the head of the queue
+            self._cond.notify_all()
+        waited = time.perf_counter() - start
+        TTS_QUEUE_WAIT.observe(waited, priority=name)
+        if waited > 0.05:
+            logger.debug("%s synthesis waited %.0f ms for a slot", name.capitalize(), waited * 1000)
+
+    def _release(self, name: str) -> None:
+        with self._cond:
+            self.running[name] -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Running and waiting jobs per class."""
+        with self._cond:
+            return {
+                name: {"running": self.running[name], "waiting": len(self._waiting[name])}
+                for name in PRIORITIES
+            }
+
+
+_scheduler: Optional[TTSScheduler] = None
+_scheduler_lock = threading.RLock()
+
+
+def configure_scheduler(tts_config) -> TTSScheduler:
+    """
+    Build the shared scheduler from the ``tts`` config section.
+
+    Args:
+        tts_config: TTSConfig instance
+
+    Returns:
+        The new shared scheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = TTSScheduler({
+            INTERACTIVE: tts_config.interactive_concurrency,
+            PREFETCH: tts_config.prefetch_concurrency,
+            BULK: tts_config.bulk_concurrency,
+        })
+    return _scheduler
+
+
+def get_scheduler() -> TTSScheduler:
+    """The shared scheduler, built from config on first use."""
+    with _scheduler_lock:
+        if _scheduler is None:
+            from config_utils import get_config
+
+            configure_scheduler(get_config().tts)
+        return _scheduler
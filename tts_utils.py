@@ -0,0 +1,183 @@
+"""Text helpers shared by the TTS engines."""
+
+import functools
+import importlib
+import re
+from typing import Callable, Dict, Optional, Union
+
+from audio_output import Playback, get_output, play_clip, play_file
+from audio_utils import AudioError, PCMClip, decode_audio
+from config_utils import get_config
+from logger import get_logger
+from single_flight import SingleFlight
+from tracing import traced
+
+# Initialize logger
+logger = get_logger("tts")
+
+# Get configuration
+config = get_config()
+
+# Module implementing each TTS engine, imported on demand
+TTS_MODULES: Dict[str, str] = {
+    "edge": "edge_tts_module",
+    "google": "google_tts_module",
+    "chatterbox": "chatterbox_tts_module",
+}
+
+# Concurrent requests for the same rendering share one synthesis
+_renders = SingleFlight("tts")
+
+# Container format produced by each engine's synthesize()
+AUDIO_FORMATS: Dict[str, str] = {
+    "edge": "mp3",
+    "google": "mp3",
+    "chatterbox": "wav",
+}
+
+
+def get_synthesizer(engine: str, pcm: bool = False) -> Callable[..., Union[bytes, PCMClip]]:
+    """
+    Get an engine's ``synthesize(text, voice=None, speaking_rate=None)`` function.
+    
+    Args:
+        engine: TTS engine name
+        pcm: Return decoded audio instead of encoded bytes. Engines with a
+            ``synthesize_pcm`` function (uncompressed output) use it; for the
+            others the encoded audio is decoded in memory.
+        
+    Returns:
+        The engine's synthesize function, returning encoded audio (or a
+        ``PCMClip`` with ``pcm``)
+        
+    Raises:
+        ValueError: If the engine is unknown
+        ImportError: If the engine's dependencies are not installed
+    """
+    engine = engine.lower()
+    module_name = TTS_MODULES.get(engine)
+    if module_name is None:
+        raise ValueError(f"Unknown TTS engine: {engine}")
+    module = importlib.import_module(module_name)
+    if not pcm:
+        return module.synthesize
+    if hasattr(module, "synthesize_pcm"):
+        return module.synthesize_pcm
+    
+    fmt = AUDIO_FORMATS.get(engine, "mp3")
+    
+    @functools.wraps(module.synthesize)
+    def synthesize_pcm(*args, **kwargs) -> PCMClip:
+        return decode_audio(module.synthesize(*args, **kwargs), fmt)
+    
+    return synthesize_pcm
+
+
+def synthesize_shared(
+    engine: str,
+    synthesize: Callable[..., Union[bytes, PCMClip]],
+    text: str,
+    voice: Optional[str] = None,
+    speaking_rate: Optional[float] = None,
+) -> Union[bytes, PCMClip]:
+    """
+    Synthesize text, joining an identical synthesis already in flight.
+
+    Args:
+        engine: Engine name (part of the key, with the voice, rate and text)
+        synthesize: The engine's synthesize function
+        text: The text to render
+        voice: Voice ID
+        speaking_rate: Speaking rate
+
+    Returns:
+        The engine's audio, shared with every concurrent caller
+    """
+    kwargs = {k: v for k, v in (("voice", voice), ("speaking_rate", speaking_rate)) if v is not None}
+    return _renders.do((engine, synthesize, voice, speaking_rate, text), synthesize, text, **kwargs)
+
+
+def play_audio(audio: Union[bytes, PCMClip], fmt: str = "mp3") -> Optional[Playback]:
+    """
+    Queue audio on the shared audio output.
+    
+    Without an output device (or if the audio can't be decoded) it is played
+    from a temporary file instead, blocking until it finishes.
+    
+    Args:
+        audio: Encoded audio, e.g. from an engine's synthesize(), or a decoded clip
+        fmt: Container format of encoded audio, used to decode it
+        
+    Returns:
+        The playback handle, or None if it was played synchronously
+    """
+    if isinstance(audio, PCMClip):
+        return play_clip(audio)
+    output = get_output()
+    if output is not None:
+        try:
+            return output.submit(decode_audio(audio, fmt))
+        except AudioError as e:
+            logger.warning("Playing undecoded %s audio: %s", fmt, str(e))
+    play_file(audio, fmt)
+    return None
+
+
+@traced("tts.preprocess")
+def preprocess_for_tts(text: str, engine: Optional[str] = None) -> str:
+    """
+    Preprocess text for TTS by removing markdown and other formatting.
+    
+    Args:
+        text: The input text to preprocess
+        engine: The TTS engine being used (for engine-specific processing)
+        
+    Returns:
+        Preprocessed text ready for TTS
+    """
+    if not text or not isinstance(text, str):
+        return ""
+    
+    logger.debug("Preprocessing text for TTS (length: %d)", len(text))
+    
+    try:
+        # Stage directions and asterisk actions
+        def stage_replace(match):
+            phrase = match.group(1).strip().lower()
+            # Longer pause for explicit pauses
+            if "pause" in phrase or "..." in phrase:
+                return '<break time="800ms"/>' if engine == "google" else "..."
+            # All other directions/actions: brief pause, not spoken
+            return '<break time="600ms"/>' if engine == "google" else ""
+        
+        # Replace *action or stage direction* with pause
+        text = re.sub(r"\*(.*?)\*", stage_replace, text)
+        
+        # Remove markdown links [text](url) -> text
+        text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
+        
+        # Remove code blocks
+        text = re.sub(r'```[\s\S]*?```', '', text)
+        
+        # Remove inline code
+        text = re.sub(r'`([^`]+)`', r'\1', text)
+        
+        # Remove HTML tags
+        text = re.sub(r'<[^>]+>', '', text)
+        
+        # Clean up whitespace and newlines
+        text = ' '.join(text.split())
+        
+        # Special handling for different TTS engines
+        engine = engine or config.voice.engine.lower()
+        if engine in ["google", "edge"]:
+            # Remove markdown formatting
+            text = text.replace('*', '').replace('_', '').replace('~', '')
+        
+        logger.debug("Preprocessed text (length: %d)", len(text))
+        return text
+        
+    except Exception as e:
+        logger.error("Error preprocessing text for TTS: %s", str(e), exc_info=True)
+        # Return the original text if preprocessing fails
+        return text if isinstance(text, str) else ""
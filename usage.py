@@ -0,0 +1,403 @@
+"""Usage and quota accounting for Cortex Desktop Assistant.
+
+Every billable call (Groq tokens, TTS characters, search queries) is recorded
+with its latency and turn id in a compact append-only log, one JSON array per
+line:
+
+    ["c", 1760860800.12, "groq", 512, 834, "9f3c2a1e:turn-3"]
+    ["t", 1760860800.95, "9f3c2a1e:turn-3", "chat"]
+
+A call entry holds the time, provider, units, latency in ms and turn; a turn
+entry holds the time, turn and the feature (intent) that handled it.
+
+Turn ids are only unique within a process, so each ledger prefixes them with
+a random run id; turns from different runs sharing a log stay apart.
+
+Hourly and daily totals per provider are kept in memory (seeded from the log
+at start-up, so a restart doesn't reset them) and checked against configured
+budgets: a warning is logged as a budget approaches, and with ``throttle``
+calls to a provider whose budget is spent are refused, so TTS and search fall
+back to another provider. ``python usage.py`` aggregates the log per hour or
+day and reports the cost of each kind of turn, so expensive features stand out.
+
+The ledger is only active once ``configure_usage`` has been called (the
+cli, wake, server and batch entry points do); otherwise recording is a no-op.
+
+Example:
+    check_budget("google")                     # raises BudgetExceededError if throttled
+    record_usage("google", len(text), elapsed)
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from logger import get_logger
+from metrics import BUDGET_REFUSALS, USAGE_UNITS
+from tracing import current_turn
+
+# Initialize logger
+logger = get_logger("usage")
+
+# What each provider's units are
+UNITS = {
+    "groq": "tokens",
+    "edge": "characters",
+    "google": "characters",
+    "chatterbox": "characters",
+    "brave": "queries",
+    "duckduckgo": "queries",
+}
+
+PERIODS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}
+
+# Spoken instead of an LLM answer once the Groq budget is spent
+BUDGET_SPENT_MESSAGE = "Sorry, I've used up my budget for answering questions. Try again later."
+
+
+class BudgetExceededError(Exception):
+    """Exception raised when a provider's usage budget is spent and throttling is on."""
+    pass
+
+
+def _bucket(ts: float, period: str) -> str:
+    return time.strftime(PERIODS[period], time.localtime(ts))
+
+
+class UsageLedger:
+    """Records usage to an append-only log and enforces budgets."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        budgets: Optional[Dict[str, Dict[str, Optional[float]]]] = None,
+        warn_at: float = 0.8,
+        throttle: bool = False,
+        clock=time.time,
+    ):
+        """
+        Initialize the ledger.
+
+        Args:
+            path: Log file (None keeps totals in memory only)
+            budgets: Units allowed per provider and period, e.g. ``{"groq": {"daily": 500000}}``
+            warn_at: Fraction of a budget at which a warning is logged
+            throttle: Refuse calls to a provider once a budget is spent
+            clock: Time source (seconds since the epoch)
+        """
+        self.path = Path(path) if path else None
+        self.budgets = {
+            name: {period: limit for period, limit in limits.items() if limit}
+            for name, limits in (budgets or {}).items()
+        }
+        self.warn_at = warn_at
+        self.throttle = throttle
+        self._clock = clock
+        self.run_id = uuid.uuid4().hex[:8]
+        # (provider, period) -> (bucket, units)
+        self._totals: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        # (provider, period, bucket, level) already warned about
+        self._warned = set()
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path is not None:
+            self._seed()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def _seed(self) -> None:
+        """Load today's totals from the log."""
+        now = self._clock()
+        for _, ts, provider, units, _ms, _turn in _calls(read_log(self.path)):
+            if _bucket(ts, "day") == _bucket(now, "day"):
+                self._add(provider, units, ts)
+
+    def _add(self, provider: str, units: float, ts: float) -> None:
+        for period in ("hourly", "daily"):
+            bucket = _bucket(ts, "hour" if period == "hourly" else "day")
+            current, total = self._totals.get((provider, period), (bucket, 0.0))
+            total = total if current == bucket else 0.0
+            self._totals[(provider, period)] = (bucket, total + units)
+
+    def used(self, provider: str, period: str = "daily") -> float:
+        """Units used by a provider in the current hour (``hourly``) or day (``daily``)."""
+        bucket = _bucket(self._clock(), "hour" if period == "hourly" else "day")
+        with self._lock:
+            current, total = self._totals.get((provider, period), (bucket, 0.0))
+        return total if current == bucket else 0.0
+
+    def allows(self, provider: str) -> bool:
+        """False if throttling is on and a budget of the provider is spent."""
+        if not self.throttle:
+            return True
+        limits = self.budgets.get(provider, {})
+        return all(self.used(provider, period) < limit for period, limit in limits.items())
+
+    def check(self, provider: str) -> None:
+        """
+        Refuse a call to a provider whose budget is spent.
+
+        Raises:
+            BudgetExceededError: If throttling is on and a budget is spent
+        """
+        if not self.allows(provider):
+            BUDGET_REFUSALS.inc(provider=provider)
+            raise BudgetExceededError(f"{provider} usage budget spent")
+
+    def record(
+        self, provider: str, units: float, seconds: float, turn: Optional[str] = None
+    ) -> None:
+        """
+        Record one call.
+
+        Args:
+            provider: Provider name (see ``UNITS``)
+            units: Tokens, characters or queries used
+            seconds: Call latency
+            turn: Turn the call belongs to (defaults to the current one)
+        """
+        now = self._clock()
+        turn = self._turn(turn)
+        USAGE_UNITS.inc(units, provider=provider)
+        with self._lock:
+            self._add(provider, units, now)
+            self._write(["c", round(now, 2), provider, units, round(seconds * 1000), turn])
+        self._warn(provider, now)
+
+    def tag_turn(self, feature: str, turn: Optional[str] = None) -> None:
+        """Record which feature (intent) handled a turn, for the cost-per-turn report."""
+        turn = self._turn(turn)
+        if turn is None:
+            return
+        with self._lock:
+            self._write(["t", round(self._clock(), 2), turn, feature])
+
+    def _turn(self, turn: Optional[str]) -> Optional[str]:
+        """The logged id of a turn (the current one if omitted), unique across runs."""
+        turn = turn if turn is not None else current_turn()
+        return f"{self.run_id}:{turn}" if turn is not None else None
+
+    def _write(self, entry: List[Any]) -> None:
+        if self._file is not None:
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def _warn(self, provider: str, now: float) -> None:
+        for period, limit in self.budgets.get(provider, {}).items():
+            used = self.used(provider, period)
+            level = "spent" if used >= limit else "near" if used >= self.warn_at * limit else None
+            key = (provider, period, _bucket(now, "hour" if period == "hourly" else "day"), level)
+            if level is None or key in self._warned:
+                continue
+            self._warned.add(key)
+            unit = UNITS.get(provider, "units")
+            if level == "spent":
+                logger.warning(
+                    "%s %s budget spent: %.0f of %.0f %s%s", provider, period, used, limit, unit,
+                    "; further calls are refused" if self.throttle else "",
+                )
+            else:
+                logger.warning(
+                    "%s has used %.0f%% of its %s budget (%.0f of %.0f %s)",
+                    provider, 100 * used / limit, period, used, limit, unit,
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_log(path: Path) -> Iterator[List[Any]]:
+    """Entries of a usage log, skipping lines that can't be parsed (e.g. a torn last write)."""
+    if not path.exists():
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, list) and entry:
+                yield entry
+
+
+def _number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _calls(entries: Iterable[List[Any]]) -> Iterator[List[Any]]:
+    """Call entries, skipping any without the expected fields (e.g. from an older version)."""
+    for entry in entries:
+        if (
+            len(entry) == 6 and entry[0] == "c" and isinstance(entry[2], str)
+            and _number(entry[1]) and _number(entry[3]) and _number(entry[4])
+        ):
+            yield entry
+
+
+def _tags(entries: Iterable[List[Any]]) -> Iterator[List[Any]]:
+    """Turn entries, skipping any that don't have the expected fields."""
+    for entry in entries:
+        if len(entry) == 4 and entry[0] == "t" and isinstance(entry[3], str):
+            yield entry
+
+
+def aggregate(
+    entries: List[List[Any]], period: str = "day"
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Total calls, units and latency per period and provider.
+
+    Args:
+        entries: Log entries
+        period: ``hour`` or ``day``
+
+    Returns:
+        ``{bucket: {provider: {"calls", "units", "mean_ms"}}}``
+    """
+    totals: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(
+        lambda: defaultdict(lambda: {"calls": 0, "units": 0, "ms": 0})
+    )
+    for _, ts, provider, units, ms, _turn in _calls(entries):
+        row = totals[_bucket(ts, period)][provider]
+        row["calls"] += 1
+        row["units"] += units
+        row["ms"] += ms
+    return {
+        bucket: {
+            provider: {
+                "calls": row["calls"],
+                "units": row["units"],
+                "mean_ms": round(row["ms"] / row["calls"]),
+            }
+            for provider, row in sorted(providers.items())
+        }
+        for bucket, providers in sorted(totals.items())
+    }
+
+
+def turn_costs(
+    entries: List[List[Any]], prices: Optional[Dict[str, float]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Average usage and cost of a turn, per feature.
+
+    Args:
+        entries: Log entries
+        prices: Cost per 1,000 units by provider
+
+    Returns:
+        ``{feature: {"turns", "cost_per_turn", "units_per_turn": {provider: units}}}``;
+        calls outside a tagged turn are reported under ``untagged``
+    """
+    prices = prices or {}
+    features = {turn: feature for _, _ts, turn, feature in _tags(entries)}
+    turns: Dict[str, set] = defaultdict(set)
+    units: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for turn, feature in features.items():
+        turns[feature].add(turn)
+    for _, _ts, provider, amount, _ms, turn in _calls(entries):
+        feature = features.get(turn, "untagged")
+        turns[feature].add(turn)
+        units[feature][provider] += amount
+    report = {}
+    for feature, ids in sorted(turns.items()):
+        count = len(ids)
+        used = sorted(units[feature].items())
+        cost = sum(amount * prices.get(provider, 0.0) / 1000 for provider, amount in used)
+        report[feature] = {
+            "turns": count,
+            "cost_per_turn": round(cost / count, 6),
+            "units_per_turn": {provider: round(amount / count, 1) for provider, amount in used},
+        }
+    return report
+
+
+_ledger: Optional[UsageLedger] = None
+
+
+def configure_usage(usage_config) -> Optional[UsageLedger]:
+    """
+    Start recording usage from the ``usage`` config section.
+
+    Args:
+        usage_config: UsageConfig instance
+
+    Returns:
+        The shared ledger, or None if accounting is disabled
+    """
+    global _ledger
+    if _ledger is not None:
+        _ledger.close()
+        _ledger = None
+    if usage_config.enabled:
+        _ledger = UsageLedger(
+            usage_config.path,
+            {name: budget.dict() for name, budget in usage_config.budgets.items()},
+            warn_at=usage_config.warn_at,
+            throttle=usage_config.throttle,
+        )
+    return _ledger
+
+
+def get_ledger() -> Optional[UsageLedger]:
+    """The shared ledger (None until ``configure_usage`` enables it)."""
+    return _ledger
+
+
+def check_budget(provider: str) -> None:
+    """Raise ``BudgetExceededError`` if calls to a provider are being refused."""
+    if _ledger is not None:
+        _ledger.check(provider)
+
+
+def within_budget(provider: str) -> bool:
+    """False if calls to a provider are being refused."""
+    return _ledger is None or _ledger.allows(provider)
+
+
+def record_usage(provider: str, units: float, seconds: float) -> None:
+    """Record a call in the shared ledger, if enabled."""
+    if _ledger is not None:
+        _ledger.record(provider, units, seconds)
+
+
+def tag_turn(feature: str) -> None:
+    """Record the feature that handled the current turn, if enabled."""
+    if _ledger is not None:
+        _ledger.tag_turn(feature)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Print usage per period and the cost of each kind of turn as JSON."""
+    from config_utils import get_config
+
+    usage_config = get_config().usage
+    parser = argparse.ArgumentParser(description="Cortex usage report")
+    parser.add_argument("--path", default=usage_config.path, help="Usage log to read")
+    parser.add_argument("--period", choices=sorted(PERIODS), default="day")
+    parser.add_argument("--since", help="Only count calls on or after this date (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    entries = list(read_log(Path(args.path)))
+    if args.since:
+        since = time.mktime(time.strptime(args.since, "%Y-%m-%d"))
+        entries = [
+            entry for entry in entries if len(entry) > 1 and _number(entry[1]) and entry[1] >= since
+        ]
+    report = {
+        "usage": aggregate(entries, args.period),
+        "turns": turn_costs(entries, usage_config.prices),
+        "budgets": {name: budget.dict() for name, budget in usage_config.budgets.items()},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Voice activity detection and end-pointing for Cortex Desktop Assistant.
+
+``speech_recognition`` closes a phrase after ``pause_threshold`` (a full
+second) of low energy. Here each 20 ms frame is classified from features
+computed for a whole chunk at once with NumPy (energy against an adaptive
+noise floor, zero-crossing rate and spectral flatness), and an ``Endpointer``
+closes the utterance after a short run of trailing silence: up to
+``max_silence`` right after speech starts, shrinking to ``min_silence`` once
+the user has been talking for a while (a pause mid-sentence is likelier early
+on). The trailing silence actually waited is reported as the endpoint delay.
+
+Example:
+    endpointer = Endpointer(VoiceActivityDetector(16000))
+    utterance = capture(lambda: stream.read(1024), 16000, endpointer)
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from logger import get_logger
+
+# Initialize logger
+logger = get_logger("vad")
+
+
+class VADTimeout(Exception):
+    """Exception raised when no speech starts before the timeout."""
+    pass
+
+
+def pcm16_to_float(data: bytes) -> np.ndarray:
+    """Convert little-endian 16-bit PCM to float32 samples in [-1, 1]."""
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def frame_features(frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute per-frame features for a block of frames.
+
+    Args:
+        frames: Samples shaped (n_frames, frame_length)
+
+    Returns:
+        Energy in dBFS, zero-crossing rate (0-1) and spectral flatness (0-1)
+    """
+    energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+    power = np.abs(np.fft.rfft(frames * np.hanning(frames.shape[1]), axis=1)) ** 2 + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, zcr, flatness
+
+
+class VoiceActivityDetector:
+    """Frame-level speech/non-speech classifier with an adaptive noise floor."""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: float = 20.0,
+        threshold_db: float = 10.0,
+        min_energy_db: float = -60.0,
+        noise_adapt: float = 0.05,
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            sample_rate: Sample rate of the audio fed in
+            frame_ms: Frame length
+            threshold_db: How far above the noise floor speech must be
+            min_energy_db: Frames quieter than this are never speech
+            noise_adapt: How quickly the noise floor follows non-speech frames
+        """
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.frame_seconds = self.frame_length / sample_rate
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.noise_adapt = noise_adapt
+        self.noise_db: Optional[float] = None
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    def calibrate(self, samples: np.ndarray) -> float:
+        """
+        Set the noise floor from audio known to be background noise.
+
+        Returns:
+            The noise floor in dBFS
+        """
+        frames = self._frames(samples)
+        if len(frames):
+            energy_db, _, _ = frame_features(frames)
+            self.noise_db = float(np.median(energy_db))
+        return self.noise_db if self.noise_db is not None else self.min_energy_db
+
+    def reset(self) -> None:
+        """Drop buffered samples (the noise floor is kept)."""
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    def _frames(self, samples: np.ndarray) -> np.ndarray:
+        samples = np.concatenate([self._remainder, samples]) if len(self._remainder) else samples
+        count = len(samples) // self.frame_length
+        self._remainder = samples[count * self.frame_length:].copy()
+        return samples[:count * self.frame_length].reshape(count, self.frame_length)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Classify the complete frames in a chunk (leftover samples carry over).
+
+        Args:
+            samples: Float32 samples
+
+        Returns:
+            One boolean per frame, True for speech
+        """
+        frames = self._frames(samples)
+        if not len(frames):
+            return np.zeros(0, dtype=bool)
+        energy_db, zcr, flatness = frame_features(frames)
+        if self.noise_db is None:
+            # No calibration: assume the quietest frame seen so far is background
+            self.noise_db = float(energy_db.min())
+        speech = (energy_db > self.noise_db + self.threshold_db) & (energy_db > self.min_energy_db)
+        # Loud but noise-like (hiss, fans, breath): high zero-crossing rate and a flat
+        # spectrum. Fricatives inside speech are short enough to be bridged by the
+        # endpointer's silence allowance.
+        speech &= ~((zcr > 0.3) & (flatness > 0.3))
+
+        quiet = energy_db[~speech]
+        if len(quiet):
+            self.noise_db += self.noise_adapt * (float(quiet.mean()) - self.noise_db)
+        # A quieter room is followed at once
+        self.noise_db = min(self.noise_db, float(energy_db.min()))
+        return speech
+
+
+@dataclass
+class Utterance:
+    """One captured utterance."""
+
+    audio: bytes
+    sample_rate: int
+    speech_seconds: float
+    endpoint_delay: float
+    truncated: bool = False
+    # Samples read from the stream up to the end point
+    end_offset: int = 0
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / 2 / self.sample_rate
+
+
+class Endpointer:
+    """Decide when an utterance has started and ended from VAD frames."""
+
+    def __init__(
+        self,
+        vad: VoiceActivityDetector,
+        min_silence: float = 0.2,
+        max_silence: float = 0.4,
+        adapt_after: float = 1.5,
+        min_speech: float = 0.1,
+        max_duration: Optional[float] = 30.0,
+    ):
+        """
+        Initialize the endpointer.
+
+        Args:
+            vad: Frame classifier
+            min_silence: Trailing silence that closes a long utterance
+            max_silence: Trailing silence that closes an utterance that just started
+            adapt_after: Seconds of speech after which ``min_silence`` applies
+            min_speech: Consecutive speech needed to count as the start of speech
+            max_duration: Seconds of speech after which the utterance is cut (None for no limit)
+        """
+        self.vad = vad
+        self.min_silence = min_silence
+        self.max_silence = max(max_silence, min_silence)
+        self.adapt_after = adapt_after
+        self.min_speech_frames = max(1, int(round(min_speech / vad.frame_seconds)))
+        self.max_duration = max_duration
+        self.reset()
+
+    def reset(self) -> None:
+        """Start waiting for a new utterance."""
+        self.vad.reset()
+        self.started = False
+        self.done = False
+        self.truncated = False
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.frames = 0
+        self.start_frame = 0
+        self._run = 0
+
+    @property
+    def speech_seconds(self) -> float:
+        return self.speech_frames * self.vad.frame_seconds
+
+    @property
+    def endpoint_delay(self) -> float:
+        """Trailing silence waited before the utterance was closed."""
+        return self.silence_frames * self.vad.frame_seconds
+
+    def silence_limit(self) -> float:
+        """Trailing silence that currently ends the utterance."""
+        progress = min(1.0, self.speech_seconds / self.adapt_after) if self.adapt_after > 0 else 1.0
+        return self.max_silence - progress * (self.max_silence - self.min_silence)
+
+    def feed(self, samples: np.ndarray) -> bool:
+        """
+        Process a chunk of audio.
+
+        Returns:
+            True once the utterance is complete
+        """
+        for is_speech in self.vad.process(samples):
+            if self.done:
+                break
+            self.frames += 1
+            if not self.started:
+                self._run = self._run + 1 if is_speech else 0
+                if self._run >= self.min_speech_frames:
+                    self.started = True
+                    self.start_frame = self.frames - self._run
+                    self.speech_frames = self._run
+                continue
+            if is_speech:
+                self.speech_frames += 1
+                self.silence_frames = 0
+            else:
+                self.silence_frames += 1
+                if self.silence_frames * self.vad.frame_seconds >= self.silence_limit():
+                    self.done = True
+            if self.max_duration is not None and (self.frames - self.start_frame) * self.vad.frame_seconds >= self.max_duration:
+                self.done = self.truncated = True
+        return self.done
+
+
+def capture(
+    read_chunk: Callable[[], bytes],
+    sample_rate: int,
+    endpointer: Endpointer,
+    start_timeout: Optional[float] = None,
+    pre_speech: float = 0.3,
+    on_chunk: Optional[Callable[[bytes, Endpointer], None]] = None,
+) -> Utterance:
+    """
+    Read 16-bit mono PCM until the endpointer closes an utterance.
+
+    Args:
+        read_chunk: Returns the next chunk of audio (blocking)
+        sample_rate: Sample rate of the audio
+        endpointer: Decides where the utterance starts and ends
+        start_timeout: Seconds to wait for speech to start (None waits forever)
+        pre_speech: Seconds of audio kept from before speech was detected
+        on_chunk: Called with each chunk after the endpointer has seen it
+            (e.g. to recognize partial transcripts)
+
+    Returns:
+        The utterance, from just before speech started to the end point
+
+    Raises:
+        VADTimeout: If no speech started within ``start_timeout``
+    """
+    endpointer.reset()
+    chunks: List[bytes] = []
+    kept = 0
+    dropped = 0
+    start = time.monotonic()
+    keep_bytes = int(pre_speech * sample_rate) * 2
+    frame_bytes = endpointer.vad.frame_length * 2
+    # Speech is confirmed a few frames after it starts; keep those too
+    hold_bytes = keep_bytes + endpointer.min_speech_frames * frame_bytes
+    while True:
+        data = read_chunk()
+        chunks.append(data)
+        kept += len(data)
+        done = endpointer.feed(pcm16_to_float(data))
+        if on_chunk is not None:
+            on_chunk(data, endpointer)
+        if done:
+            break
+        if not endpointer.started:
+            # Only the pre-roll is needed before speech starts
+            while len(chunks) > 1 and kept - len(chunks[0]) >= hold_bytes:
+                kept -= len(chunks[0])
+                dropped += len(chunks.pop(0))
+            if start_timeout is not None and time.monotonic() - start > start_timeout:
+                raise VADTimeout("No speech detected")
+
+    # Byte offsets in the stream since reset, less what was dropped
+    audio = b"".join(chunks)
+    begin = max(0, endpointer.start_frame * frame_bytes - keep_bytes - dropped)
+    end = endpointer.frames * frame_bytes - dropped
+    utterance = Utterance(
+        audio[begin:end],
+        sample_rate,
+        endpointer.speech_seconds,
+        endpointer.endpoint_delay,
+        endpointer.truncated,
+        endpointer.frames * endpointer.vad.frame_length,
+    )
+    logger.debug(
+        "Utterance closed after %.0f ms of silence",
+        utterance.endpoint_delay * 1000,
+        extra={"speech_ms": round(utterance.speech_seconds * 1000), "endpoint_ms": round(utterance.endpoint_delay * 1000)},
+    )
+    return utterance
@@ -1,25 +1,503 @@
+"""Web search for Cortex Desktop Assistant.
+
+This module queries one or more search providers concurrently, merges or picks
+their results and caches them per normalized query so repeat searches are instant.
+Concurrent searches for the same query share one fan-out.
+"""
+
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
 import requests
 
+from logger import get_logger
+from metrics import SEARCH_CACHE, SEARCH_LATENCY, SEARCH_REQUESTS
+from single_flight import SingleFlight
+from tracing import bind, span
+from usage import record_usage, within_budget
+
+# Initialize logger
+logger = get_logger("search")
+
 BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
+BRAVE_API_URL = os.getenv("BRAVE_API_URL", "https://api.search.brave.com/res/v1/web/search")
+DUCKDUCKGO_API_URL = os.getenv("DUCKDUCKGO_API_URL", "https://api.duckduckgo.com/")
+
+# Spoken messages for searches that produce no answer
+NO_RESULTS_MESSAGE = "Sorry, I couldn't find any relevant results."
+NO_PROVIDER_MESSAGE = "Web search is not available: no search provider is configured."
+
+
+class SearchError(Exception):
+    """Exception raised when a search provider fails."""
+    pass
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """A single web search hit."""
+
+    title: str
+    description: str
+    url: str
+    provider: str = ""
+
+    def format(self) -> str:
+        """Format the result the way it is read out to the user."""
+        text = f"{self.title}: {self.description}"
+        if self.url:
+            text += f"\nSource: {self.url}"
+        return text
+
+
+class SearchProvider:
+    """Base class for search providers.
+
+    Subclasses implement :meth:`search` and raise :class:`SearchError` on failure.
+    """
+
+    name = "base"
+
+    def available(self) -> bool:
+        """Return whether the provider is usable (e.g. has credentials)."""
+        return True
+
+    def search(self, query: str, count: int) -> List[SearchResult]:
+        """
+        Search for a query.
+
+        Args:
+            query: The search query
+            count: Maximum number of results to return
+
+        Returns:
+            List of results, best first
+
+        Raises:
+            SearchError: If the search fails
+        """
+        raise NotImplementedError
+
+
+class BraveProvider(SearchProvider):
+    """Brave Search API provider."""
+
+    name = "brave"
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = 10.0):
+        self.api_key = api_key or BRAVE_API_KEY
+        self.timeout = timeout
+
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def search(self, query: str, count: int) -> List[SearchResult]:
+        headers = {"Accept": "application/json", "X-Subscription-Token": self.api_key}
+        params = {"q": query, "count": count}
+        try:
+            resp = requests.get(BRAVE_API_URL, headers=headers, params=params, timeout=self.timeout)
+            resp.raise_for_status()
+            hits = resp.json().get("web", {}).get("results", [])
+        except Exception as e:
+            raise SearchError(f"Brave search failed: {e}") from e
+
+        return [
+            SearchResult(
+                title=hit.get("title", "No title"),
+                description=hit.get("description", "No description"),
+                url=hit.get("url", ""),
+                provider=self.name,
+            )
+            for hit in hits[:count]
+        ]
+
+
+class DuckDuckGoProvider(SearchProvider):
+    """DuckDuckGo Instant Answer API provider (no API key required)."""
+
+    name = "duckduckgo"
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+
+    def search(self, query: str, count: int) -> List[SearchResult]:
+        params = {"q": query, "format": "json", "no_html": 1, "skip_disambig": 1}
+        try:
+            resp = requests.get(DUCKDUCKGO_API_URL, params=params, timeout=self.timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            raise SearchError(f"DuckDuckGo search failed: {e}") from e
+
+        results = []
+        if data.get("AbstractText"):
+            results.append(SearchResult(
+                title=data.get("Heading") or query,
+                description=data["AbstractText"],
+                url=data.get("AbstractURL", ""),
+                provider=self.name,
+            ))
+        for topic in data.get("RelatedTopics", []):
+            if len(results) >= count:
+                break
+            text = topic.get("Text")
+            if not text:
+                continue
+            title, _, desc = text.partition(" - ")
+            results.append(SearchResult(
+                title=title,
+                description=desc or text,
+                url=topic.get("FirstURL", ""),
+                provider=self.name,
+            ))
+        return results[:count]
+
+
+class StaticProvider(SearchProvider):
+    """Local stand-in provider returning canned results after an optional delay.
+
+    Used by tests and benchmarks in place of a network provider.
+    """
+
+    def __init__(
+        self,
+        results: Optional[Dict[str, List[SearchResult]]] = None,
+        delay: float = 0.0,
+        name: str = "static",
+        fail: bool = False,
+    ):
+        self.results = results or {}
+        self.delay = delay
+        self.name = name
+        self.fail = fail
+        self.calls = 0
+
+    def search(self, query: str, count: int) -> List[SearchResult]:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise SearchError(f"{self.name} search failed")
+        hits = self.results.get(normalize_query(query), [])
+        return [
+            SearchResult(r.title, r.description, r.url, r.provider or self.name)
+            for r in hits[:count]
+        ]
+
+
+# Provider factories by name; extend with register_provider()
+PROVIDERS: Dict[str, Callable[[], SearchProvider]] = {
+    "brave": BraveProvider,
+    "duckduckgo": DuckDuckGoProvider,
+}
+
+
+def register_provider(name: str, factory: Callable[[], SearchProvider]) -> None:
+    """
+    Register a search provider factory so it can be enabled from config.
+
+    Args:
+        name: Provider name as used in ``search.providers``
+        factory: Callable returning a provider instance
+    """
+    PROVIDERS[name.lower()] = factory
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for caching: lowercase, drop punctuation, collapse spaces."""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+def _normalize_url(url: str) -> str:
+    url = re.sub(r"^https?://(www\.)?", "", url.strip().lower())
+    return url.rstrip("/")
+
+
+class SearchCache:
+    """Thread-safe LRU cache of search results with a per-entry TTL."""
+
+    def __init__(
+        self,
+        ttl: float = 600.0,
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[SearchResult]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, int]) -> Optional[List[SearchResult]]:
+        """Return cached results for a key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() >= entry[0]:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[str, int], results: List[SearchResult]) -> None:
+        """Store results for a key."""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+class MultiSearch:
+    """Query several providers concurrently with a shared result cache.
+
+    With the ``first`` strategy the first provider to return results wins; with
+    ``merge`` all providers that answer within the timeout are interleaved by
+    rank and de-duplicated by URL. Providers that miss the deadline are left to
+    finish in the background and never delay the reply. Searches for a query
+    already being fetched wait for that fetch instead of starting another.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[SearchProvider],
+        strategy: str = "first",
+        timeout: float = 4.0,
+        max_results: int = 3,
+        cache: Optional[SearchCache] = None,
+    ):
+        if strategy not in ("first", "merge"):
+            raise ValueError("Search strategy must be either 'first' or 'merge'")
+        self.providers = list(providers)
+        self.strategy = strategy
+        self.timeout = timeout
+        self.max_results = max_results
+        self.cache = cache if cache is not None else SearchCache()
+        self._flight = SingleFlight("search")
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, 2 * len(self.providers)),
+            thread_name_prefix="cortex-search",
+        )
+
+    def search(self, query: str, count: Optional[int] = None) -> List[SearchResult]:
+        """
+        Search all available providers for a query.
+
+        Args:
+            query: The search query
+            count: Maximum number of results (defaults to ``max_results``)
+
+        Returns:
+            List of results, best first; empty if nothing was found in time
+
+        Raises:
+            SearchError: If no provider is available
+        """
+        count = count or self.max_results
+        key = (normalize_query(query), count)
+        with span("search", strategy=self.strategy) as search_span:
+            cached = self.cache.get(key)
+            SEARCH_CACHE.inc(result="miss" if cached is None else "hit")
+            if cached is not None:
+                logger.debug("Search cache hit for '%s'", key[0])
+                search_span.set(cached=True, results=len(cached))
+                return cached
+
+            results = self._flight.do(key, self._fetch, query, count, key)
+            search_span.set(cached=False, results=len(results))
+        return results
+
+    def _fetch(self, query: str, count: int, key: Tuple[str, int]) -> List[SearchResult]:
+        """Query the providers and cache what they return."""
+        # Providers whose usage budget is spent sit out (with usage.throttle)
+        providers = [p for p in self.providers if p.available() and within_budget(p.name)]
+        if not providers:
+            raise SearchError(NO_PROVIDER_MESSAGE)
+
+        start = time.perf_counter()
+        futures: Dict[Future, SearchProvider] = {
+            self._executor.submit(bind(self._provider_search), p, query, count): p
+            for p in providers
+        }
+        if self.strategy == "first":
+            results = self._first(futures, start)
+        else:
+            results = self._merge(futures, count)
+
+        logger.debug(
+            "Search for '%s' returned %d result(s) in %.0f ms",
+            key[0], len(results), (time.perf_counter() - start) * 1000,
+        )
+        if results:
+            self.cache.put(key, results)
+        return results
+
+    def _first(self, futures: Dict[Future, SearchProvider], start: float) -> List[SearchResult]:
+        pending = set(futures)
+        while pending:
+            remaining = self.timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                results = self._result(future, futures[future])
+                if results:
+                    return results
+        return []
+
+    def _merge(self, futures: Dict[Future, SearchProvider], count: int) -> List[SearchResult]:
+        done, _ = wait(futures, timeout=self.timeout)
+        # Keep provider order stable so the configured primary ranks first
+        ranked = [self._result(f, futures[f]) if f in done else [] for f in futures]
+
+        merged: List[SearchResult] = []
+        seen = set()
+        for rank in range(max((len(r) for r in ranked), default=0)):
+            for results in ranked:
+                if rank >= len(results):
+                    continue
+                url = _normalize_url(results[rank].url) or results[rank].title.lower()
+                if url in seen:
+                    continue
+                seen.add(url)
+                merged.append(results[rank])
+        return merged[:count]
+
+    @staticmethod
+    def _provider_search(provider: SearchProvider, query: str, count: int) -> List[SearchResult]:
+        start = time.perf_counter()
+        try:
+            with span(f"search.{provider.name}"):
+                results = provider.search(query, count)
+        except Exception:
+            SEARCH_REQUESTS.inc(provider=provider.name, status="error")
+            raise
+        SEARCH_REQUESTS.inc(provider=provider.name, status="ok" if results else "empty")
+        SEARCH_LATENCY.observe(time.perf_counter() - start, provider=provider.name)
+        record_usage(provider.name, 1, time.perf_counter() - start)
+        return results
+
+    @staticmethod
+    def _result(future: Future, provider: SearchProvider) -> List[SearchResult]:
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning("Search provider %s failed: %s", provider.name, e)
+            return []
+
+
+_search: Optional[MultiSearch] = None
+_search_lock = threading.RLock()
+
+
+def configure_search(search_config) -> MultiSearch:
+    """
+    Build the shared multi-provider search from a search configuration.
+
+    Args:
+        search_config: The ``search`` section of the application config
+
+    Returns:
+        MultiSearch: The new shared search instance
+    """
+    global _search
+    providers = []
+    for name in search_config.providers:
+        factory = PROVIDERS.get(name.lower())
+        if factory is None:
+            logger.warning("Unknown search provider '%s' ignored", name)
+            continue
+        providers.append(factory())
+    with _search_lock:
+        _search = MultiSearch(
+            providers,
+            strategy=search_config.strategy,
+            timeout=search_config.timeout,
+            max_results=search_config.max_results,
+            cache=SearchCache(search_config.cache_ttl, search_config.cache_size),
+        )
+    return _search
+
+
+def get_search() -> MultiSearch:
+    """
+    Get the shared multi-provider search, building it from config on first use.
+
+    Returns:
+        MultiSearch: The configured search instance
+    """
+    with _search_lock:
+        if _search is None:
+            from config_utils import get_config
+
+            configure_search(get_config().search)
+        return _search
+
+
+def search_results(query: str, count: Optional[int] = None) -> List[SearchResult]:
+    """
+    Search the web using the configured providers.
+
+    Args:
+        query: The search query
+        count: Maximum number of results
+
+    Returns:
+        List of results, best first
+
+    Raises:
+        SearchError: If no provider is available
+    """
+    return get_search().search(query, count)
+
+
+def search_web(query: str, count: Optional[int] = None) -> str:
+    """
+    Search the web and return the best result formatted for reading out.
+
+    Args:
+        query: The search query
+        count: Maximum number of results to request
+
+    Returns:
+        The top result, or a message explaining why there is none
+    """
+    try:
+        results = search_results(query, count)
+    except SearchError as e:
+        return str(e)
+    except Exception as e:
+        return f"Web search failed: {e}"
+    if results:
+        return results[0].format()
+    return NO_RESULTS_MESSAGE
+
 
 def search_brave(query, count=3):
     if not BRAVE_API_KEY:
         return "Web search is not available: Brave API key missing."
-    url = "https://api.search.brave.com/res/v1/web/search"
-    headers = {"Accept": "application/json", "X-Subscription-Token": BRAVE_API_KEY}
-    params = {"q": query, "count": count}
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
-        resp.raise_for_status()
-        results = resp.json()
-        hits = results.get("web", {}).get("results", [])
-        if hits:
-            first = hits[0]
-            title = first.get("title", "No title")
-            desc = first.get("description", "No description")
-            url = first.get("url", "")
-            return f"{title}: {desc}\nSource: {url}"
-        return "Sorry, I couldn't find any relevant results."
+        results = BraveProvider().search(query, count)
+        if results:
+            return results[0].format()
+        return NO_RESULTS_MESSAGE
     except Exception as e:
         return f"Web search failed: {e}"